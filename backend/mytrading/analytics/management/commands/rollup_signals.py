@@ -1,7 +1,7 @@
 import math
 from collections import defaultdict
 from django.core.management.base import BaseCommand
-from django.db import connection, transaction
+from django.db import transaction
 from django.utils import timezone
 from django.apps import apps as django_apps
 import json
@@ -14,6 +14,9 @@ from research.models import (
     IndustryProfile, IndustryPlayer
 )
 from decimal import Decimal
+from research.vector_search import research_topk
+import numpy as np
+from news.decay import decay_weights, half_life_of, redecay
 
 # 研究 object types
 COMPANY_TYPES  = ("company_profile","company_risk","company_catalyst","company_thesis")
@@ -54,29 +57,6 @@ def get_embeddings_model():
     app_label, model_name = path.split(".")
     return django_apps.get_model(app_label, model_name)
 
-def cosine_topk(qv, types, k=5):
-    # 確保 qv 是正確的格式並轉換為 PostgreSQL vector 字符串
-    if hasattr(qv, 'tolist'):  # NumPy 數組
-        qv_list = qv.tolist()
-    elif isinstance(qv, (list, tuple)):
-        qv_list = list(qv)
-    else:
-        qv_list = [float(x) for x in qv]
-    
-    vector_str = '[' + ','.join(map(str, qv_list)) + ']'
-    
-    sql = """
-    SELECT object_type, object_id, chunk_id,
-           1 - (vector <=> %s::vector) AS sim
-    FROM research_researchembedding
-    WHERE object_type = ANY(%s)
-    ORDER BY vector <=> %s::vector
-    LIMIT %s;
-    """
-    with connection.cursor() as cur:
-        cur.execute(sql, [vector_str, list(types), vector_str, k])
-        return cur.fetchall()
-
 def days_diff(a, b): return abs((a - b).days)
 
 def resolve_company_signal(obj_type, obj_id):
@@ -214,7 +194,7 @@ class Command(BaseCommand):
             dd = days_diff(now, ch.news.published_at)
 
             # 先查公司類 hits
-            for obj_type, obj_id, r_cid, sim in cosine_topk(qv, COMPANY_TYPES, k=topk):
+            for obj_type, obj_id, r_cid, sim in research_topk(qv, COMPANY_TYPES, k=topk):
                 if sim < min_sim: continue
                 company_id, polarity = resolve_company_signal(obj_type, obj_id)
                 if not company_id: continue
@@ -231,7 +211,7 @@ class Command(BaseCommand):
                 comp_news_abs[company_id][ch.news_id] = max(comp_news_abs[company_id].get(ch.news_id,0.0), abs(contrib))
 
             # 再查行業類 hits
-            ind_hits = cosine_topk(qv, INDUSTRY_TYPES, k=topk)
+            ind_hits = research_topk(qv, INDUSTRY_TYPES, k=topk)
             for obj_type, obj_id, r_cid, sim in ind_hits:
                 if sim < min_sim: continue
                 industry_id, ind_polarity = resolve_industry_signal(obj_type, obj_id)
@@ -347,11 +327,17 @@ class Command(BaseCommand):
         parser.add_argument("--lookback-hours", type=int, default=24*7)   # 7 日窗
         parser.add_argument("--min-decayed-weight", type=float, default=0.05)
         parser.add_argument("--apply-overall-when-missing", action="store_true")
+        parser.add_argument("--redecay-stored", action="store_true",
+                            help="順手用而家時間重寫窗口內 news_scores_json 嘅 scores.decayed_weight（唔使 call LLM）")
 
     def handle(self, *args, **opts):
         now = timezone.now()
         since = now - timezone.timedelta(hours=opts["lookback_hours"])
 
+        if opts["redecay_stored"]:
+            n = redecay(since_hours=opts["lookback_hours"], now=now)
+            self.stdout.write(f"redecayed_news={n}")
+
         qs = (
             NewsItem.objects
             .filter(published_at__gte=since, news_scores_json__isnull=False)
@@ -369,23 +355,22 @@ class Command(BaseCommand):
 
         considered = 0
 
-        for item in qs.iterator(chunk_size=100):
-            payload = item.news_scores_json or {}
-            scores = payload.get("scores") or {}
-            targets = payload.get("targets") or []
-            overall = float(payload.get("sentiment_overall", 0.0))
+        # 衰減喺讀取時按 published_at / decay_half_life_hours 計（news.decay），
+        # 唔用評分嗰刻寫死喺 JSON 嘅 scores.decayed_weight —— 否則要成批重新 call LLM 先會準
+        items = list(qs.iterator(chunk_size=100))
+        payloads = [item.news_scores_json or {} for item in items]
+        decay = decay_weights([item.published_at for item in items], [half_life_of(p) for p in payloads], now=now)
 
-            impact = float(scores.get("impact_score", 0.0))
-            cred   = float(scores.get("credibility_score", 0.0))
-            nov    = float(scores.get("novelty_score", 0.0))
-            decay  = float(scores.get("decayed_weight", 1.0))
+        def _col(key):
+            return np.array([float((p.get("scores") or {}).get(key, 0.0)) for p in payloads], dtype=np.float64)
 
-            if decay < opts["min_decayed_weight"]:
-                continue
+        base_all = _col("impact_score") * _col("credibility_score") * _col("novelty_score") * decay
+        keep = (decay >= opts["min_decayed_weight"]) & (base_all != 0)
 
-            base = impact * cred * nov * decay
-            if base == 0:
-                continue
+        for i in np.flatnonzero(keep):
+            item, payload, base = items[i], payloads[i], float(base_all[i])
+            targets = payload.get("targets") or []
+            overall = float(payload.get("sentiment_overall", 0.0))
 
             # 可用 link_entities 關聯的多對多作為「可被分配的名單」
             linked_companies = list(getattr(item, "tickers").all()) if hasattr(item, "tickers") else []
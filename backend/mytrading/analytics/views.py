@@ -7,6 +7,7 @@ from reference.models import Company, Industry
 from research.models import AnalyticsCompanySignal
 from analytics.models import AnalyticsIndustrySignal
 from news.models import NewsItem
+from news.decay import decay_weight, half_life_of
 
 def _lower(s): return (s or "").strip().lower()
 
@@ -483,7 +484,8 @@ def company_news_score_signal(request, ticker: str):
                     "impact_score": scores.get("impact_score", 0.0),
                     "credibility_score": scores.get("credibility_score", 0.0),
                     "novelty_score": scores.get("novelty_score", 0.0),
-                    "decayed_weight": scores.get("decayed_weight", 1.0),
+                    # 讀取時按而家時間計，唔用評分嗰刻凍結咗嘅值
+                    "decayed_weight": round(decay_weight(news.published_at, half_life_of(news.news_scores_json)), 6),
                     "sentiment_overall": news.news_scores_json.get("sentiment_overall", 0.0),
                 })
             related_news.append(news_data)
@@ -172,6 +172,41 @@ REST_FRAMEWORK = {
 
 EMBEDDINGS_MODEL = "research.ResearchEmbedding"
 
+# 向量庫後端：pgvector（預設，直接查 research_researchembedding）或 qdrant（PG 表嘅鏡像）
+VECTOR_STORE_BACKEND = env("VECTOR_STORE_BACKEND", default="pgvector")
+QDRANT_URL = env("QDRANT_URL", default="")
+QDRANT_PATH = env("QDRANT_PATH", default="")  # embedded local 模式，例如 /data/qdrant 或 ":memory:"
+QDRANT_API_KEY = env("QDRANT_API_KEY", default="")
+QDRANT_COLLECTION = env("QDRANT_COLLECTION", default="research_embeddings")
+# research KNN 結果 cache（秒，0 = 停用）；研究快照版本一變舊 entry 即失效
+RESEARCH_KNN_CACHE_TTL = env.int("RESEARCH_KNN_CACHE_TTL", default=6 * 3600)
+# ops tasks 用 pick_ef_search() 揀達到呢個 recall@k 嘅最細 ef_search（睇 bench_hnsw）
+HNSW_TARGET_RECALL = env.float("HNSW_TARGET_RECALL", default=0.95)
+# LLM 回應 cache（ops.llm_cache）：TTL 秒（0 = 停用）、單個 entry 上限、寫入幾多個就換代、全局 bypass
+LLM_CACHE_TTL = env.int("LLM_CACHE_TTL", default=7 * 24 * 3600)
+LLM_CACHE_MAX_ENTRY_BYTES = env.int("LLM_CACHE_MAX_ENTRY_BYTES", default=512 * 1024)
+LLM_CACHE_MAX_ENTRIES = env.int("LLM_CACHE_MAX_ENTRIES", default=50000)
+LLM_CACHE_BYPASS = env.bool("LLM_CACHE_BYPASS", default=False)
+# LLM 排程器（ops.llm_scheduler）：所有 DeepSeek call 共用；0 = 該項唔限
+LLM_RPM = env.int("LLM_RPM", default=60)
+LLM_TOKENS_PER_HOUR = env.int("LLM_TOKENS_PER_HOUR", default=2_000_000)
+LLM_EST_COMPLETION_TOKENS = env.int("LLM_EST_COMPLETION_TOKENS", default=1500)
+LLM_BREAKER_FAILURES = env.int("LLM_BREAKER_FAILURES", default=5)
+LLM_BREAKER_COOLDOWN_S = env.float("LLM_BREAKER_COOLDOWN_S", default=60.0)
+LLM_MAX_QUEUE_WAIT_S = env.float("LLM_MAX_QUEUE_WAIT_S", default=900.0)
+# LLM call ledger（ops.llm_ledger → ops.LLMCall）：每次 call 一行；價格 = USD / 百萬 token [input, output]
+LLM_LEDGER_ENABLED = env.bool("LLM_LEDGER_ENABLED", default=True)
+LLM_PRICES_PER_M = env.json("LLM_PRICES_PER_M", default={
+    "deepseek-chat": [0.28, 0.42],
+    "deepseek-reasoner": [0.28, 0.42],
+})
+# score_news 預評分門檻：本地預測 impact 低過呢個值就唔送 LLM（0 = 停用；先跑 train_prescorer）
+NEWS_PRESCORE_THRESHOLD = env.float("NEWS_PRESCORE_THRESHOLD", default=0.0)
+# score_news 送 LLM 嘅正文 token 預算（news.prompt_builder 揀實體附近嘅句子；0 = 只送標題）
+NEWS_PROMPT_BODY_TOKENS = env.int("NEWS_PROMPT_BODY_TOKENS", default=600)
+# score_news 將 summary / events / reasoning 等審計內容 gzip 存去 default_storage（news.audit_store），DB 只留評分欄位
+NEWS_AUDIT_OFFLOAD = env.bool("NEWS_AUDIT_OFFLOAD", default=True)
+
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6380/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
 CELERY_TIMEZONE = "UTC"
@@ -183,5 +218,7 @@ CELERY_BEAT_SCHEDULE = {
     "embed_news_30m":   {"task": "ops.tasks.embed_news_task",   "schedule": 30*60},
     "aliases_daily":    {"task": "ops.tasks.build_aliases_task", "schedule": crontab(minute=0, hour=3)},
     "link_entities_15m":{"task": "ops.tasks.link_entities_task", "schedule": 15*60},
+    "enqueue_scoring_15m":{"task": "ops.tasks.enqueue_news_scoring_task", "schedule": 15*60},
+    "score_queue_5m":   {"task": "ops.tasks.score_news_queue_task", "schedule": 5*60},
     "rollup_hourly":    {"task": "ops.tasks.rollup_signals_task","schedule": 60*60},
 }
\ No newline at end of file
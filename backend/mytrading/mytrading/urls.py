@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.urls import path
 from news.views import news_matches, analyze_url
 from analytics.views import company_signals, industry_signals, signals_summary, news_score_signals_summary, company_news_score_signal
-from ops.views import metrics_summary
+from ops.views import metrics_summary, llm_usage
 from django.urls import include
 from api.views import TopRecommendationsView
 from api.pipeline_views import (
@@ -35,6 +35,7 @@ urlpatterns = [
     path("api/signals/news-score-summary/", news_score_signals_summary, name="news-score-signals-summary"),
     path("api/companies/<str:ticker>/news-score-signal/", company_news_score_signal, name="company-news-score-signal"),
     path("api/metrics/summary/", metrics_summary, name="metrics-summary"),
+    path("api/metrics/llm/", llm_usage, name="metrics-llm"),
     path("api/evals/", include("evals.urls")),
     path("api/recommendations/", TopRecommendationsView.as_view(), name="top-recommendations"),
     path("api/pipeline/start/", start_pipeline, name="pipeline-start"),
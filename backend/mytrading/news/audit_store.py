@@ -0,0 +1,87 @@
+# news/audit_store.py
+"""
+news_scores_json 冷熱分離。
+
+以往每則新聞喺 news_scores_json 入面存最多 4KB 嘅 raw_model.reasoning_excerpt，連埋 summary / events，
+成個 JSONB 有 GIN index，rollup_signals 同 company_news_score_signal 每次都全條讀。而家：
+  - 熱（DB）：只留評分欄位（scores / targets / sentiment_overall / credibility / metadata）
+    同細嘅 raw_model 標記（prescorer、prompt），train_prescorer 仲要 query；
+  - 冷（default_storage / MinIO）：summary、events、其餘 raw_model，gzip JSON，
+    key 記喺 news_scores_json.audit_ref；
+  - load_audit()：要睇先 lazy 讀（NewsItem.audit_payload()）；未搬嘅舊行直接由 JSON 攞。
+上傳失敗就原封不動留喺 DB（唔會掉資料），之後 offload_news_audit 再補。
+"""
+import gzip
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+COLD_FIELDS = ("summary", "events")
+RAW_MODEL_HOT_KEYS = ("prescorer", "prompt")
+PREFIX = "news-audit"
+
+
+def split(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(熱 payload, 冷 audit)；audit 空即係冇嘢要搬"""
+    hot = dict(payload)
+    audit: Dict[str, Any] = {}
+    for k in COLD_FIELDS:
+        if hot.get(k):
+            audit[k] = hot.pop(k)
+        else:
+            hot.pop(k, None)
+    raw = dict(hot.get("raw_model") or {})
+    cold_raw = {k: v for k, v in raw.items() if k not in RAW_MODEL_HOT_KEYS and v not in (None, "", [], {})}
+    if cold_raw:
+        audit["raw_model"] = cold_raw
+    hot["raw_model"] = {k: v for k, v in raw.items() if k in RAW_MODEL_HOT_KEYS}
+    return hot, audit
+
+
+def key_for(item) -> str:
+    day = item.published_at.date().isoformat() if item.published_at else "undated"
+    return f"{PREFIX}/{day}/{item.id}.json.gz"
+
+
+def offload(item, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """將 payload 嘅審計部分 gzip 上傳，回傳要寫入 DB 嘅熱 payload"""
+    if not payload or not settings.NEWS_AUDIT_OFFLOAD:
+        return payload
+    hot, audit = split(payload)
+    if not audit:
+        return hot
+    raw = json.dumps(audit, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    blob = gzip.compress(raw)
+    key = key_for(item)
+    try:
+        # 重評會覆蓋同一個 key；storage 唔允許覆蓋時 save() 會改名，以回傳嘅為準
+        if default_storage.exists(key):
+            default_storage.delete(key)
+        name = default_storage.save(key, ContentFile(blob))
+    except Exception as e:
+        logger.warning("audit offload failed for news %s, keeping inline: %s", item.id, e)
+        return payload
+    hot["audit_ref"] = {"key": name, "bytes": len(blob), "raw_bytes": len(raw)}
+    return hot
+
+
+def load_audit(item_or_payload) -> Dict[str, Any]:
+    """lazy 讀審計 payload：有 audit_ref 就由 storage 讀，否則（未搬嘅舊行）由 JSON 本身攞"""
+    payload: Optional[Dict[str, Any]] = getattr(item_or_payload, "news_scores_json", item_or_payload)
+    if not payload:
+        return {}
+    ref = payload.get("audit_ref")
+    if not ref:
+        return split(payload)[1]
+    try:
+        with default_storage.open(ref["key"], "rb") as fh:
+            return json.loads(gzip.decompress(fh.read()).decode("utf-8"))
+    except Exception as e:
+        logger.warning("audit payload unavailable at %s: %s", ref.get("key"), e)
+        return {}
@@ -0,0 +1,73 @@
+# news/decay.py
+"""
+新聞時間衰減：讀取時計，唔再信 news_scores_json 入面評分嗰刻凍結咗嘅 scores.decayed_weight。
+
+weight = exp(-max(0, age_hours) / decay_half_life_hours)（同 news_scoring.finalize_scores 一致），
+冇 published_at 就當 1.0。
+
+  - decay_weights()：numpy 一次過計成批新聞（rollup_signals 用）；
+  - redecay()：一條 UPDATE ... jsonb_set 重寫 DB 入面嘅 scores.decayed_weight，唔使 call LLM
+    （俾仲直接讀 JSON 嘅下游 / API 用；redecay_news_scores command）。
+"""
+from datetime import datetime
+from typing import Optional, Sequence
+
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+
+from news.models import NewsItem
+
+DEFAULT_HALF_LIFE_HOURS = 72
+# exp(-700) 已經 ~1e-304；再細 Postgres double exp() 會 underflow 報錯
+MAX_EXPONENT = 700.0
+
+
+def half_life_of(payload: Optional[dict], default: float = DEFAULT_HALF_LIFE_HOURS) -> float:
+    scores = (payload or {}).get("scores") or {}
+    try:
+        hl = float(scores.get("decay_half_life_hours") or default)
+    except (TypeError, ValueError):
+        hl = float(default)
+    return max(1.0, hl)
+
+
+def decay_weights(published_at: Sequence[Optional[datetime]], half_life_hours: Sequence[float],
+                  now: Optional[datetime] = None) -> np.ndarray:
+    """(n,) 衰減權重；published_at 可以有 None（→ 1.0）"""
+    now = now or timezone.now()
+    ts = np.array([p.timestamp() if p is not None else np.nan for p in published_at], dtype=np.float64)
+    hl = np.maximum(np.asarray(half_life_hours, dtype=np.float64), 1.0)
+    age_h = np.maximum(0.0, (now.timestamp() - ts) / 3600.0)
+    w = np.exp(-np.minimum(age_h / hl, MAX_EXPONENT))
+    return np.where(np.isnan(ts), 1.0, w)
+
+
+def decay_weight(published_at: Optional[datetime], half_life_hours: float = DEFAULT_HALF_LIFE_HOURS,
+                 now: Optional[datetime] = None) -> float:
+    return float(decay_weights([published_at], [half_life_hours], now=now)[0])
+
+
+def redecay(since_hours: Optional[int] = None, now: Optional[datetime] = None,
+            default_half_life: float = DEFAULT_HALF_LIFE_HOURS) -> int:
+    """按而家時間重寫 scores.decayed_weight；回傳更新咗幾多行"""
+    now = now or timezone.now()
+    table = connection.ops.quote_name(NewsItem._meta.db_table)
+    sql = f"""
+        UPDATE {table}
+           SET news_scores_json = jsonb_set(
+                 news_scores_json, '{{scores,decayed_weight}}',
+                 to_jsonb(round(exp(-least(%s,
+                   greatest(0, extract(epoch from (%s - published_at)) / 3600.0)
+                   / greatest(1, coalesce(nullif(news_scores_json #>> '{{scores,decay_half_life_hours}}', '')::float, %s))
+                 ))::numeric, 6)))
+         WHERE published_at IS NOT NULL
+           AND jsonb_typeof(news_scores_json -> 'scores') = 'object'
+    """
+    params = [MAX_EXPONENT, now, float(default_half_life)]
+    if since_hours is not None:
+        sql += " AND published_at >= %s"
+        params.append(now - timezone.timedelta(hours=since_hours))
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.rowcount
@@ -0,0 +1,334 @@
+# news/entity_linking.py
+"""
+實體連結引擎（唯一入口：news 嘅 link_news_entities command）。
+
+  mention 抽取（可插拔）：regex / spacy / automaton，全部都要對上別名索引先算 mention
+  打分（單一路徑）：上下文 batched encode → 別名候選目標向量 exact dot（CandidateVectors）
+                   → ALPHA*lexical + BETA*semantic，揀最高分候選
+  寫入：按 NewsChunkLinkState 水位只處理未連 chunk，bulk_create 冪等寫入
+"""
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from news.models import NewsChunk, NewsEntity, NewsChunkLinkState
+
+EMBED_MODEL = os.getenv("EMBEDDING_MODEL","BAAI/bge-m3")  # 1024-d
+DEVICE = os.getenv("EMBEDDING_DEVICE","cpu")
+ALPHA = float(os.getenv("EL_ALPHA","0.3"))   # lexical weight
+BETA  = float(os.getenv("EL_BETA","0.7"))    # semantic weight
+CTX = int(os.getenv("EL_CTX_WINDOW","120"))  # mention左右字符窗口
+MIN_SCORE = float(os.getenv("EL_MIN_SCORE","0.35"))
+# 只用 doc.ents：en_core_web_sm 嘅 ner 有自己嘅 tok2vec，停用以下元件唔影響 NER 結果
+NER_DISABLE = ("tagger", "parser", "attribute_ruler", "lemmatizer", "senter")
+
+_model = None
+_nlp = {}
+
+def load_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(EMBED_MODEL, device=DEVICE)
+    return _model
+
+def load_spacy(ner_only: bool = True):
+    """用小模型足夠（ORG 標籤）；將來可換 en_core_web_trf / HF pipeline。"""
+    # en_core_web_sm 官方包含 NER，適合新聞文本，安裝: python -m spacy download en_core_web_sm
+    # 亦可用 HF dslim/bert-base-NER 代替。 [oai_citation:4‡spacy.io](https://spacy.io/models?utm_source=chatgpt.com) [oai_citation:5‡huggingface.co](https://huggingface.co/dslim/bert-base-NER?utm_source=chatgpt.com)
+    import spacy
+    key = "ner" if ner_only else "full"
+    if key not in _nlp:
+        _nlp[key] = spacy.load("en_core_web_sm", disable=list(NER_DISABLE) if ner_only else [])
+    return _nlp[key]
+
+def norm(s:str)->str:
+    return re.sub(r"[^A-Z0-9]+"," ", (s or "").upper()).strip()
+
+def context_window(text:str, start:int, end:int, w:int)->str:
+    L = max(0, start-w); R = min(len(text), end+w)
+    return text[L:R]
+
+
+# ---- mention 抽取器 ----
+class Mention(NamedTuple):
+    text: str
+    start: int
+    end: int
+    key: str        # 別名索引 key
+
+class MentionExtractor:
+    """
+    extract(texts, index) -> 每個 text 嘅 [Mention]；同一 chunk 內同一別名只留第一次出現。
+    iter_extract() 係 lazy 版：成個 run 一條 stream，逐個 micro-batch 用 islice 攞（spaCy 唔使每批重開 pipe）
+    """
+    name = "base"
+
+    def extract(self, texts: List[str], index) -> List[List[Mention]]:
+        return list(self.iter_extract(texts, index))
+
+    def iter_extract(self, texts: Iterable[str], index) -> Iterator[List[Mention]]:
+        for t in texts:
+            yield self._dedupe(self.extract_one(t, index))
+
+    def extract_one(self, text: str, index) -> List[Mention]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _dedupe(mentions):
+        out, seen = [], set()
+        for m in mentions:
+            if m.key in seen or m.start < 0:
+                continue
+            seen.add(m.key); out.append(m)
+        return out
+
+class RegexExtractor(MentionExtractor):
+    """舊 news 版：regex 切 token 再查字典（單 token 別名，多字公司名對唔到）"""
+    name = "regex"
+    TOKEN_RE = re.compile(r"[A-Za-z0-9\.\-]{2,}")
+
+    def extract_one(self, text, index):
+        out = []
+        for m in self.TOKEN_RE.finditer(text):
+            key = norm(m.group(0))
+            if key in index.aliases:
+                out.append(Mention(m.group(0), m.start(), m.end(), key))
+        return out
+
+class AutomatonExtractor(MentionExtractor):
+    """別名 Aho-Corasick automaton：一次掃描，多字別名 + 精確 span（預設）"""
+    name = "automaton"
+
+    def extract_one(self, text, index):
+        return [Mention(text[h.start:h.end], h.start, h.end, h.key)
+                for h in index.automaton.find_all(text, min_chars=2)]
+
+class SpacyExtractor(MentionExtractor):
+    """舊 research 版：spaCy ORG 實體 + 大寫 ticker pattern，都要對上別名索引"""
+    name = "spacy"
+    TICKER_RE = re.compile(r"\b[A-Z]{1,5}(?:\.[A-Z]{1,2})?\b")
+
+    def __init__(self, n_process: int = 1, batch_size: int = 64):
+        self.n_process, self.batch_size = n_process, batch_size
+
+    def iter_extract(self, texts, index):
+        # 一次 nlp.pipe（n_process > 1 會 fork 進程池 + 載模型）：成個 run 共用，唔好每個 micro-batch 開一次
+        texts = list(texts)
+        docs = load_spacy().pipe(texts, n_process=self.n_process, batch_size=self.batch_size)
+        for t, d in zip(texts, docs):
+            yield self._dedupe(self._from_doc(t, d, index))
+
+    def _from_doc(self, text, doc, index):
+        out = []
+        for ent in doc.ents:
+            if ent.label_ != "ORG":  # 只要 ORG；有需要可加 PRODUCT
+                continue
+            key = norm(ent.text)
+            if key in index.aliases:
+                out.append(Mention(ent.text, ent.start_char, ent.end_char, key))
+        for m in self.TICKER_RE.finditer(text):
+            key = norm(m.group(0))
+            if key in index.aliases:
+                out.append(Mention(m.group(0), m.start(), m.end(), key))
+        return out
+
+EXTRACTORS = {
+    "automaton": AutomatonExtractor,
+    "regex": RegexExtractor,
+    "spacy": SpacyExtractor,
+}
+
+def get_extractor(name: str, **kwargs) -> MentionExtractor:
+    cls = EXTRACTORS[name]
+    return cls(**kwargs) if cls is SpacyExtractor else cls()
+
+def pending_chunks(qs, linker: str, alias_version: int):
+    """排除已經用同一連結器 + 同一別名版本連過嘅 chunk"""
+    done = NewsChunkLinkState.objects.filter(linker=linker, alias_version=alias_version).values("chunk_id")
+    return qs.exclude(pk__in=done)
+
+def save_chunk_links(results: List[Tuple[NewsChunk, List[NewsEntity]]], linker: str, alias_version: int) -> int:
+    """
+    results: [(chunk, [未 save 嘅 NewsEntity])]；需喺 transaction 內調用。
+    以前連過（舊別名版本 / 舊連結器）嘅 chunk 先清走舊結果再寫；unique constraint 兜底防重覆。
+    """
+    if not results:
+        return 0
+    relinked = set(NewsChunkLinkState.objects.filter(chunk_id__in=[ch.pk for ch, _ in results])
+                   .values_list("chunk_id", flat=True))
+    stale = Q()
+    for ch, _ in results:
+        if ch.pk in relinked:
+            stale |= Q(news_id=ch.news_id, chunk_idx=ch.idx)
+
+    # 舊版（未有水位）寫嘅係整則新聞一份、chunk_idx 一律 0（migration 0005 補嘅預設值）：
+    # 呢則新聞第一次用新方式連結時成批清走，否則會同逐 chunk 嘅新結果重覆計
+    news_ids = {ch.news_id for ch, _ in results}
+    tracked = set(NewsChunkLinkState.objects.filter(chunk__news_id__in=news_ids)
+                  .values_list("chunk__news_id", flat=True))
+    legacy = news_ids - tracked
+    if legacy:
+        stale |= Q(news_id__in=legacy)
+    if stale:
+        NewsEntity.objects.filter(stale).delete()
+
+    rows = [e for _, ents in results for e in ents]
+    NewsEntity.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+    NewsChunkLinkState.objects.bulk_create(
+        [NewsChunkLinkState(chunk=ch, linker=linker, alias_version=alias_version, n_entities=len(ents))
+         for ch, ents in results],
+        update_conflicts=True, unique_fields=["chunk"],
+        update_fields=["linker", "alias_version", "n_entities", "linked_at"],
+    )
+    return len(rows)
+
+
+class CandidateVectors:
+    """
+    別名候選目標 → 佢哋研究 embeddings（已 L2 normalize 嘅 float32 矩陣），按需預載、進程內 cache：
+      company         → company_profile
+      industry        → industry_profile
+      industry_player → industry_player
+    語義分 = 上下文向量同候選 chunk 向量嘅最大 dot product（exact，每個候選得幾行），
+    毋須再對全庫做 ANN；研究快照版本一變（build_research_embeddings 寫入）就清空。
+    """
+    def __init__(self):
+        self._vecs: Dict[Tuple[str, int], np.ndarray] = {}
+        self._version = None
+
+    def _check_version(self):
+        from research.vector_search import snapshot_version
+        v = snapshot_version()
+        if v != self._version:
+            self._vecs.clear()
+            self._version = v
+
+    def preload(self, targets: Iterable[Tuple[str, int]]):
+        from research.models import CompanyProfile, IndustryProfile
+        from research.vector_store import get_embeddings_model
+        self._check_version()
+        missing = defaultdict(set)
+        for ttype, tid in targets:
+            if (ttype, tid) not in self._vecs:
+                missing[ttype].add(tid)
+        if not missing:
+            return
+
+        # (object_type, object_id) → target
+        lookup = {}
+        if missing["company"]:
+            for pid, cid in CompanyProfile.objects.filter(company_id__in=missing["company"]).values_list("id", "company_id"):
+                lookup[("company_profile", pid)] = ("company", cid)
+        if missing["industry"]:
+            for pid, iid in IndustryProfile.objects.filter(industry_id__in=missing["industry"]).values_list("id", "industry_id"):
+                lookup[("industry_profile", pid)] = ("industry", iid)
+        for tid in missing["industry_player"]:
+            lookup[("industry_player", tid)] = ("industry_player", tid)
+
+        rows = defaultdict(list)
+        if lookup:
+            Emb = get_embeddings_model()
+            by_type = defaultdict(list)
+            for otype, oid in lookup:
+                by_type[otype].append(oid)
+            for otype, oids in by_type.items():
+                for oid, vec in Emb.objects.filter(object_type=otype, object_id__in=oids).values_list("object_id", "vector"):
+                    rows[lookup[(otype, oid)]].append(vec)
+
+        for ttype, tids in missing.items():
+            for tid in tids:
+                vecs = rows.get((ttype, tid))
+                if vecs:
+                    M = np.asarray(vecs, dtype=np.float32)
+                    M /= np.linalg.norm(M, axis=1, keepdims=True) + 1e-12
+                else:
+                    M = np.zeros((0, 0), dtype=np.float32)   # 未有研究 embeddings：語義分當 0
+                self._vecs[(ttype, tid)] = M
+
+    def similarity(self, qv: np.ndarray, target: Tuple[str, int]) -> float:
+        M = self._vecs.get(target)
+        if M is None or not M.size:
+            return 0.0
+        return float((M @ qv).max())
+
+    def best(self, qv: np.ndarray, candidates: List[Tuple[str, int, float]], alpha: float, beta: float):
+        """
+        candidates: aliases[key] = [(target_type, target_id, weight)]（qv 需已 normalize）
+        回傳最高分候選: (target_type, target_id, lex, sem, score)；同分取字典次序較前者
+        """
+        best = None
+        for ttype, tid, weight in candidates:
+            sem = self.similarity(qv, (ttype, tid))
+            score = alpha * weight + beta * sem
+            if best is None or score > best[4]:
+                best = (ttype, tid, weight, sem, score)
+        return best
+
+candidate_vectors = CandidateVectors()
+
+
+# ---- 引擎 ----
+class LinkingEngine:
+    def __init__(self, extractor: MentionExtractor, index, encode_batch: int = 64,
+                 alpha: float = ALPHA, beta: float = BETA, min_score: float = MIN_SCORE, ctx: int = CTX):
+        self.extractor, self.index = extractor, index
+        self.encode_batch = encode_batch
+        self.alpha, self.beta, self.min_score, self.ctx = alpha, beta, min_score, ctx
+
+    @property
+    def linker(self) -> str:
+        """寫入 NewsChunkLinkState 嘅連結器 id；抽取器或 embedding model 變咗就會重連"""
+        return f"{self.extractor.name}-cand:{EMBED_MODEL}"
+
+    def score_batch(self, chunks: List[NewsChunk], mentions: List[List[Mention]] = None):
+        """
+        抽取（如未提供）→ 上下文一次過 encode → 候選目標打分。
+        回傳 [(chunk, [NewsEntity 未 save])]，同一 chunk 同一 target 只留最高分
+        """
+        aliases = self.index.aliases
+        if mentions is None:
+            mentions = self.extractor.extract([ch.text for ch in chunks], self.index)
+        ctxs = [context_window(ch.text, m.start, m.end, self.ctx) for ch, ms in zip(chunks, mentions) for m in ms]
+        qvs = []
+        if ctxs:
+            qvs = load_model().encode(ctxs, batch_size=self.encode_batch, normalize_embeddings=True).astype("float32")
+            candidate_vectors.preload((t, i) for ms in mentions for m in ms for (t, i, _) in aliases[m.key])
+        qv_iter = iter(qvs)
+
+        results = []
+        for ch, ms in zip(chunks, mentions):
+            scored = []
+            for m in ms:
+                ttype, tid, lex, sem, score = candidate_vectors.best(next(qv_iter), aliases[m.key], self.alpha, self.beta)
+                if score >= self.min_score:
+                    scored.append((m, ttype, tid, lex, sem, score))
+            seen, ents = set(), []
+            for m, ttype, tid, lex, sem, score in sorted(scored, key=lambda x: x[-1], reverse=True):
+                if (ttype, tid) in seen:
+                    continue
+                seen.add((ttype, tid))
+                ents.append(NewsEntity(
+                    news_id=ch.news_id, chunk_idx=ch.idx,
+                    text=m.text[:256], start_char=m.start, end_char=m.end,
+                    norm=m.key, ticker=m.text if m.text.isupper() and len(m.text) <= 24 else "",
+                    target_type=ttype, target_id=tid,
+                    score_lexical=float(lex), score_semantic=float(sem), score_final=float(score),
+                    method="hybrid",
+                ))
+            results.append((ch, ents))
+        return results, len(ctxs)
+
+    def link_batch(self, chunks: List[NewsChunk], mentions: List[List[Mention]] = None) -> Tuple[int, int]:
+        """
+        一個 micro-batch 打分 + 連水位冪等寫入，回傳 (mentions, written)。
+        mentions 由呼叫方用 extractor.iter_extract() 成個 run 抽一次再切俾每批；唔俾就呢批自己抽。
+        """
+        # encode 慢：喺 transaction 外做，唔好 encode 期間一直揸住連線同鎖
+        results, n_mentions = self.score_batch(chunks, mentions)
+        with transaction.atomic():
+            return n_mentions, save_chunk_links(results, self.linker, self.index.version)
@@ -0,0 +1,22 @@
+# news/management/commands/enqueue_news_scoring.py
+import json
+from django.core.management.base import BaseCommand
+from news import score_queue
+
+class Command(BaseCommand):
+    help = "Enqueue unscored news into NewsScoreQueue with priority by recency and linked-entity count."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since-hours", type=int, default=24 * 7)
+        parser.add_argument("--force", action="store_true", help="已評分嘅都重新入隊（重設為 pending）")
+        parser.add_argument("--news-id", type=int, action="append", help="只入指定新聞")
+        parser.add_argument("--requeue-stale-minutes", type=int, default=None,
+                            help="claim 咗超過 N 分鐘仍未完成嘅放返 pending（預設 CELERY_TASK_TIME_LIMIT + 1 分鐘）")
+
+    def handle(self, *args, **opts):
+        minutes = opts["requeue_stale_minutes"]
+        stale = score_queue.requeue_stale(minutes * 60 if minutes else None)
+        n = score_queue.enqueue(since_hours=opts["since_hours"], force=opts["force"], news_ids=opts["news_id"])
+        depth = score_queue.depth()
+        self.stdout.write(self.style.SUCCESS(f"[OK] enqueue_news_scoring enqueued={n} requeued_stale={stale} depth={depth}"))
+        self.stdout.write(f"STATS {json.dumps({'processed': n, 'requeued_stale': stale, 'depth': depth})}")
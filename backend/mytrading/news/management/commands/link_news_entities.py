@@ -1,115 +1,146 @@
 # news/management/commands/link_news_entities.py
-import re, os
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.core.cache import cache
-from news.models import NewsItem, NewsChunk, NewsEntity
+import json, time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from sentence_transformers import SentenceTransformer
-from django.apps import apps as django_apps
-import json
-
-EMBED_MODEL = os.getenv("EMBEDDING_MODEL","BAAI/bge-m3")
-DEVICE = os.getenv("EMBEDDING_DEVICE","cpu")
-model = SentenceTransformer(EMBED_MODEL, device=DEVICE)
-
-def normalize(s:str)->str:
-    return re.sub(r"[^A-Z0-9]+"," ", (s or "").upper()).strip()
-
-def get_emb_model():
-    from django.conf import settings
-    path = getattr(settings,"EMBEDDINGS_MODEL","research.ResearchEmbedding")
-    app_label, model_name = path.split(".")
-    return django_apps.get_model(app_label, model_name)
-
-def bm25_like(mention:str, alias_weight:float)->float:
-    # MVP：字典命中即賦一個權重分；將來可換成真正 BM25（Elastic/OpenSearch）
-    return alias_weight
-
-@transaction.atomic
-def link_one_chunk(ch, aliases, Emb):
-    text = ch.text
-    # 1) 簡單規則抽 mention（MVP：找大寫Ticker/公司關鍵詞；可換成 spaCy/HF NER）：
-    #   建議日後用 dslim/bert-base-NER 或 spaCy 英文新聞管線抽 ORG 實體。 [oai_citation:15‡huggingface.co](https://huggingface.co/dslim/bert-base-NER?utm_source=chatgpt.com) [oai_citation:16‡spacy.io](https://spacy.io/usage/spacy-101?utm_source=chatgpt.com)
-    candidates = []
-    tokens = re.findall(r"[A-Za-z0-9\.\-]{2,}", text)
-    window = 80
-    for m in set(tokens):
-        key = normalize(m)
-        if key in aliases:
-            ctx = extract_ctx(text, m, window)
-            # 2) 計 semantic 分（新聞上下文向量 → 研究庫）
-            qv = model.encode([ctx], normalize_embeddings=True)[0].astype("float32").tolist()
-            # 將 Python list 轉換為 PostgreSQL vector 格式
-            vector_str = '[' + ','.join(map(str, qv)) + ']'
-            # pgvector 檢索：這裡用 ORM.Raw SQL（示例）
-            from django.db import connection
-            sql = """
-            SELECT id, object_type, object_id, 1 - (vector <=> %s::vector) AS sim
-            FROM research_researchembedding
-            WHERE object_type IN ('company_profile','company_risk','company_catalyst',
-                                  'company_thesis','industry_profile','industry_player')
-            ORDER BY vector <=> %s::vector LIMIT 5;
-            """
-            with connection.cursor() as cur:
-                cur.execute(sql, [vector_str, vector_str])
-                rows = cur.fetchall()
-            sem_top = max([r[3] for r in rows], default=0.0)
-
-            # 3) lexical 分（字典 weight 最大者）
-            lex_top = max([w for (_,_,w) in aliases[key]], default=0.0)
-
-            score = 0.3*lex_top + 0.7*sem_top
-            # 取第一個別名對象作 target（MVP；可擴展多候選）
-            tgt_type, tgt_id, _ = aliases[key][0]
-            candidates.append((m, ctx, tgt_type, tgt_id, lex_top, sem_top, score))
-
-    # 4) 取 top1 寫入 DB（同一 target 避免重覆）
-    written = 0
-    seen = set()
-    for m, ctx, ttype, tid, slex, ssem, s in sorted(candidates, key=lambda x: x[-1], reverse=True):
-        if (ttype, tid) in seen: continue
-        span = find_span(text, m)
-        NewsEntity.objects.create(
-            news=ch.news, text=m, start_char=span[0], end_char=span[1],
-            norm=normalize(m), ticker=m if m.isupper() else "",
-            target_type=ttype, target_id=tid,
-            score_lexical=float(slex), score_semantic=float(ssem), score_final=float(s),
-            method="hybrid",
-        )
-        seen.add((ttype, tid)); written += 1
-    return written
-
-def extract_ctx(text, mention, window):
-    # 取 mention 左右 window chars
-    idx = text.lower().find(mention.lower())
-    if idx < 0: return text[:min(len(text), 2*window)]
-    start = max(0, idx-window); end = min(len(text), idx+len(mention)+window)
-    return text[start:end]
-
-def find_span(text, mention):
-    i = text.lower().find(mention.lower())
-    return (max(0,i), max(0,i)+len(mention)) if i>=0 else (0,0)
+
+from news.models import NewsChunk
+from news.entity_linking import (
+    EXTRACTORS, LinkingEngine, get_extractor, load_spacy, pending_chunks,
+)
+from research.alias_index import get_alias_index
 
 class Command(BaseCommand):
-    help = "Link entities in recent news chunks via dictionary+vector hybrid and write to news_entities."
+    help = ("Link entities in recent news chunks: pluggable mention extractor (automaton/spacy/regex) + "
+            "alias-candidate semantic scoring, written idempotently to news_entities.")
 
     def add_arguments(self, parser):
         parser.add_argument("--days-back", type=int, default=7)
-        parser.add_argument("--limit", type=int, default=500)
+        parser.add_argument("--limit", type=int, default=800)
+        parser.add_argument("--extractor", choices=sorted(EXTRACTORS), default="automaton")
+        parser.add_argument("--batch-chunks", type=int, default=32, help="每個 micro-batch 幾多個 chunk")
+        parser.add_argument("--encode-batch", type=int, default=64)
+        parser.add_argument("--n-process", type=int, default=1, help="spaCy nlp.pipe 進程數")
+        parser.add_argument("--ner-batch", type=int, default=64, help="spaCy nlp.pipe batch_size")
+        parser.add_argument("--benchmark", action="store_true",
+                            help="唔寫 DB：每個抽取器跑同一批 chunk，報 chunks/s 同 precision proxy")
+        parser.add_argument("--extractors", type=str, default=",".join(sorted(EXTRACTORS)),
+                            help="--benchmark 要比較嘅抽取器")
+        parser.add_argument("--bench-ner", action="store_true",
+                            help="只比較 NER 吞吐：完整 pipeline 逐個 nlp() vs 精簡 nlp.pipe，並核對結果")
 
     def handle(self, *args, **opts):
-        from django.utils import timezone
         since = timezone.now() - timezone.timedelta(days=opts["days_back"])
-        qs = NewsChunk.objects.select_related("news").filter(news__published_at__gte=since).order_by("-news__published_at")[:opts["limit"]]
-        aliases = cache.get("entity_aliases") or {}
-        Emb = get_emb_model()
+        qs = NewsChunk.objects.select_related("news").filter(news__published_at__gte=since)
+        index = get_alias_index()
+        if not index.aliases:
+            self.stderr.write(self.style.WARNING("Alias index empty. Run: python manage.py build_entity_aliases"))
+        spacy_kw = {"n_process": opts["n_process"], "batch_size": opts["ner_batch"]}
+
+        if opts["benchmark"] or opts["bench_ner"]:
+            # 固定 chunk 集合（唔理水位），方便前後比較
+            chunks = list(qs.order_by("-news__published_at", "idx")[:opts["limit"]])
+            if not chunks:
+                raise CommandError("No chunks in window")
+            if opts["bench_ner"]:
+                return self.bench_ner([ch.text for ch in chunks], **spacy_kw)
+            names = [n.strip() for n in opts["extractors"].split(",") if n.strip()]
+            return self.benchmark(chunks, index, names, opts, spacy_kw)
 
-        total=0
-        for ch in qs:
-            total += link_one_chunk(ch, aliases, Emb)
+        engine = LinkingEngine(get_extractor(opts["extractor"], **spacy_kw), index, encode_batch=opts["encode_batch"])
+        # 只處理未用當前連結器 + 別名版本連過嘅 chunk
+        chunks = list(pending_chunks(qs, engine.linker, index.version)
+                      .order_by("-news__published_at", "idx")[:opts["limit"]])
+        bs = max(1, opts["batch_chunks"])
+
+        total = mentions = 0
+        t0 = time.perf_counter()
+        # 抽取成個 run 一條 stream（spaCy 只開一次 pipe / 進程池），每個 micro-batch 攞返自己嗰段
+        stream = engine.extractor.iter_extract((ch.text for ch in chunks), index)
+        for i in range(0, len(chunks), bs):
+            batch = chunks[i:i+bs]
+            n_m, n_w = engine.link_batch(batch, list(islice(stream, len(batch))))
+            mentions += n_m; total += n_w
+        dt = time.perf_counter() - t0
         self.stdout.write(self.style.SUCCESS(f"Linked entities written: {total}"))
 
-        stats = {"processed": int(total)}
+        stats = {"processed": int(total), "extractor": opts["extractor"], "chunks": len(chunks),
+                 "mentions": mentions, "mentions_per_s": round(mentions / dt, 1) if dt else None}
         self.stdout.write(self.style.SUCCESS(f"[OK] link_news_entities written={total}"))
-        self.stdout.write(f"STATS {json.dumps(stats)}")
\ No newline at end of file
+        self.stdout.write(f"STATS {json.dumps(stats)}")
+
+    def benchmark(self, chunks, index, names, opts, spacy_kw):
+        bs = max(1, opts["batch_chunks"])
+        texts = [ch.text for ch in chunks]
+        per = {}
+        for name in names:
+            try:
+                ex = get_extractor(name, **spacy_kw)
+                ex.extract(texts[:1], index)  # 暖身（載入 spaCy 模型等）
+            except Exception as e:
+                self.stderr.write(self.style.WARNING(f"[{name}] skipped: {e}"))
+                continue
+            engine = LinkingEngine(ex, index, encode_batch=opts["encode_batch"])
+
+            t0 = time.perf_counter()
+            mentions = ex.extract(texts, index)
+            extract_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            results = []
+            for i in range(0, len(chunks), bs):
+                results += engine.score_batch(chunks[i:i+bs], mentions[i:i+bs])[0]
+            score_s = time.perf_counter() - t0
+
+            ents = [e for _, es in results for e in es]
+            n_mentions = sum(len(ms) for ms in mentions)
+            per[name] = {
+                "pairs": {(e.news_id, e.chunk_idx, e.target_type, e.target_id) for e in ents},
+                "stats": {
+                    "extract_chunks_per_s": round(len(chunks) / extract_s, 1) if extract_s else None,
+                    "end_to_end_chunks_per_s": round(len(chunks) / (extract_s + score_s), 1),
+                    "mentions": n_mentions,
+                    "multi_token_mentions": sum(1 for ms in mentions for m in ms if " " in m.key),
+                    "linked": len(ents),
+                    # precision proxy：過到 MIN_SCORE 嘅比例、揀中候選嘅平均語義分
+                    "linked_rate": round(len(ents) / n_mentions, 4) if n_mentions else None,
+                    "mean_semantic": round(sum(e.score_semantic for e in ents) / len(ents), 4) if ents else None,
+                },
+            }
+
+        # 另一個 precision proxy：有幾多 (chunk, target) 至少有另一個抽取器都連到
+        for name, d in per.items():
+            others = set().union(*[o["pairs"] for n, o in per.items() if n != name]) if len(per) > 1 else set()
+            d["stats"]["consensus_rate"] = round(len(d["pairs"] & others) / len(d["pairs"]), 4) if d["pairs"] and others else None
+
+        stats = {"chunks": len(chunks), "alias_version": index.version,
+                 "extractors": {n: d["stats"] for n, d in per.items()}}
+        for n, d in per.items():
+            self.stdout.write(f"[{n}] " + " ".join(f"{k}={v}" for k, v in d["stats"].items()))
+        self.stdout.write(f"STATS {json.dumps(stats)}")
+
+    def bench_ner(self, texts, n_process, batch_size):
+        def ents(doc):
+            return [(e.text, e.start_char, e.end_char, e.label_) for e in doc.ents]
+
+        full, trimmed = load_spacy(ner_only=False), load_spacy()
+        full(texts[0]); list(trimmed.pipe(texts[:1]))  # 暖身 / 載入模型
+        t0 = time.perf_counter()
+        old = [ents(full(t)) for t in texts]
+        old_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        new = [ents(d) for d in trimmed.pipe(texts, n_process=n_process, batch_size=batch_size)]
+        new_s = time.perf_counter() - t0
+
+        stats = {
+            "chunks": len(texts), "n_process": n_process, "batch_size": batch_size,
+            "full_chunks_per_s": round(len(texts) / old_s, 1) if old_s else None,
+            "pipe_chunks_per_s": round(len(texts) / new_s, 1) if new_s else None,
+            "speedup": round(old_s / new_s, 2) if new_s else None,
+            "ents_identical": old == new,
+            "mismatched_chunks": sum(1 for a, b in zip(old, new) if a != b),
+        }
+        for k, v in stats.items():
+            self.stdout.write(f"  {k}: {v}")
+        self.stdout.write(f"STATS {json.dumps(stats)}")
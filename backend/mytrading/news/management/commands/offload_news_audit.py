@@ -0,0 +1,61 @@
+# news/management/commands/offload_news_audit.py
+import json
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from news import audit_store
+from news.models import NewsItem
+
+class Command(BaseCommand):
+    help = ("Backfill: move summary/events/raw reasoning out of news_scores_json into gzip objects in "
+            "default_storage, leaving only scored fields (plus audit_ref) in the row.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500)
+        parser.add_argument("--limit", type=int, default=0, help="最多處理幾多則（0 = 全部）")
+        parser.add_argument("--dry-run", action="store_true", help="只計會慳幾多 bytes，唔上傳唔寫 DB")
+
+    def handle(self, *args, **opts):
+        qs = (NewsItem.objects
+              .filter(news_scores_json__isnull=False)
+              .exclude(news_scores_json__has_key="audit_ref")
+              .filter(Q(news_scores_json__has_any_keys=list(audit_store.COLD_FIELDS))
+                      | Q(news_scores_json__raw_model__has_key="reasoning_excerpt"))
+              .only("id", "published_at", "news_scores_json")
+              .order_by("id"))
+        if opts["limit"] > 0:
+            qs = qs[:opts["limit"]]
+
+        moved = failed = 0
+        bytes_before = bytes_after = 0
+        batch = []
+
+        def flush():
+            nonlocal batch
+            if batch and not opts["dry_run"]:
+                NewsItem.objects.bulk_update(batch, ["news_scores_json"])
+            batch = []
+
+        for item in qs.iterator(chunk_size=opts["batch"]):
+            before = len(json.dumps(item.news_scores_json, ensure_ascii=False).encode("utf-8"))
+            if opts["dry_run"]:
+                hot = audit_store.split(item.news_scores_json)[0]
+            else:
+                hot = audit_store.offload(item, item.news_scores_json)
+                if "audit_ref" not in hot and audit_store.split(item.news_scores_json)[1]:
+                    failed += 1  # 上傳失敗：offload 已經 log，保留原樣
+                    continue
+            bytes_before += before
+            bytes_after += len(json.dumps(hot, ensure_ascii=False).encode("utf-8"))
+            item.news_scores_json = hot
+            batch.append(item)
+            moved += 1
+            if len(batch) >= opts["batch"]:
+                flush()
+        flush()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] offload_news_audit moved={moved} failed={failed} dry_run={opts['dry_run']} "
+            f"row_bytes {bytes_before} -> {bytes_after}"))
+        stats = {"processed": moved, "failed": failed, "bytes_before": bytes_before, "bytes_after": bytes_after,
+                 "saved_fraction": round(1 - bytes_after / bytes_before, 4) if bytes_before else None}
+        self.stdout.write(f"STATS {json.dumps(stats)}")
@@ -0,0 +1,17 @@
+# news/management/commands/redecay_news_scores.py
+import json
+from django.core.management.base import BaseCommand
+from news.decay import DEFAULT_HALF_LIFE_HOURS, redecay
+
+class Command(BaseCommand):
+    help = "Recompute scores.decayed_weight in news_scores_json from published_at (single SQL UPDATE, no LLM calls)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since-hours", type=int, default=None, help="只處理最近 N 小時發佈嘅新聞；唔填 = 全部")
+        parser.add_argument("--default-half-life", type=float, default=DEFAULT_HALF_LIFE_HOURS,
+                            help="JSON 冇 decay_half_life_hours 時用嘅半衰期（小時）")
+
+    def handle(self, *args, **opts):
+        n = redecay(since_hours=opts["since_hours"], default_half_life=opts["default_half_life"])
+        self.stdout.write(self.style.SUCCESS(f"[OK] redecay_news_scores updated={n}"))
+        self.stdout.write(f"STATS {json.dumps({'processed': n})}")
@@ -1,8 +1,13 @@
+import json, os, socket, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from django.conf import settings
 from django.db.models import Q
 from news.models import NewsItem
-from news.news_scoring import score_news_item
+from news.news_scoring import score_news_item, score_news_batch, DeepSeekClient
+from news import audit_store, prescorer, prompt_builder, score_queue
+from ops import llm_cache, llm_ledger
 
 class Command(BaseCommand):
     help = "Score linked NewsItem via DeepSeek and store JSON to news_scores_json"
@@ -12,50 +17,218 @@ class Command(BaseCommand):
         parser.add_argument("--model", type=str, default="deepseek-reasoner")
         parser.add_argument("--half-life", type=int, default=72)
         parser.add_argument("--force", action="store_true", help="re-score even if already scored")
+        parser.add_argument("--concurrency", type=int, default=4, help="同時在途嘅 LLM 請求數（1 = 逐條）")
+        parser.add_argument("--batch-size", type=int, default=1,
+                            help="每個 LLM 請求塞幾多則新聞（>1 用批量 prompt，schema 只送一次）")
+        parser.add_argument("--write-batch", type=int, default=20, help="累積幾多條結果先 bulk_update 一次")
+        parser.add_argument("--prescore-threshold", type=float, default=None,
+                            help="本地預評分 impact 低過門檻就唔 call LLM（預設 settings.NEWS_PRESCORE_THRESHOLD，0 = 停用）")
+        parser.add_argument("--no-llm-cache", action="store_true", help="唔讀唔寫 LLM 回應 cache")
+        parser.add_argument("--from-queue", action="store_true",
+                            help="由 NewsScoreQueue 按 priority 搶一批（SKIP LOCKED，可多個 worker 並行）")
+        parser.add_argument("--limit", type=int, default=100, help="--from-queue 每次搶幾多條")
+        parser.add_argument("--worker", type=str, default="", help="--from-queue 嘅 worker 名（預設 host:pid）")
+        parser.add_argument("--base-url", type=str, default="", help="覆蓋 DEEPSEEK_BASE，例如本地 mock server")
+        parser.add_argument("--body-tokens", type=int, default=None,
+                            help="正文 token 預算（由原文揀實體附近嘅句子；預設 settings.NEWS_PROMPT_BODY_TOKENS，0 = 只送標題）")
 
     def handle(self, *args, **opts):
-        since = timezone.now() - timezone.timedelta(hours=opts["since_hours"])
-
-        # 條件：最近 N 小時、有內容，且已完成 link（有關聯到公司/行業）
-        qs = (
-            NewsItem.objects
-            .filter(
-                Q(published_at__gte=since) | Q(scores_updated_at__isnull=True),
-                Q(title__isnull=False),  # NewsItem 只有 title 字段，沒有 body
+        from_queue = opts["from_queue"]
+        if from_queue:
+            # 隊列模式：priority 高（新 + 多實體）先做；claim 咗太耐嘅先放返出嚟
+            score_queue.requeue_stale()
+            worker = opts["worker"] or f"{socket.gethostname()}:{os.getpid()}"
+            source = [row.news for row in score_queue.claim(opts["limit"], worker)]
+        else:
+            since = timezone.now() - timezone.timedelta(hours=opts["since_hours"])
+            # 條件：最近 N 小時、有內容，且已完成 link（有關聯到公司/行業）
+            source = (
+                NewsItem.objects
+                .filter(
+                    Q(published_at__gte=since) | Q(scores_updated_at__isnull=True),
+                    Q(title__isnull=False),  # NewsItem 只有 title 字段，沒有 body
+                )
+                .order_by("published_at")
+                .iterator()
             )
-            .order_by("published_at")
-        )
 
-        processed = 0
+        # 1) 主線程準備輸入（DB 讀取唔入 worker 線程）
+        jobs = []
         skipped = 0
-        for item in qs.iterator():
+        done_ids, errors = [], {}
+        previous = {}  # --force 重評：舊分數，用嚟量度評分穩定度
+        for item in source:
             if item.news_scores_json and not opts["force"]:
                 skipped += 1
+                done_ids.append(item.id)
                 continue
 
             # 讀多對多（若你模型名不同請調整）
             tickers = [t.ticker for t in getattr(item, "tickers").all()] if hasattr(item, "tickers") else []
             industries = [i.name for i in getattr(item, "industries").all()] if hasattr(item, "industries") else []
 
-            body = item.title or ""  # NewsItem 只有 title 字段
+            body = item.title or ""  # 正文喺 MinIO：過咗預評分先由 prompt_builder 補
             if not body.strip():
                 skipped += 1
+                done_ids.append(item.id)
                 continue
 
+            if item.news_scores_json:
+                previous[item.id] = item.news_scores_json
+            jobs.append((item, dict(
+                item_id=str(item.id),
+                body=body,
+                source_url=item.url,  # NewsItem 使用 url 字段而不是 source_url
+                published_at=item.published_at,
+                tickers=tickers,
+                industries=industries,
+            )))
+
+        # 2) 本地預評分：低 impact 嘅直接用本地分數，唔使送 LLM
+        threshold = settings.NEWS_PRESCORE_THRESHOLD if opts["prescore_threshold"] is None else opts["prescore_threshold"]
+        local, preds = prescorer.gate([item for item, _ in jobs], threshold, half_life_hours=opts["half_life"])
+        n_candidates = len(jobs)
+        if local:
+            local_ids = {item.id for item, _ in local}
+            jobs = [j for j in jobs if j[0].id not in local_ids]
+        agree = sent_agree = compared = 0
+
+        # 2b) 只為真係送 LLM 嘅新聞讀原文，喺 token 預算內揀句
+        budget = settings.NEWS_PROMPT_BODY_TOKENS if opts["body_tokens"] is None else opts["body_tokens"]
+        prompt_meta = {}
+        if jobs and budget > 0:
+            bodies = prompt_builder.build_bodies([item for item, _ in jobs], budget,
+                                                 tickers={item.id: kw["tickers"] for item, kw in jobs})
+            for item, kw in jobs:
+                kw["body"], prompt_meta[item.id] = bodies[item.id]
+        else:
+            for item, kw in jobs:
+                prompt_meta[item.id] = {"budget_tokens": 0, "source": "title",
+                                        "body_tokens": prompt_builder.approx_tokens(kw["body"])}
+        stab = {"n": 0, "impact_abs": 0.0, "sentiment_abs": 0.0, "sign_agree": 0}
+
+        # 3) 有上限嘅 worker pool：每條獨立失敗，唔會拖冧成批
+        # --force：繞過 cache 讀取，否則重評會原封不動攞返舊回應，stability 永遠係 1.0
+        client = DeepSeekClient(base_url=opts["base_url"] or None, use_cache=not opts["no_llm_cache"],
+                                refresh=opts["force"]) if jobs else None
+        concurrency = max(1, opts["concurrency"])
+        bs = max(1, opts["batch_size"])
+        llm_kw = dict(model=opts["model"], half_life_hours=opts["half_life"], client=client)
+
+        def score(batch):
+            """回傳 [(item, payload 或 Exception)]；batch_size=1 行返單條路徑"""
+            if bs == 1:
+                item, kw = batch[0]
+                try:
+                    return [(item, score_news_item(**kw, **llm_kw))]
+                except Exception as e:
+                    return [(item, e)]
             try:
-                payload = score_news_item(
-                    item_id=str(item.id),
-                    body=body,
-                    source_url=item.url,  # NewsItem 使用 url 字段而不是 source_url
-                    published_at=item.published_at,
-                    tickers=tickers,
-                    industries=industries,
-                    model=opts["model"],
-                    half_life_hours=opts["half_life"],
-                )
-                item.mark_scored(payload)
-                processed += 1
+                res = score_news_batch([kw for _, kw in batch], **llm_kw)
             except Exception as e:
-                self.stderr.write(f"[score_news:skip] id={item.id} err={e}")
+                return [(item, e) for item, _ in batch]
+            return [(item, res.get(kw["item_id"], RuntimeError("missing from batch result"))) for item, kw in batch]
+
+        @llm_ledger.in_worker
+        def run(batch):
+            # 審計內容（reasoning / summary / events）喺 worker 線程上傳去 storage，DB 只寫熱欄位
+            return [(item, p if isinstance(p, Exception) else audit_store.offload(item, p)) for item, p in score(batch)]
+
+        processed = failed = 0
+        pending_writes = []
+        for item, payload in local:
+            item.news_scores_json = payload
+            item.scores_updated_at = timezone.now()
+            pending_writes.append(item)
+            done_ids.append(item.id)
+        t0 = time.perf_counter()
+
+        def flush():
+            nonlocal pending_writes
+            if pending_writes:
+                NewsItem.objects.bulk_update(pending_writes, ["news_scores_json", "scores_updated_at"])
+                pending_writes = []
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            it = iter([jobs[i:i+bs] for i in range(0, len(jobs), bs)])
+            in_flight = {}
+
+            def submit_next():
+                job = next(it, None)
+                if job is not None:
+                    in_flight[pool.submit(run, job)] = job
+
+            for _ in range(concurrency):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    in_flight.pop(fut)
+                    submit_next()
+                    for item, payload in fut.result():
+                        if isinstance(payload, Exception):
+                            failed += 1
+                            errors[item.id] = repr(payload)
+                            self.stderr.write(f"[score_news:skip] id={item.id} err={payload}")
+                            continue
+                        meta = prompt_meta.get(item.id)
+                        if meta:
+                            payload.setdefault("raw_model", {})["prompt"] = meta
+                        old = (previous.get(item.id) or {}).get("scores")
+                        if old:
+                            new = payload["scores"]
+                            stab["n"] += 1
+                            stab["impact_abs"] += abs(new["impact_score"] - float(old.get("impact_score", 0.0)))
+                            stab["sentiment_abs"] += abs(new["sentiment_score"] - float(old.get("sentiment_score", 0.0)))
+                            stab["sign_agree"] += (new["sentiment_score"] >= 0) == (float(old.get("sentiment_score", 0.0)) >= 0)
+                        item.news_scores_json = payload
+                        item.scores_updated_at = timezone.now()
+                        pending_writes.append(item)
+                        done_ids.append(item.id)
+                        processed += 1
+                        if item.id in preds:
+                            # 送咗 LLM 嘅：LLM 都認為 impact >= 門檻先算預評分判斷正確
+                            _, p_sent = preds[item.id]
+                            compared += 1
+                            agree += payload["scores"]["impact_score"] >= threshold
+                            sent_agree += (p_sent >= 0) == (payload["scores"]["sentiment_score"] >= 0)
+                    if len(pending_writes) >= opts["write_batch"]:
+                        flush()
+        flush()
+        dt = time.perf_counter() - t0
+        if from_queue:
+            score_queue.complete(done_ids)
+            score_queue.fail(errors)
 
-        self.stdout.write(self.style.SUCCESS(f"processed={processed} skipped={skipped}"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(
+            f"processed={processed} prescored={len(local)} skipped={skipped} failed={failed}"))
+        stats = {
+            "processed": processed, "skipped": skipped, "failed": failed,
+            "concurrency": concurrency, "batch_size": bs, "elapsed_s": round(dt, 2),
+            "items_per_min": round(processed / dt * 60, 1) if dt else None,
+            # 每則新聞嘅 call 數 / token 數：比較 --batch-size 1 vs N
+            "usage": client.usage.snapshot(items=processed + failed) if client else None,
+            "http": client.conn_stats() if client else None,
+            "queue": score_queue.depth() if from_queue else None,
+            "prescore": {
+                "threshold": threshold, "candidates": n_candidates, "local": len(local),
+                "saved_fraction": round(len(local) / n_candidates, 4) if n_candidates and preds else None,
+                "agreement": round(agree / compared, 4) if compared else None,
+                "sentiment_sign_agreement": round(sent_agree / compared, 4) if compared else None,
+            },
+            "llm_cache": llm_cache.stats()["process"],
+            "prompt": {
+                "budget_tokens": budget, "items": len(prompt_meta),
+                "from_raw": sum(1 for m in prompt_meta.values() if m.get("source") == "raw"),
+                "body_tokens_per_item": round(sum(m["body_tokens"] for m in prompt_meta.values()) / len(prompt_meta), 1) if prompt_meta else None,
+                "raw_tokens_per_item": round(sum(m.get("raw_tokens", 0) for m in prompt_meta.values()) / len(prompt_meta), 1) if prompt_meta else None,
+            },
+            # --force 重評（唔讀 cache）時同舊分數比較（例如 --body-tokens 0 vs 600）
+            "stability": {
+                "rescored": stab["n"],
+                "impact_mae": round(stab["impact_abs"] / stab["n"], 4) if stab["n"] else None,
+                "sentiment_mae": round(stab["sentiment_abs"] / stab["n"], 4) if stab["n"] else None,
+                "sentiment_sign_agreement": round(stab["sign_agree"] / stab["n"], 4) if stab["n"] else None,
+            },
+        }
+        self.stdout.write(f"STATS {json.dumps(stats)}")
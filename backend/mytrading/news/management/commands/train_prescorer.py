@@ -0,0 +1,58 @@
+# news/management/commands/train_prescorer.py
+import json
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from news.entity_linking import EMBED_MODEL
+from news.models import NewsItem, NewsPrescorerHead
+from news import prescorer
+
+class Command(BaseCommand):
+    help = "Train the local news pre-scorer (ridge head on bge-m3 news embeddings) from existing LLM scores."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20000, help="最多用幾多條已評分新聞")
+        parser.add_argument("--alpha", type=float, default=1.0, help="ridge 正則化強度")
+        parser.add_argument("--val-frac", type=float, default=0.2)
+        parser.add_argument("--threshold", type=float, default=0.2, help="評估用嘅 impact 門檻（score_news --prescore-threshold）")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--dry-run", action="store_true", help="只評估，唔寫 NewsPrescorerHead")
+
+    def handle(self, *args, **opts):
+        # 只用 LLM 評分做標籤（唔好用預評分器自己寫嘅分數訓練自己）
+        items = list(
+            NewsItem.objects.filter(news_scores_json__scores__has_key="impact_score")
+            # LLM 評分冇 prescorer key：JSON 比較會得 NULL，單用 exclude 會連佢哋一齊踢走
+            .filter(Q(news_scores_json__raw_model__prescorer__isnull=True)
+                    | ~Q(news_scores_json__raw_model__prescorer=True))
+            .order_by("-published_at")[:opts["limit"]]
+        )
+        if len(items) < 20:
+            raise CommandError(f"Need at least 20 LLM-scored news items, got {len(items)}")
+
+        X, Y = prescorer.features(items), prescorer.targets(items)
+        idx = np.random.default_rng(opts["seed"]).permutation(len(items))
+        n_val = max(1, int(len(items) * opts["val_frac"]))
+        val, train = idx[:n_val], idx[n_val:]
+
+        W = prescorer.fit_ridge(X[train], Y[train], alpha=opts["alpha"])
+        metrics = {
+            "train": prescorer.evaluate(prescorer.predict(W, X[train]), Y[train], opts["threshold"]),
+            "val": prescorer.evaluate(prescorer.predict(W, X[val]), Y[val], opts["threshold"]),
+        }
+        # 正式 head 用全部資料再 fit 一次
+        W = prescorer.fit_ridge(X, Y, alpha=opts["alpha"])
+
+        head_id = None
+        if not opts["dry_run"]:
+            head_id = NewsPrescorerHead.objects.create(
+                embed_model=EMBED_MODEL, alpha=opts["alpha"], n_train=len(items),
+                weights=prescorer.dump_weights(W), metrics=metrics,
+            ).id
+
+        for split, m in metrics.items():
+            self.stdout.write(f"[{split}] " + " ".join(f"{k}={v}" for k, v in m.items()))
+        self.stdout.write(self.style.SUCCESS(f"[OK] train_prescorer head={head_id} n={len(items)}"))
+        stats = {"processed": len(items), "head_id": head_id, **{f"val_{k}": v for k, v in metrics["val"].items()}}
+        self.stdout.write(f"STATS {json.dumps(stats)}")
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_newsitem_news_scores_json_newsitem_scores_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsChunkLinkState',
+            fields=[
+                ('chunk', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='link_state', serialize=False, to='news.newschunk')),
+                ('linker', models.CharField(max_length=120)),
+                ('alias_version', models.BigIntegerField(default=0)),
+                ('n_entities', models.IntegerField(default=0)),
+                ('linked_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='newsentity',
+            name='chunk_idx',
+            field=models.IntegerField(default=0),
+        ),
+        # 舊版每 15 分鐘重連會寫重覆行：加 unique 之前先去重（保留最早嗰行）。
+        # 舊行冇 chunk 資訊（chunk_idx 一律 0），去重只係令 constraint 加得落；
+        # 該則新聞第一次用新方式連結時 save_chunk_links 會成批刪走重寫。
+        migrations.RunSQL(
+            sql="""
+            DELETE FROM news_newsentity a
+            USING news_newsentity b
+            WHERE a.id > b.id
+              AND a.news_id = b.news_id
+              AND a.chunk_idx = b.chunk_idx
+              AND a.start_char = b.start_char
+              AND a.end_char = b.end_char
+              AND a.target_type = b.target_type
+              AND a.target_id = b.target_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='newsentity',
+            constraint=models.UniqueConstraint(fields=('news', 'chunk_idx', 'start_char', 'end_char', 'target_type', 'target_id'), name='uniq_newsentity_span_target'),
+        ),
+        migrations.AddIndex(
+            model_name='newschunklinkstate',
+            index=models.Index(fields=['linker', 'alias_version'], name='news_newsch_linker_90116e_idx'),
+        ),
+    ]
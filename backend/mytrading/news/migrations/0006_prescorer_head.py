@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_entity_link_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsPrescorerHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('embed_model', models.CharField(max_length=64)),
+                ('alpha', models.FloatField(default=1.0)),
+                ('n_train', models.IntegerField(default=0)),
+                ('weights', models.BinaryField()),
+                ('metrics', models.JSONField(default=dict)),
+            ],
+        ),
+    ]
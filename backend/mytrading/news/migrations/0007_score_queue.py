@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_prescorer_head'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsScoreQueue',
+            fields=[
+                ('news', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_queue', serialize=False, to='news.newsitem')),
+                ('priority', models.FloatField(default=0.0)),
+                ('n_entities', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('claimed', 'claimed'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('claimed_by', models.CharField(blank=True, default='', max_length=80)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['-priority'], name='newsq_pending_prio'), models.Index(fields=['status', 'claimed_at'], name='news_newssc_status_9609c6_idx')],
+            },
+        ),
+    ]
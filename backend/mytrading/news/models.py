@@ -33,6 +33,11 @@ class NewsItem(models.Model):
         self.scores_updated_at = timezone.now()
         self.save(update_fields=["news_scores_json", "scores_updated_at"])
 
+    def audit_payload(self) -> dict:
+        """冷儲存嘅 LLM 原始輸出（summary / events / reasoning）；要用先由 storage 讀"""
+        from news.audit_store import load_audit
+        return load_audit(self)
+
     def __str__(self):
         return self.title
 
@@ -54,6 +59,7 @@ class NewsEntity(models.Model):
     target 可對應 Company/Industry/IndustryPlayer（以 object_type + object_id 表示）
     """
     news = models.ForeignKey(NewsItem, on_delete=models.CASCADE, related_name="entities")
+    chunk_idx = models.IntegerField(default=0)            # span 係相對呢個 chunk 嘅 char offset
     # mention span
     text = models.CharField(max_length=256)               # 原文片段，例如 "TSMC", "Taiwan Semiconductor"
     start_char = models.IntegerField()
@@ -73,7 +79,74 @@ class NewsEntity(models.Model):
 
     class Meta:
         indexes = [models.Index(fields=["news"]), models.Index(fields=["target_type","target_id"])]
+        constraints = [
+            # 重跑連結都唔會重覆寫同一個 (mention span, target)
+            models.UniqueConstraint(
+                fields=["news", "chunk_idx", "start_char", "end_char", "target_type", "target_id"],
+                name="uniq_newsentity_span_target",
+            ),
+        ]
+
+
+
+
+
+
+class NewsChunkLinkState(models.Model):
+    """
+    每個 chunk 最後一次實體連結嘅水位：用邊個連結器（含 embedding model）同邊個別名索引版本。
+    兩樣都同當前一致就唔使再連；alias 版本變咗先會重連。
+    """
+    chunk = models.OneToOneField(NewsChunk, on_delete=models.CASCADE, primary_key=True, related_name="link_state")
+    linker = models.CharField(max_length=120)             # 例如 "automaton:BAAI/bge-m3"
+    alias_version = models.BigIntegerField(default=0)
+    n_entities = models.IntegerField(default=0)
+    linked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["linker", "alias_version"])]
+
 
+class NewsPrescorerHead(models.Model):
+    """
+    本地預評分器（news.prescorer）：bge-m3 新聞向量 + 連結實體數 → ridge 回歸 impact / sentiment。
+    每次 train_prescorer 新增一行，用最新一行；weights 係 np.save 出嚟嘅 (n_features, 2) float32。
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    embed_model = models.CharField(max_length=64)
+    alpha = models.FloatField(default=1.0)
+    n_train = models.IntegerField(default=0)
+    weights = models.BinaryField()
+    metrics = models.JSONField(default=dict)   # 驗證集：mae、sentiment 同號率、門檻下嘅 saved / agreement
 
+    def __str__(self):
+        return f"prescorer#{self.pk} {self.embed_model} n={self.n_train}"
 
 
+class NewsScoreQueue(models.Model):
+    """
+    待 LLM 評分嘅新聞隊列。priority 越大越先做（見 news.score_queue.priority）；
+    多個 worker 用 SELECT ... FOR UPDATE SKIP LOCKED 搶，唔會撞同一條。
+    """
+    STATUS_CHOICES = [("pending", "pending"), ("claimed", "claimed"), ("done", "done"), ("failed", "failed")]
+
+    news = models.OneToOneField(NewsItem, on_delete=models.CASCADE, primary_key=True, related_name="score_queue")
+    priority = models.FloatField(default=0.0)
+    n_entities = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.IntegerField(default=0)
+    claimed_by = models.CharField(max_length=80, blank=True, default="")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # claim 只掃 pending，按 priority 由大到細
+            models.Index(fields=["-priority"], name="newsq_pending_prio", condition=models.Q(status="pending")),
+            models.Index(fields=["status", "claimed_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.news_id} {self.status} p={self.priority:.2f}"
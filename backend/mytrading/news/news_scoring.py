@@ -3,8 +3,13 @@ import json
 import time
 import math
 import re
+import threading
 from typing import List, Optional, Dict, Any, Literal
-import requests
+import httpx
+from ops import llm_cache, llm_ledger
+from ops.llm_scheduler import (
+    LLMScheduler, RateLimited, SchedulerTimeout, TransientLLMError, estimate_tokens, get_scheduler, parse_retry_after,
+)
 from pydantic import BaseModel, Field, HttpUrl, ValidationError, field_validator
 from datetime import datetime, timezone, timedelta
 
@@ -81,19 +86,181 @@ DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
 DEEPSEEK_BASE = os.getenv("DEEPSEEK_BASE", "https://api.deepseek.com")
 # Chat completions endpoint（OpenAI-style）
 DEEPSEEK_CHAT_PATH = os.getenv("DEEPSEEK_CHAT_PATH", "/chat/completions")
+# 連線池：keep-alive 長連線，connect / read timeout 分開（reasoner 可以諗好耐，但連唔到應該快啲放棄）
+DEEPSEEK_HTTP2 = os.getenv("DEEPSEEK_HTTP2", "0").lower() in ("1", "true", "yes")
+DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv("DEEPSEEK_CONNECT_TIMEOUT", "5"))
+DEEPSEEK_READ_TIMEOUT = float(os.getenv("DEEPSEEK_READ_TIMEOUT", "120"))
+DEEPSEEK_MAX_CONNECTIONS = int(os.getenv("DEEPSEEK_MAX_CONNECTIONS", "16"))
+DEEPSEEK_KEEPALIVE_S = float(os.getenv("DEEPSEEK_KEEPALIVE_S", "60"))
+
+
+class ConnStats:
+    """
+    經 httpcore trace 數：幾多次 call 開咗新連線（TCP + TLS 握手）、幾多次重用舊連線，
+    以及握手平均耗時 → 估算重用省咗幾多 overhead。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.new_connections = 0
+        self.handshake_ms = 0.0
+        self.http_versions: Dict[str, int] = {}
+
+    def record(self, new_conn: bool, handshake_ms: float, http_version: str):
+        with self._lock:
+            self.calls += 1
+            self.http_versions[http_version] = self.http_versions.get(http_version, 0) + 1
+            if new_conn:
+                self.new_connections += 1
+                self.handshake_ms += handshake_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = self.calls - self.new_connections
+            avg = self.handshake_ms / self.new_connections if self.new_connections else 0.0
+            return {
+                "calls": self.calls,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_rate": round(reused / self.calls, 4) if self.calls else None,
+                "avg_handshake_ms": round(avg, 1),
+                "overhead_saved_ms": round(avg * reused, 1),
+                "http_versions": dict(self.http_versions),
+            }
+
+
+class _CallTrace:
+    """httpcore trace callback：記錄今次 request 有冇開新連線同握手用咗幾耐"""
+    def __init__(self):
+        self.new_conn = False
+        self.handshake_ms = 0.0
+        self._t0 = None
+
+    def __call__(self, event: str, info: Dict[str, Any]):
+        if event == "connection.connect_tcp.started":
+            self.new_conn = True
+            self._t0 = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete") and self._t0 is not None:
+            self.handshake_ms = (time.perf_counter() - self._t0) * 1000
+
+
+_http_clients: Dict[str, httpx.Client] = {}
+_http_lock = threading.Lock()
+conn_stats = ConnStats()
+
+def get_http_client(base_url: str) -> httpx.Client:
+    """
+    每個進程、每個 base_url 一個 httpx.Client（thread-safe），所有 DeepSeekClient 共用同一個連線池。
+    HTTP/2 要裝 h2；冇裝就退返 HTTP/1.1 keep-alive。
+    """
+    client = _http_clients.get(base_url)
+    if client is not None:
+        return client
+    with _http_lock:
+        client = _http_clients.get(base_url)
+        if client is None:
+            http2 = DEEPSEEK_HTTP2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    http2 = False
+            client = httpx.Client(
+                base_url=base_url,
+                http2=http2,
+                timeout=httpx.Timeout(DEEPSEEK_READ_TIMEOUT, connect=DEEPSEEK_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=DEEPSEEK_MAX_CONNECTIONS,
+                    max_keepalive_connections=DEEPSEEK_MAX_CONNECTIONS,
+                    keepalive_expiry=DEEPSEEK_KEEPALIVE_S,
+                ),
+            )
+            _http_clients[base_url] = client
+    return client
+
+
+class UsageStats:
+    """每個 DeepSeekClient 嘅 call / token 累計（thread-safe），俾 score_news 計每條新聞嘅成本"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cached_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, resp: Dict[str, Any], cached: bool):
+        usage = (resp.get("raw") or {}).get("usage") or {}
+        with self._lock:
+            if cached:
+                self.cached_calls += 1
+                return
+            self.calls += 1
+            self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+            self.completion_tokens += int(usage.get("completion_tokens") or 0)
+
+    def snapshot(self, items: int = 0) -> Dict[str, Any]:
+        with self._lock:
+            out = {"calls": self.calls, "cached_calls": self.cached_calls,
+                   "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+        if items:
+            out["calls_per_item"] = round(out["calls"] / items, 3)
+            out["prompt_tokens_per_item"] = round(out["prompt_tokens"] / items, 1)
+            out["completion_tokens_per_item"] = round(out["completion_tokens"] / items, 1)
+        return out
+
 
 class DeepSeekClient:
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, use_cache: bool = True,
+                 scheduler: Optional[LLMScheduler] = None, caller: str = "score_news", refresh: bool = False):
         self.api_key = api_key or DEEPSEEK_API_KEY
         self.base_url = (base_url or DEEPSEEK_BASE).rstrip("/")
+        self.use_cache = use_cache
+        # refresh=True：成個 client 都唔讀 cache（仍然寫返新結果），--force 重評用
+        self.refresh = refresh
+        # 同 research.llm_client 共用同一個排程器（同一個 DeepSeek key 嘅 RPM / token 配額）
+        self.scheduler = scheduler or get_scheduler("deepseek")
         if not self.api_key:
             raise RuntimeError("Missing DEEPSEEK_API_KEY")
+        self.http = get_http_client(self.base_url)
+        self.usage = UsageStats()
+        # ops.llm_ledger 嘅 caller（pipeline 階段）
+        self.caller = caller
 
-    def chat(self, *, model: str, messages: List[Dict[str, str]], temperature: float = 0.2, response_format: Optional[Dict]=None) -> Dict[str, Any]:
+    def conn_stats(self) -> Dict[str, Any]:
+        return conn_stats.snapshot()
+
+    def chat(self, *, model: str, messages: List[Dict[str, str]], temperature: float = 0.2, response_format: Optional[Dict]=None,
+             use_cache: Optional[bool] = None, refresh: bool = False) -> Dict[str, Any]:
         """
         兼容 deepseek-chat / deepseek-reasoner。
+        相同 (model, temperature, messages, response_format) 會由 ops.llm_cache 直接回傳（"cached": True）；
+        refresh=True 唔讀 cache 但會覆蓋（驗證失敗重試時用）。
         """
-        url = f"{self.base_url}{DEEPSEEK_CHAT_PATH}"
+        resp, hit = llm_cache.cached_call(
+            "deepseek_chat", model=model, temperature=temperature, messages=messages,
+            extra={"response_format": response_format, "base_url": self.base_url},
+            fn=lambda: self._post(model=model, messages=messages, temperature=temperature, response_format=response_format),
+            use_cache=self.use_cache if use_cache is None else use_cache,
+            refresh=refresh or self.refresh,
+        )
+        self.usage.record(resp, cached=hit)
+        if hit:
+            llm_ledger.record_cached(self.caller, model)
+        return {**resp, "cached": hit}
+
+    def _post(self, *, model: str, messages: List[Dict[str, str]], temperature: float, response_format: Optional[Dict]) -> Dict[str, Any]:
+        """經排程器排隊（RPM / token 預算 / Retry-After / 斷路器）先真正發請求；每次 call 記入 ops.llm_ledger"""
+        def usage_of(r):
+            usage = r["raw"].get("usage") or {}
+            return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+
+        return llm_ledger.call(
+            self.caller, model, self.scheduler,
+            lambda: self._request(model=model, messages=messages, temperature=temperature, response_format=response_format),
+            est_tokens=estimate_tokens(messages), usage_of=usage_of,
+        )
+
+    def _request(self, *, model: str, messages: List[Dict[str, str]], temperature: float, response_format: Optional[Dict]) -> Dict[str, Any]:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -107,10 +274,21 @@ class DeepSeekClient:
             # 部分供應商支援 { "type": "json_object" }
             payload["response_format"] = response_format
 
+        trace = _CallTrace()
         t0 = time.time()
-        resp = requests.post(url, headers=headers, json=payload, timeout=120)
+        try:
+            resp = self.http.post(DEEPSEEK_CHAT_PATH, headers=headers, json=payload, extensions={"trace": trace})
+        except httpx.HTTPError as e:
+            # 連線 / timeout：交俾排程器退避重試（TransientLLMError）
+            raise TransientLLMError(f"DeepSeek transport error: {e!r}") from e
         latency_ms = int((time.time() - t0) * 1000)
+        conn_stats.record(trace.new_conn, trace.handshake_ms, resp.http_version)
 
+        if resp.status_code == 429:
+            raise RateLimited(f"DeepSeek rate limited: {resp.text[:200]}",
+                              retry_after=parse_retry_after(resp.headers.get("retry-after")))
+        if resp.status_code >= 500:
+            raise TransientLLMError(f"DeepSeek error {resp.status_code}: {resp.text[:500]}")
         if resp.status_code != 200:
             raise RuntimeError(f"DeepSeek error {resp.status_code}: {resp.text}")
 
@@ -140,19 +318,8 @@ Novelty 以是否為新資訊衡量；Credibility 以來源權威 / 是否有一
 所有欄位必填或用合理預設。
 只輸出 JSON。"""
 
-USER_PROMPT_TEMPLATE = """請分析以下新聞內容，並輸出符合 schema 的 JSON。
-
-Metadata:
-- item_id: {item_id}
-- source_url: {source_url}
-- published_at: {published_at}
-- tickers: {tickers}
-- industries: {industries}
-- decay_half_life_hours: {half_life_hours}
-
-文本（可能包含多段）：
-輸出 JSON Schema（鍵名不可更改）：
-{{
+# 單條 / 批量共用嘅輸出 schema 同注意事項（經 str.format，所以大括號要雙寫）
+NEWS_SCHEMA = """{{
   "item_id": "string",
   "source_url": "string|null",
   "published_at": "ISO8601|null",
@@ -192,13 +359,41 @@ Metadata:
   "raw_model": {{ "note": "可放 reasoning 簡述，不得洩漏個資" }},
   "model_name": "string",
   "model_latency_ms": 0
-}}
-注意：
+}}"""
+
+SCHEMA_NOTES = """注意：
 1) `scores.decayed_weight = exp(-max(0, age_hours) / decay_half_life_hours)`，age_hours = 現在 - published_at（小數）
 2) 若無 published_at，decayed_weight = 1.0
 3) 保持 JSON 可被嚴格解析；不要放 Markdown code fence
 """
 
+USER_PROMPT_TEMPLATE = """請分析以下新聞內容，並輸出符合 schema 的 JSON。
+
+Metadata:
+- item_id: {item_id}
+- source_url: {source_url}
+- published_at: {published_at}
+- tickers: {tickers}
+- industries: {industries}
+- decay_half_life_hours: {half_life_hours}
+
+文本（可能包含多段）：
+{body}
+
+輸出 JSON Schema（鍵名不可更改）：
+""" + NEWS_SCHEMA + "\n" + SCHEMA_NOTES
+
+# 批量：schema 同 system prompt 只送一次，N 則新聞共用
+BATCH_USER_PROMPT_TEMPLATE = """請逐則分析以下 {n} 則新聞，每則輸出一個符合 schema 的物件。
+輸入係 JSON array，每則有 item_id / source_url / published_at / tickers / industries / text；decay_half_life_hours = {half_life_hours}。
+
+新聞：
+{items_json}
+
+輸出格式：{{"results": [ 每則新聞一個物件，item_id 必須同輸入一致，唔好漏、唔好合併 ]}}
+每個物件嘅 JSON Schema（鍵名不可更改）：
+""" + NEWS_SCHEMA + "\n" + SCHEMA_NOTES
+
 
 # =========================
 # JSON 安全處理
@@ -220,6 +415,68 @@ def coerce_json(text: str) -> str:
 # 主流程：事件 + 情緒 → 驗證 → 填補 → 回傳
 # =========================
 
+def finalize_scores(
+    data: Dict[str, Any],
+    *,
+    item_id: str,
+    source_url: Optional[str],
+    published_at: Optional[datetime],
+    tickers: Optional[List[str]],
+    industries: Optional[List[str]],
+    half_life_hours: int,
+    resp: Dict[str, Any],
+    latency_ms: Optional[int] = None,
+    batch_size: int = 1,
+) -> NewsScores:
+    """
+    模型輸出 → 重算 decayed_weight、補 metadata / raw_model → Pydantic 驗證（單條同批量共用）。
+    batch_size > 1：reasoning_content 係成批共用，唔抄落每條嘅 raw_model。
+    """
+    # ---- 計算 decayed_weight（若模型未算或算錯） ----
+    age_hours = None
+    if published_at is not None:
+        now = datetime.now(timezone.utc)
+        pub = published_at if published_at.tzinfo else published_at.replace(tzinfo=timezone.utc)
+        age_hours = max(0.0, (now - pub).total_seconds() / 3600.0)
+
+    if isinstance(data.get("scores"), dict):
+        if age_hours is None:
+            data["scores"]["decayed_weight"] = 1.0
+        else:
+            hl = data["scores"].get("decay_half_life_hours", half_life_hours) or half_life_hours
+            data["scores"]["decayed_weight"] = round(math.exp(-age_hours / float(hl)), 6)
+    elif "scores" not in data:
+        data["scores"] = {
+            "impact_score": 0.5,
+            "sentiment_score": data.get("sentiment_overall", 0.0),
+            "novelty_score": 0.5,
+            "credibility_score": 0.5,
+            "decay_half_life_hours": half_life_hours,
+            "decayed_weight": 1.0 if age_hours is None else round(math.exp(-age_hours / float(half_life_hours)), 6),
+        }
+
+    # ---- 補充 metadata & raw_model ----
+    data.setdefault("item_id", item_id)
+    data.setdefault("source_url", source_url)
+    data.setdefault("published_at", published_at.isoformat() if published_at else None)
+    data.setdefault("tickers", tickers or [])
+    data.setdefault("industries", industries or [])
+
+    # scores 係 null / list 等：唔補，留俾 Pydantic 報 ValidationError
+
+    if batch_size > 1:
+        data["raw_model"] = {"batch_size": batch_size}
+    else:
+        data["raw_model"] = {
+            "reasoning_excerpt": (resp.get("reasoning_content") or "")[:4000],
+        }
+    data["model_name"] = resp["model"]
+    data["model_latency_ms"] = resp["latency_ms"] if latency_ms is None else latency_ms
+
+    # ---- 驗證 ----
+    return NewsScores(**data)
+
+
 def extract_news_scores(
     *,
     item_id: str,
@@ -263,54 +520,25 @@ def extract_news_scores(
                 temperature=temperature,
                 # 如果支援：保證 JSON
                 response_format={"type": "json_object"},
+                # 重試時唔好再攞返同一個（可能係壞嘅）cache 回應
+                refresh=attempt > 0,
+            )
+            data = json.loads(coerce_json(resp["content"]))
+            if not isinstance(data, dict):
+                raise json.JSONDecodeError("expected a JSON object", resp["content"], 0)
+            return finalize_scores(
+                data, item_id=item_id, source_url=source_url, published_at=published_at,
+                tickers=tickers, industries=industries, half_life_hours=half_life_hours, resp=resp,
             )
-            raw_text = resp["content"]
-            text = coerce_json(raw_text)
-            data = json.loads(text)
-
-            # ---- 計算 decayed_weight（若模型未算或算錯） ----
-            age_hours = None
-            if published_at is not None:
-                now = datetime.now(timezone.utc)
-                pub = published_at if published_at.tzinfo else published_at.replace(tzinfo=timezone.utc)
-                age_hours = max(0.0, (now - pub).total_seconds() / 3600.0)
-
-            if "scores" in data:
-                if age_hours is None:
-                    data["scores"]["decayed_weight"] = 1.0
-                else:
-                    hl = data["scores"].get("decay_half_life_hours", half_life_hours) or half_life_hours
-                    data["scores"]["decayed_weight"] = round(math.exp(-age_hours / float(hl)), 6)
-            else:
-                data["scores"] = {
-                    "impact_score": 0.5,
-                    "sentiment_score": data.get("sentiment_overall", 0.0),
-                    "novelty_score": 0.5,
-                    "credibility_score": 0.5,
-                    "decay_half_life_hours": half_life_hours,
-                    "decayed_weight": 1.0 if age_hours is None else round(math.exp(-age_hours / float(half_life_hours)), 6),
-                }
-
-            # ---- 補充 metadata & raw_model ----
-            data.setdefault("item_id", item_id)
-            data.setdefault("source_url", source_url)
-            data.setdefault("published_at", published_at.isoformat() if published_at else None)
-            data.setdefault("tickers", tickers or [])
-            data.setdefault("industries", industries or [])
-
-            data["raw_model"] = {
-                "reasoning_excerpt": (resp.get("reasoning_content") or "")[:4000],
-            }
-            data["model_name"] = resp["model"]
-            data["model_latency_ms"] = resp["latency_ms"]
-
-            # ---- 驗證 ----
-            return NewsScores(**data)
 
-        except (json.JSONDecodeError, ValidationError, RuntimeError) as e:
+        except (SchedulerTimeout, TransientLLMError):
+            # 排程器已經排過隊 / 退避重試過，唔好再疊一層
+            raise
+        except (json.JSONDecodeError, ValidationError) as e:
+            # 限流同暫時性錯誤由排程器處理；4xx（key 錯、payload 錯、冇餘額）等 RuntimeError 重試都冇用，直接拋；
+            # 呢度只係內容唔合格，即刻重問
             last_err = e
             if attempt < retries:
-                time.sleep(0.8 * (attempt + 1))
                 continue
             raise
 
@@ -319,6 +547,87 @@ def extract_news_scores(
         raise last_err
 
 
+def extract_news_scores_batch(
+    items: List[Dict[str, Any]],
+    *,
+    model: str = "deepseek-reasoner",
+    temperature: float = 0.2,
+    half_life_hours: int = 72,
+    client: Optional[DeepSeekClient] = None,
+) -> Dict[str, Any]:
+    """
+    將 N 則新聞（score_news_item 嘅 kwargs：item_id / body / source_url / published_at / tickers / industries）
+    塞入一個 request，SYSTEM_PROMPT 同 schema 只送一次。
+    回傳 {item_id: NewsScores 或 Exception}；批量回應唔係 JSON、漏咗、重複或者驗證唔過嘅，逐條用 extract_news_scores 重試。
+    SchedulerTimeout / TransientLLMError（同其他 HTTP 錯誤）直接拋，唔會拆成 N 條單獨 call。
+    """
+    client = client or DeepSeekClient()
+    by_id = {str(it["item_id"]): it for it in items}
+    out: Dict[str, Any] = {}
+
+    if len(items) > 1:
+        payload = [{
+            "item_id": str(it["item_id"]),
+            "source_url": it.get("source_url"),
+            "published_at": it["published_at"].isoformat() if it.get("published_at") else None,
+            "tickers": it.get("tickers") or [],
+            "industries": it.get("industries") or [],
+            "text": (it.get("body") or "").strip(),
+        } for it in items]
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": BATCH_USER_PROMPT_TEMPLATE.format(
+                n=len(items), half_life_hours=half_life_hours,
+                items_json=json.dumps(payload, ensure_ascii=False, indent=1),
+            )},
+        ]
+        try:
+            resp = client.chat(model=model, messages=messages, temperature=temperature,
+                               response_format={"type": "json_object"})
+            results = json.loads(coerce_json(resp["content"]))
+            results = results.get("results", []) if isinstance(results, dict) else results
+            # latency 按條數攤分，令 model_latency_ms 同單條模式可比
+            share_ms = int(resp["latency_ms"] / len(items))
+            for data in results if isinstance(results, list) else []:
+                iid = str(data.get("item_id", "")) if isinstance(data, dict) else ""
+                it = by_id.get(iid)
+                if it is None or iid in out:
+                    continue
+                try:
+                    out[iid] = finalize_scores(
+                        data, item_id=iid, source_url=it.get("source_url"), published_at=it.get("published_at"),
+                        tickers=it.get("tickers"), industries=it.get("industries"),
+                        half_life_hours=half_life_hours, resp=resp, latency_ms=share_ms, batch_size=len(items),
+                    )
+                except (ValidationError, TypeError, AttributeError, KeyError, ValueError):
+                    pass   # 呢條形狀唔啱：只有佢下面逐條重試，唔好拖冧成批
+        except (SchedulerTimeout, TransientLLMError):
+            # 限流 / 斷路器 / 供應商出事：排程器已經排過隊同退避，再拆成 N 條只會加重負載
+            raise
+        except json.JSONDecodeError:
+            pass       # 回應唔係合法 JSON：全部逐條重試
+
+    # ---- 個別重試 ----
+    outage = None
+    for iid, it in by_id.items():
+        if iid in out:
+            continue
+        if outage is not None:
+            out[iid] = outage   # 供應商已經出事：其餘唔再逐條撞
+            continue
+        try:
+            out[iid] = extract_news_scores(
+                item_id=iid, body=it.get("body") or "", source_url=it.get("source_url"),
+                published_at=it.get("published_at"), tickers=it.get("tickers"), industries=it.get("industries"),
+                model=model, temperature=temperature, half_life_hours=half_life_hours, client=client,
+            )
+        except (SchedulerTimeout, TransientLLMError) as e:
+            out[iid] = outage = e
+        except Exception as e:
+            out[iid] = e
+    return out
+
+
 # =========================
 # 方便你在 Django 任務 / command 內呼叫的函式
 # =========================
@@ -332,9 +641,11 @@ def score_news_item(
     industries: List[str],
     model: str = "deepseek-reasoner",
     half_life_hours: int = 72,
+    client: Optional[DeepSeekClient] = None,
 ) -> Dict[str, Any]:
     """
     Wrapper：回傳 dict（已通過 Pydantic），可直接存 DB 或發送到 message queue。
+    client 可喺多線程之間共用（score_news --concurrency）。
     """
     scores = extract_news_scores(
         item_id=item_id,
@@ -345,6 +656,20 @@ def score_news_item(
         industries=industries,
         model=model,
         half_life_hours=half_life_hours,
+        client=client,
     )
     # 使用 mode='json' 確保所有對象都能正確序列化
-    return scores.model_dump(mode='json')
\ No newline at end of file
+    return scores.model_dump(mode='json')
+
+
+def score_news_batch(
+    items: List[Dict[str, Any]],
+    model: str = "deepseek-reasoner",
+    half_life_hours: int = 72,
+    client: Optional[DeepSeekClient] = None,
+) -> Dict[str, Any]:
+    """
+    批量版 score_news_item：回傳 {item_id: dict 或 Exception}，一條失敗唔影響其他。
+    """
+    res = extract_news_scores_batch(items, model=model, half_life_hours=half_life_hours, client=client)
+    return {iid: (v if isinstance(v, Exception) else v.model_dump(mode='json')) for iid, v in res.items()}
@@ -0,0 +1,162 @@
+# news/prescorer.py
+"""
+本地預評分器：喺送 deepseek-reasoner 之前，用現成嘅 bge-m3 新聞向量估 impact / sentiment。
+
+特徵 = 新聞所有 chunk 向量平均（embed_news 寫入 ResearchEmbedding，object_type='news_chunk'）
+      + log1p(連結實體數) + bias；冇向量嘅新聞就即場 encode 標題。
+頭 = ridge 回歸（numpy closed form），由 train_prescorer 用已有 LLM 分數訓練，存喺 NewsPrescorerHead。
+
+score_news 用 gate()：預測 impact 低過門檻嘅新聞直接用本地分數，唔再 call LLM。
+"""
+import io
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db.models import Count
+
+from news.entity_linking import EMBED_MODEL, load_model
+from news.models import NewsEntity, NewsItem, NewsPrescorerHead
+from news.news_scoring import NewsScores
+from research.models import ResearchEmbedding
+
+DIM = 1024
+TARGETS = ("impact_score", "sentiment_score")
+
+
+# ---- 特徵 ----
+def features(items: List[NewsItem]) -> np.ndarray:
+    """(n, DIM + 2)：平均 chunk 向量（再 normalize）、log1p(實體數)、bias"""
+    ids = [it.id for it in items]
+    sums: Dict[int, np.ndarray] = {}
+    rows = ResearchEmbedding.objects.filter(object_type="news_chunk", object_id__in=ids).values_list("object_id", "vector")
+    for nid, vec in rows.iterator():
+        v = np.asarray(vec, dtype=np.float32)
+        sums[nid] = sums[nid] + v if nid in sums else v.copy()
+
+    # 未 embed 嘅新聞：用標題頂住（同一個 bge-m3）
+    missing = [it for it in items if it.id not in sums]
+    if missing:
+        vecs = load_model().encode([it.title or "" for it in missing], normalize_embeddings=True, batch_size=64)
+        for it, v in zip(missing, vecs):
+            sums[it.id] = np.asarray(v, dtype=np.float32)
+
+    n_ents = dict(NewsEntity.objects.filter(news_id__in=ids).values("news_id")
+                  .annotate(n=Count("id")).values_list("news_id", "n"))
+
+    X = np.zeros((len(items), DIM + 2), dtype=np.float32)
+    for i, it in enumerate(items):
+        v = sums[it.id]
+        X[i, :DIM] = v / (np.linalg.norm(v) or 1.0)
+        X[i, DIM] = math.log1p(n_ents.get(it.id, 0))
+        X[i, DIM + 1] = 1.0
+    return X
+
+
+def targets(items: List[NewsItem]) -> np.ndarray:
+    return np.array([[float(it.news_scores_json["scores"][t]) for t in TARGETS] for it in items], dtype=np.float32)
+
+
+# ---- ridge ----
+def fit_ridge(X: np.ndarray, Y: np.ndarray, alpha: float = 1.0) -> np.ndarray:
+    """W = (XᵀX + αI)⁻¹ XᵀY；bias（最後一欄）唔做正則化"""
+    reg = alpha * np.eye(X.shape[1], dtype=np.float64)
+    reg[-1, -1] = 0.0
+    Xd = X.astype(np.float64)
+    return np.linalg.solve(Xd.T @ Xd + reg, Xd.T @ Y.astype(np.float64)).astype(np.float32)
+
+def predict(W: np.ndarray, X: np.ndarray) -> np.ndarray:
+    P = X @ W
+    P[:, 0] = np.clip(P[:, 0], 0.0, 1.0)
+    P[:, 1] = np.clip(P[:, 1], -1.0, 1.0)
+    return P
+
+def evaluate(P: np.ndarray, Y: np.ndarray, threshold: float) -> Dict[str, Optional[float]]:
+    """
+    saved_fraction：預測 impact < 門檻（唔使 call LLM）嘅比例；
+    agreement：門檻決定同 LLM impact 嘅決定一致嘅比例；missed_high_impact：LLM 認為高但被擋咗嘅比例。
+    """
+    n = len(Y)
+    if not n:
+        return {}
+    gated, llm_low = P[:, 0] < threshold, Y[:, 0] < threshold
+    high = ~llm_low
+    return {
+        "n": n,
+        "impact_mae": round(float(np.abs(P[:, 0] - Y[:, 0]).mean()), 4),
+        "sentiment_mae": round(float(np.abs(P[:, 1] - Y[:, 1]).mean()), 4),
+        "sentiment_sign_agreement": round(float((np.sign(P[:, 1]) == np.sign(Y[:, 1])).mean()), 4),
+        "threshold": threshold,
+        "saved_fraction": round(float(gated.mean()), 4),
+        "agreement": round(float((gated == llm_low).mean()), 4),
+        "missed_high_impact": round(float((gated & high).sum() / high.sum()), 4) if high.any() else None,
+    }
+
+def dump_weights(W: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, W.astype(np.float32), allow_pickle=False)
+    return buf.getvalue()
+
+def load_weights(blob) -> np.ndarray:
+    return np.load(io.BytesIO(bytes(blob)), allow_pickle=False)
+
+
+# ---- 進程內載入（最新一個 head）----
+_head: Optional[Tuple[int, np.ndarray]] = None
+_lock = threading.Lock()
+
+def current_head() -> Optional[Tuple[int, np.ndarray]]:
+    global _head
+    latest = NewsPrescorerHead.objects.filter(embed_model=EMBED_MODEL).order_by("-id").values_list("id", flat=True).first()
+    if latest is None:
+        return None
+    if _head is None or _head[0] != latest:
+        with _lock:
+            if _head is None or _head[0] != latest:
+                _head = (latest, load_weights(NewsPrescorerHead.objects.get(pk=latest).weights))
+    return _head
+
+
+def local_payload(item: NewsItem, impact: float, sentiment: float, head_id: int, half_life_hours: int = 72) -> dict:
+    """將本地預測包成 NewsScores 形狀，下游 rollup 照讀 scores.*"""
+    age_hours = max(0.0, (datetime.now(timezone.utc) - item.published_at).total_seconds() / 3600.0) if item.published_at else None
+    scores = NewsScores(
+        item_id=str(item.id),
+        published_at=item.published_at,
+        sentiment_overall=round(sentiment, 4),
+        credibility={"source_reputation": "medium", "cross_ref_count": 0, "has_primary_source": False},
+        scores={
+            "impact_score": round(impact, 4),
+            "sentiment_score": round(sentiment, 4),
+            # rollup_signals 嘅 base = impact × credibility × novelty × decay：
+            # 0 會令所有預評分新聞喺訊號入面消失，用同 credibility 一樣嘅中性值
+            "novelty_score": 0.5,
+            "credibility_score": 0.5,
+            "decay_half_life_hours": half_life_hours,
+            "decayed_weight": 1.0 if age_hours is None else round(math.exp(-age_hours / float(half_life_hours)), 6),
+        },
+        raw_model={"prescorer": True},
+        model_name=f"prescorer#{head_id}:{EMBED_MODEL}",
+        model_latency_ms=0,
+    )
+    return scores.model_dump(mode="json")
+
+
+def gate(items: Iterable[NewsItem], threshold: float, half_life_hours: int = 72) -> Tuple[List[Tuple[NewsItem, dict]], Dict[int, Tuple[float, float]]]:
+    """
+    回傳 (local, preds)：
+      local = [(item, 本地 payload)]，預測 impact < threshold，唔使送 LLM；
+      preds = {news_id: (impact, sentiment)}，全部新聞嘅預測（俾 score_news 同 LLM 結果比較）。
+    未訓練過 head 就乜都唔擋。
+    """
+    items = list(items)
+    head = current_head()
+    if head is None or not items or threshold <= 0:
+        return [], {}
+    head_id, W = head
+    P = predict(W, features(items))
+    preds = {it.id: (float(p[0]), float(p[1])) for it, p in zip(items, P)}
+    local = [(it, local_payload(it, *preds[it.id], head_id=head_id, half_life_hours=half_life_hours)) for it in items if preds[it.id][0] < threshold]
+    return local, preds
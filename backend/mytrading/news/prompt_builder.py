@@ -0,0 +1,140 @@
+# news/prompt_builder.py
+"""
+score_news 嘅正文壓縮：喺 token 預算內揀最相關嘅句子送 LLM。
+
+以往只送 item.title（正文喺 MinIO），送全文又太貴太慢。而家：
+  - 由 raw_text_location（default_storage）讀原文，切句；
+  - 句子評分：有連結實體 mention / ticker 嘅句子最高，前後 CONTEXT 句次之，導語（頭 LEAD 句）有少少加分；
+  - 按分數貪心揀到 budget 用完，再按原文順序砌返，中間跳咗嘅用「…」分隔；
+  - 標題永遠放第一行；冇原文（未上傳 / 讀唔到）就退返只送標題。
+token 用同 ops.llm_scheduler.estimate_tokens 一樣嘅粗略估算（~3 字元一個 token）。
+"""
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.files.storage import default_storage
+
+from news.models import NewsEntity, NewsItem
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 3
+LEAD = 3
+CONTEXT = 1
+MAX_SENTENCE_CHARS = 600
+
+# 英文句號 / 問號 / 感嘆號 + 空白，或者中文全形標點；段落換行都當斷句
+SENT_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'“A-Z0-9(])|(?<=[。！？；])|\n{2,}")
+
+
+def approx_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN
+
+
+def load_raw_text(location: str) -> str:
+    """raw_text_location 可以係 storage key 或者 s3://bucket/key；讀唔到回傳空字串"""
+    if not location:
+        return ""
+    key = location
+    if key.startswith("s3://"):
+        key = key[5:].split("/", 1)[1] if "/" in key[5:] else ""
+    try:
+        with default_storage.open(key.lstrip("/"), "rb") as fh:
+            return fh.read().decode("utf-8", errors="replace")
+    except Exception as e:
+        logger.warning("raw text unavailable for %s: %s", location, e)
+        return ""
+
+
+def split_sentences(text: str) -> List[str]:
+    out = []
+    for s in SENT_RE.split(text or ""):
+        s = " ".join((s or "").split())
+        if len(s) < 3:
+            continue
+        # 超長「句子」（表格、冇標點）截斷，唔好一句食晒預算
+        out.append(s if len(s) <= MAX_SENTENCE_CHARS else s[:MAX_SENTENCE_CHARS].rsplit(" ", 1)[0] + " …")
+    return out
+
+
+def _mention_patterns(mentions: Iterable[str]) -> Optional[re.Pattern]:
+    terms = sorted({m.strip() for m in mentions if m and len(m.strip()) >= 2}, key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile(r"(?<!\w)(?:" + "|".join(re.escape(t) for t in terms) + r")(?!\w)", re.IGNORECASE)
+
+
+def select_sentences(sentences: Sequence[str], mentions: Iterable[str], budget_tokens: int) -> List[int]:
+    """回傳揀中句子嘅 index（原文順序）"""
+    n = len(sentences)
+    pat = _mention_patterns(mentions)
+    hits = [len(pat.findall(s)) if pat else 0 for s in sentences]
+
+    score = [0.0] * n
+    for i in range(n):
+        if hits[i]:
+            score[i] += 1.0 + 0.25 * min(hits[i], 4)
+            for j in range(max(0, i - CONTEXT), min(n, i + CONTEXT + 1)):
+                if j != i:
+                    score[j] += 0.4
+        if i < LEAD:
+            score[i] += 0.3 * (LEAD - i) / LEAD
+
+    chosen, used = [], 0
+    # 分數高先；同分就早出現嘅先
+    for i in sorted(range(n), key=lambda k: (-score[k], k)):
+        if score[i] <= 0 and chosen:
+            break
+        cost = approx_tokens(sentences[i]) + 1
+        if used + cost > budget_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    return sorted(chosen)
+
+
+def compact_body(title: str, raw_text: str, mentions: Iterable[str], budget_tokens: int) -> Tuple[str, Dict[str, object]]:
+    """回傳 (body, meta)；meta 記 token 數等，俾 score_news 統計"""
+    title = (title or "").strip()
+    sentences = split_sentences(raw_text)
+    meta: Dict[str, object] = {
+        "budget_tokens": budget_tokens, "raw_tokens": approx_tokens(raw_text),
+        "sentences_total": len(sentences), "sentences_kept": 0, "source": "title",
+    }
+    if budget_tokens <= 0 or not sentences:
+        meta["body_tokens"] = approx_tokens(title)
+        return title, meta
+
+    keep = select_sentences(sentences, mentions, max(0, budget_tokens - approx_tokens(title)))
+    parts, prev = [], -1
+    for i in keep:
+        if prev >= 0 and i != prev + 1:
+            parts.append("…")
+        parts.append(sentences[i])
+        prev = i
+    body = title + ("\n\n" + " ".join(parts) if parts else "")
+    meta.update(sentences_kept=len(keep), source="raw", body_tokens=approx_tokens(body))
+    return body, meta
+
+
+def build_bodies(items: Sequence[NewsItem], budget_tokens: int, tickers: Optional[Dict[int, List[str]]] = None,
+                 max_workers: int = 8) -> Dict[int, Tuple[str, Dict[str, object]]]:
+    """
+    {news_id: (body, meta)}。實體 mention（NewsEntity.text / ticker）+ 呼叫方俾嘅 tickers 當關鍵詞；
+    原文喺 MinIO，用 thread pool 並行讀。
+    """
+    items = list(items)
+    if budget_tokens <= 0:
+        return {it.id: compact_body(it.title, "", (), 0) for it in items}
+
+    mentions: Dict[int, set] = {it.id: set((tickers or {}).get(it.id) or []) for it in items}
+    for nid, text, ticker in NewsEntity.objects.filter(news_id__in=[it.id for it in items]).values_list("news_id", "text", "ticker"):
+        mentions[nid].add(text)
+        if ticker:
+            mentions[nid].add(ticker)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        texts = list(pool.map(lambda it: load_raw_text(it.raw_text_location), items))
+    return {it.id: compact_body(it.title, raw, mentions[it.id], budget_tokens) for it, raw in zip(items, texts)}
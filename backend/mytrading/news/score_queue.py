@@ -0,0 +1,112 @@
+# news/score_queue.py
+"""
+新聞 LLM 評分隊列。
+
+以往 score_news 掃「最近 N 小時 或 未評分」再按 published_at 升序做，先啃晒舊歷史先到今日嘅新聞，
+已評分嘅仲要喺 Python 逐條 skip。而家：
+  - enqueue()：未評分新聞入 NewsScoreQueue，一次過計好 priority；
+  - claim()：SELECT ... FOR UPDATE SKIP LOCKED 按 priority 取一批，幾個 worker 並行都唔會重覆；
+  - complete() / fail()：寫返結果；失敗未到上限就放返 pending；
+  - requeue_stale()：claim 咗超過租約（CELERY_TASK_TIME_LIMIT + 餘量，worker 死咗）嘅放返 pending。
+
+priority = published_at（epoch 小時）+ ENTITY_BONUS_HOURS × log1p(連結實體數)
+等價於按 exp(-age / τ) × (1 + n_entities)^k 排序，但唔隨時間變，入隊後毋須重算。
+"""
+import math
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+from django.utils import timezone
+
+from news.models import NewsItem, NewsScoreQueue
+
+# 多一個連結實體 ≈ 新咗幾多小時（log 尺度）：log1p(3) × 6 ≈ 8 小時
+ENTITY_BONUS_HOURS = 6.0
+MAX_ATTEMPTS = 3
+# claim 租約 = 任務硬時限 + 呢個餘量；超過仲係 claimed 即係 worker 已經俾 Celery 殺咗
+LEASE_MARGIN_S = 60
+
+
+def priority(published_at, n_entities: int) -> float:
+    hours = published_at.timestamp() / 3600.0 if published_at else 0.0
+    return round(hours + ENTITY_BONUS_HOURS * math.log1p(max(0, n_entities)), 4)
+
+
+def enqueue(since_hours: int = 24 * 7, force: bool = False, news_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    將窗口內未評分（force = 全部）嘅新聞入隊；已喺隊內嘅：force 就重設為 pending 並更新 priority，
+    否則只刷新仲係 pending 嗰啲嘅 priority / n_entities（入隊後先 link 到實體都會升級），claimed / done 唔郁。
+    """
+    qs = NewsItem.objects.filter(title__isnull=False).exclude(title="")
+    if news_ids is not None:
+        qs = qs.filter(id__in=list(news_ids))
+    else:
+        qs = qs.filter(published_at__gte=timezone.now() - timezone.timedelta(hours=since_hours))
+    if not force:
+        qs = qs.filter(news_scores_json__isnull=True)
+
+    rows = [
+        NewsScoreQueue(news_id=nid, priority=priority(pub, n), n_entities=n)
+        for nid, pub, n in qs.annotate(n=Count("entities")).values_list("id", "published_at", "n").iterator()
+    ]
+    if not rows:
+        return 0
+    if force:
+        NewsScoreQueue.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=["news"],
+            update_fields=["priority", "n_entities", "status", "attempts", "claimed_by", "claimed_at", "last_error"],
+        )
+    else:
+        # update_conflicts 唔可以加 WHERE status='pending'，所以分兩步：新行 insert，舊嘅 pending 行 bulk_update
+        pending = set(NewsScoreQueue.objects.filter(news_id__in=[r.news_id for r in rows], status="pending")
+                      .values_list("news_id", flat=True))
+        NewsScoreQueue.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+        NewsScoreQueue.objects.bulk_update([r for r in rows if r.news_id in pending],
+                                           ["priority", "n_entities"], batch_size=1000)
+    return len(rows)
+
+
+def claim(n: int, worker: str) -> List[NewsScoreQueue]:
+    """搶最多 n 條 pending（priority 高先）；返回嘅行已 select_related news"""
+    with transaction.atomic():
+        ids = list(
+            NewsScoreQueue.objects.select_for_update(skip_locked=True)
+            .filter(status="pending")
+            .order_by("-priority")
+            .values_list("news_id", flat=True)[:n]
+        )
+        if not ids:
+            return []
+        NewsScoreQueue.objects.filter(news_id__in=ids).update(
+            status="claimed", claimed_by=worker[:80], claimed_at=timezone.now(), attempts=F("attempts") + 1,
+        )
+    rows = {r.news_id: r for r in NewsScoreQueue.objects.select_related("news").filter(news_id__in=ids)}
+    return [rows[i] for i in ids if i in rows]
+
+
+def complete(news_ids: Iterable[int]) -> int:
+    return NewsScoreQueue.objects.filter(news_id__in=list(news_ids)).update(status="done", last_error="")
+
+
+def fail(errors: Dict[int, str], max_attempts: int = MAX_ATTEMPTS) -> int:
+    """未到 max_attempts 放返 pending 等下一輪，否則標 failed"""
+    status = Case(When(attempts__lt=max_attempts, then=Value("pending")), default=Value("failed"))
+    for nid, err in errors.items():
+        NewsScoreQueue.objects.filter(news_id=nid).update(last_error=str(err)[:2000], status=status)
+    return len(errors)
+
+
+def lease_seconds() -> int:
+    return int(getattr(settings, "CELERY_TASK_TIME_LIMIT", 600)) + LEASE_MARGIN_S
+
+
+def requeue_stale(seconds: Optional[int] = None) -> int:
+    """claim 咗超過 seconds（預設 lease_seconds()）仍未完成嘅放返 pending"""
+    cutoff = timezone.now() - timezone.timedelta(seconds=seconds or lease_seconds())
+    return NewsScoreQueue.objects.filter(status="claimed", claimed_at__lt=cutoff).update(status="pending")
+
+
+def depth() -> Dict[str, int]:
+    return dict(NewsScoreQueue.objects.values("status").annotate(n=Count("news_id")).values_list("status", "n"))
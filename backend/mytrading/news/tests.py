@@ -1,3 +1,118 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from news import prescorer, score_queue
+from news.models import NewsItem, NewsPrescorerHead, NewsScoreQueue
+from ops.mock_llm import news_payload
+
+
+def _fake_features(items):
+    """唔載 bge-m3：用 item id 砌固定特徵（+ bias 欄）"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(len(items), prescorer.DIM + 2)).astype(np.float32)
+    X[:, -1] = 1.0
+    return X
+
+
+class TrainPrescorerTests(TestCase):
+    def _item(self, i, payload):
+        return NewsItem.objects.create(
+            source="test", title=f"headline {i}", url=f"https://example.com/{i}",
+            published_at=timezone.now() - timezone.timedelta(hours=i), news_scores_json=payload,
+        )
+
+    def test_trains_on_llm_scored_rows_and_skips_prescorer_rows(self):
+        for i in range(24):
+            self._item(i, news_payload(str(i)))
+        for i in range(24, 29):
+            payload = news_payload(str(i))
+            payload["raw_model"] = {"prescorer": True}
+            payload["model_name"] = "prescorer#1:bge-m3"
+            self._item(i, payload)
+
+        with mock.patch.object(prescorer, "features", side_effect=_fake_features) as feats:
+            call_command("train_prescorer", "--val-frac", "0.25", stdout=mock.MagicMock())
+
+        head = NewsPrescorerHead.objects.get()
+        self.assertEqual(head.n_train, 24)
+        trained_on = feats.call_args[0][0]
+        self.assertTrue(all(not (it.news_scores_json.get("raw_model") or {}).get("prescorer") for it in trained_on))
+        W = prescorer.load_weights(head.weights)
+        self.assertEqual(W.shape, (prescorer.DIM + 2, len(prescorer.TARGETS)))
+
+
+class LocalPayloadTests(SimpleTestCase):
+    def test_prescored_item_keeps_a_nonzero_rollup_weight(self):
+        item = NewsItem(id=7, title="headline", published_at=timezone.now() - timezone.timedelta(hours=1))
+        scores = prescorer.local_payload(item, impact=0.2, sentiment=-0.3, head_id=1)["scores"]
+        base = scores["impact_score"] * scores["credibility_score"] * scores["novelty_score"] * scores["decayed_weight"]
+        self.assertGreater(base, 0.0)
+        self.assertEqual(scores["novelty_score"], 0.5)
+
+
+class ScoreQueueTests(TestCase):
+    def _item(self, i, hours_ago):
+        return NewsItem.objects.create(
+            source="test", title=f"headline {i}", url=f"https://example.com/q{i}",
+            published_at=timezone.now() - timezone.timedelta(hours=hours_ago),
+        )
+
+    def test_enqueue_refreshes_priority_of_pending_rows_only(self):
+        a, b = self._item(1, 10), self._item(2, 10)
+        self.assertEqual(score_queue.enqueue(news_ids=[a.id, b.id]), 2)
+        score_queue.claim(1, "w1")
+        claimed = NewsScoreQueue.objects.get(status="claimed")
+        before = claimed.priority
+
+        NewsItem.objects.filter(id__in=[a.id, b.id]).update(published_at=timezone.now())
+        score_queue.enqueue(news_ids=[a.id, b.id])
+
+        pending = NewsScoreQueue.objects.get(status="pending")
+        self.assertAlmostEqual(pending.priority, score_queue.priority(pending.news.published_at, 0), places=3)
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.priority), ("claimed", before))
+
+    def test_requeue_stale_uses_task_time_limit_lease(self):
+        item = self._item(3, 1)
+        score_queue.enqueue(news_ids=[item.id])
+        score_queue.claim(1, "w1")
+        lease = score_queue.lease_seconds()
+        NewsScoreQueue.objects.update(claimed_at=timezone.now() - timezone.timedelta(seconds=lease - 30))
+        self.assertEqual(score_queue.requeue_stale(), 0)
+        NewsScoreQueue.objects.update(claimed_at=timezone.now() - timezone.timedelta(seconds=lease + 30))
+        self.assertEqual(score_queue.requeue_stale(), 1)
+        self.assertEqual(NewsScoreQueue.objects.get().status, "pending")
+
+    def test_fail_requeues_until_max_attempts_then_marks_failed(self):
+        item = self._item(4, 1)
+        score_queue.enqueue(news_ids=[item.id])
+        for attempt in range(1, score_queue.MAX_ATTEMPTS + 1):
+            self.assertEqual([r.news_id for r in score_queue.claim(5, "w1")], [item.id])
+            score_queue.fail({item.id: f"boom {attempt}"})
+            row = NewsScoreQueue.objects.get()
+            self.assertEqual(row.attempts, attempt)
+            self.assertEqual(row.last_error, f"boom {attempt}")
+            expected = "failed" if attempt >= score_queue.MAX_ATTEMPTS else "pending"
+            self.assertEqual(row.status, expected)
+        self.assertEqual(score_queue.claim(5, "w1"), [])
+
+    def test_claim_orders_by_priority_and_skips_claimed(self):
+        old, new = self._item(5, 48), self._item(6, 1)
+        score_queue.enqueue(news_ids=[old.id, new.id])
+        self.assertEqual([r.news_id for r in score_queue.claim(1, "w1")], [new.id])
+        self.assertEqual([r.news_id for r in score_queue.claim(5, "w2")], [old.id])
+        score_queue.complete([new.id])
+        self.assertEqual(score_queue.depth(), {"done": 1, "claimed": 1})
+
+    def test_force_enqueue_resets_finished_rows(self):
+        item = self._item(7, 1)
+        score_queue.enqueue(news_ids=[item.id])
+        score_queue.claim(1, "w1")
+        score_queue.fail({item.id: "boom"}, max_attempts=1)
+        score_queue.enqueue(news_ids=[item.id], force=True)
+        row = NewsScoreQueue.objects.get()
+        self.assertEqual((row.status, row.attempts, row.last_error), ("pending", 0, ""))
@@ -3,7 +3,6 @@ import os, json, requests
 from collections import defaultdict
 from typing import List, Dict, Tuple
 from django.http import JsonResponse, Http404
-from django.db import connection
 from django.apps import apps as django_apps
 from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
@@ -12,6 +11,7 @@ from datetime import datetime
 
 from news.models import NewsItem, NewsChunk
 from news.utils import extract_main_text, detect_lang, sha256_str, chunk_text, now_utc
+from research.vector_search import research_topk
 
 RESEARCH_TYPES = (
     "company_profile","company_risk","company_catalyst","company_thesis",
@@ -37,26 +37,10 @@ def fetch_news_vectors(news_id: int) -> Dict[int, List[float]]:
 
 def topk_from_research(qv: List[float], k: int):
     """
-    用 pgvector cosine 檢索研究 embeddings（命中 HNSW cos 索引）。
+    用 pgvector cosine 檢索研究 embeddings（命中 HNSW cos 索引，向量以 binary 傳送）。
     回傳: [(object_type, object_id, chunk_id, sim, meta_json)]
     """
-    # 將 Python list 轉換為 PostgreSQL vector 格式
-    vector_str = '[' + ','.join(map(str, qv)) + ']'
-    
-    sql = """
-    SELECT object_type, object_id, chunk_id,
-           1 - (vector <=> %s::vector) AS sim,
-           meta
-    FROM research_researchembedding
-    WHERE object_type = ANY(%s)
-    ORDER BY vector <=> %s::vector
-    LIMIT %s;
-    """
-    with connection.cursor() as cur:
-        cur.execute(sql, [vector_str, list(RESEARCH_TYPES), vector_str, k])
-        rows = cur.fetchall()
-    # rows: obj_type, obj_id, chunk_id, sim, meta(dict)
-    return rows
+    return research_topk(qv, RESEARCH_TYPES, k=k, with_meta=True)
 
 @require_GET
 def news_matches(request, news_id: int):
@@ -220,14 +204,8 @@ def analyze_url(request):
         agg = {}  # key -> dict
         
         for i, (chunk_text_content, qv) in enumerate(zip(chunks, chunk_vectors)):
-            # 将numpy array转换为list
-            if hasattr(qv, 'tolist'):
-                qv_list = qv.tolist()
-            else:
-                qv_list = list(qv)
-            
-            # 使用现有的研究匹配函数
-            rows = topk_from_research(qv_list, k=topk)
+            # 使用现有的研究匹配函数（numpy array 直接 binary 傳送，毋須轉 list）
+            rows = topk_from_research(qv, k=topk)
             
             for obj_type, obj_id, r_chunk_id, sim, meta in rows:
                 key = (obj_type, obj_id)
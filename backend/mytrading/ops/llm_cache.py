@@ -0,0 +1,133 @@
+# ops/llm_cache.py
+"""
+LLM 回應 cache（Redis，經 Django cache）。
+
+score_news --force、驗證失敗後重試、重跑 gen_company_ai / gen_industry_ai 成日送完全一樣嘅 prompt，
+每次都要等 DeepSeek 兼俾錢。呢度按 (model, temperature, sha256(messages + response_format)) cache 回應：
+  - TTL：LLM_CACHE_TTL 秒（0 = 停用）；
+  - 大小：單個 entry 超過 LLM_CACHE_MAX_ENTRY_BYTES 唔 cache；
+    寫入數超過 LLM_CACHE_MAX_ENTRIES 就 bump 代號（generation），舊 entry 由 TTL / Redis 淘汰；
+  - bypass：LLM_CACHE_BYPASS=1 全局略過，或者每次 call 傳 use_cache=False；
+    refresh=True 唔讀 cache 但會用新結果覆蓋（重試時用，避免重用同一個壞回應）；
+  - 命中率：進程內計數 + Redis 跨進程計數，stats() 一齊回傳。
+"""
+import hashlib
+import json
+import logging
+import pickle
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "llmcache:gen"
+COUNT_KEY = "llmcache:n"
+STATS_KEY = "llmcache:stats:{namespace}:{field}"
+STAT_FIELDS = ("hits", "misses", "stores", "too_large", "errors")
+
+_local = {f: 0 for f in STAT_FIELDS}
+_local_by_ns: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return settings.LLM_CACHE_TTL > 0 and not settings.LLM_CACHE_BYPASS
+
+def make_key(model: str, temperature: float, messages: List[Dict[str, str]], extra: Optional[Dict] = None) -> str:
+    blob = json.dumps({"messages": messages, "extra": extra or {}}, ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(blob.encode("utf-8")).hexdigest()
+    return f"{model}:t{float(temperature):g}:{digest}"
+
+def _generation() -> int:
+    return int(cache.get_or_set(GENERATION_KEY, 1, timeout=None))
+
+def _bump(namespace: str, field: str):
+    with _lock:
+        _local[field] += 1
+        ns = _local_by_ns.setdefault(namespace, {f: 0 for f in STAT_FIELDS})
+        ns[field] += 1
+    try:
+        key = STATS_KEY.format(namespace=namespace, field=field)
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+    except Exception:
+        pass
+
+def _count_store():
+    """寫入計數；超過上限就換代（舊 key 唔再讀到，等 TTL 過期）"""
+    cache.add(COUNT_KEY, 0, timeout=None)
+    if cache.incr(COUNT_KEY) > settings.LLM_CACHE_MAX_ENTRIES:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        cache.incr(GENERATION_KEY)
+        cache.set(COUNT_KEY, 0, timeout=None)
+        logger.info("LLM cache reached %s entries; rotated generation", settings.LLM_CACHE_MAX_ENTRIES)
+
+def cached_call(
+    namespace: str,
+    *,
+    model: str,
+    temperature: float,
+    messages: List[Dict[str, str]],
+    fn: Callable[[], Any],
+    extra: Optional[Dict] = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> Tuple[Any, bool]:
+    """
+    回傳 (value, hit)。有 cache 就直接回傳，否則 call fn() 並寫入。
+    fn 拋例外就唔會寫入（壞回應唔會被 cache）；cache 本身出錯只記 log，照直 call fn()。
+    """
+    if not (use_cache and enabled()):
+        return fn(), False
+
+    full_key = None
+    try:
+        full_key = f"llm:{_generation()}:{namespace}:{make_key(model, temperature, messages, extra)}"
+        if not refresh:
+            hit = cache.get(full_key)
+            if hit is not None:
+                _bump(namespace, "hits")
+                return pickle.loads(hit), True
+    except Exception as e:
+        logger.warning("LLM cache read failed, calling model directly: %s", e)
+        _bump(namespace, "errors")
+    _bump(namespace, "misses")
+
+    value = fn()
+
+    if full_key is not None:
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(blob) > settings.LLM_CACHE_MAX_ENTRY_BYTES:
+                _bump(namespace, "too_large")
+            else:
+                cache.set(full_key, blob, timeout=settings.LLM_CACHE_TTL)
+                _count_store()
+                _bump(namespace, "stores")
+        except Exception as e:
+            logger.warning("LLM cache write failed: %s", e)
+            _bump(namespace, "errors")
+    return value, False
+
+def _hit_rate(d: Dict[str, int]) -> Optional[float]:
+    n = d.get("hits", 0) + d.get("misses", 0)
+    return round(d.get("hits", 0) / n, 4) if n else None
+
+def stats(namespaces=("deepseek_chat", "llm_json")) -> Dict[str, Any]:
+    """進程內 + Redis 累計嘅命中率"""
+    with _lock:
+        local = {**_local, "hit_rate": _hit_rate(_local)}
+        by_ns = {ns: {**d, "hit_rate": _hit_rate(d)} for ns, d in _local_by_ns.items()}
+    shared = {}
+    try:
+        for ns in namespaces:
+            keys = {STATS_KEY.format(namespace=ns, field=f): f for f in STAT_FIELDS}
+            got = cache.get_many(list(keys))
+            d = {f: int(got.get(k, 0)) for k, f in keys.items()}
+            shared[ns] = {**d, "hit_rate": _hit_rate(d)}
+    except Exception:
+        shared = None
+    return {"enabled": enabled(), "process": local, "process_by_namespace": by_ns, "shared": shared}
@@ -0,0 +1,151 @@
+# ops/llm_ledger.py
+"""
+LLM call ledger：每次 call 寫一行 ops.LLMCall（caller、model、prompt / completion token、latency、重試、結果、成本）。
+
+以往 NewsScores.model_latency_ms 逐條記低但冇人匯總，llm_json 乜都唔記，唔知邊個 pipeline 階段最燒錢。
+  - call()：包住 scheduler.run，成功 / 失敗都記（DeepSeekClient._post 同 llm_json 用）；
+  - record_cached()：llm_cache 命中都記一行（outcome='cached'），睇到每個階段嘅命中率；
+  - rollup()：按 日 × caller × model 匯總 p50 / p95 latency、token、成本（llm_usage_report / /api/metrics/llm/）。
+寫 ledger 失敗只會 log warning，唔會拖冧 LLM call。
+ThreadPool worker 入面 call 會喺個線程開自己嘅 DB 連線：worker task 要用 in_worker() 包住，做完即 close。
+"""
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from ops.llm_scheduler import LLMScheduler, SchedulerTimeout, TransientLLMError
+from ops.models import LLMCall
+
+logger = logging.getLogger(__name__)
+
+
+def cost_of(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = (settings.LLM_PRICES_PER_M or {}).get(model, (0.0, 0.0))
+    return (prompt_tokens * float(price_in) + completion_tokens * float(price_out)) / 1_000_000
+
+
+def record(caller: str, model: str, *, outcome: str = "ok", prompt_tokens: int = 0, completion_tokens: int = 0,
+           latency_ms: int = 0, wall_ms: int = 0, queued_ms: int = 0, retries: int = 0, error: str = "") -> None:
+    if not settings.LLM_LEDGER_ENABLED:
+        return
+    try:
+        LLMCall.objects.create(
+            caller=caller[:80], model=(model or "")[:80], outcome=outcome,
+            prompt_tokens=int(prompt_tokens or 0), completion_tokens=int(completion_tokens or 0),
+            latency_ms=int(latency_ms or 0), wall_ms=int(wall_ms or 0), queued_ms=int(queued_ms or 0),
+            retries=max(0, int(retries or 0)), error=(error or "")[:500],
+            cost_usd=cost_of(model, int(prompt_tokens or 0), int(completion_tokens or 0)),
+        )
+    except Exception as e:
+        logger.warning("LLM ledger write failed (%s/%s): %s", caller, model, e)
+
+
+def record_cached(caller: str, model: str) -> None:
+    record(caller, model, outcome="cached")
+
+
+def in_worker(fn: Callable) -> Callable:
+    """
+    包住 ThreadPoolExecutor 嘅 task：task 完就 close 呢個線程嘅 DB 連線。
+    Django 連線係 per-thread，worker 寫 ledger 開咗嘅連線唔會自己收，池一大就食晒 max_connections。
+    只可以喺 worker 線程用（主線程嘅連線會俾佢 close 埋）。
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connection.close()
+    return wrapper
+
+
+def call(caller: str, model: str, scheduler: LLMScheduler, fn: Callable[[], Any], *, est_tokens: int,
+         usage_of: Callable[[Any], Tuple[int, int]]) -> Any:
+    """
+    scheduler.run(fn) 並記一行 ledger；usage_of(result) -> (prompt_tokens, completion_tokens)。
+    例外照拋（outcome = transient_error / timeout / error）。
+    """
+    trace: Dict[str, Any] = {}
+    t0 = time.perf_counter()
+
+    def done(outcome, p=0, c=0, error=""):
+        record(caller, model, outcome=outcome, prompt_tokens=p, completion_tokens=c,
+               latency_ms=trace.get("last_ms", 0), wall_ms=int((time.perf_counter() - t0) * 1000),
+               queued_ms=trace.get("queued_ms", 0), retries=trace.get("attempts", 1) - 1, error=error)
+
+    try:
+        result = scheduler.run(fn, est_tokens=est_tokens, usage_of=lambda r: sum(usage_of(r)) or None, trace=trace)
+    except SchedulerTimeout as e:
+        done("timeout", error=str(e))
+        raise
+    except TransientLLMError as e:
+        done("transient_error", error=str(e))
+        raise
+    except Exception as e:
+        done("error", error=repr(e))
+        raise
+    done("ok", *usage_of(result))
+    return result
+
+
+# ---- 匯總 ----
+ROLLUP_SQL = """
+SELECT date_trunc('day', created_at) AS day, caller, model,
+       count(*) AS calls,
+       count(*) FILTER (WHERE outcome = 'cached') AS cached,
+       count(*) FILTER (WHERE outcome NOT IN ('ok', 'cached')) AS failed,
+       coalesce(sum(retries), 0) AS retries,
+       coalesce(sum(prompt_tokens), 0) AS prompt_tokens,
+       coalesce(sum(completion_tokens), 0) AS completion_tokens,
+       coalesce(sum(cost_usd), 0) AS cost_usd,
+       percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE outcome = 'ok') AS p50_ms,
+       percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE outcome = 'ok') AS p95_ms,
+       percentile_cont(0.95) WITHIN GROUP (ORDER BY wall_ms) FILTER (WHERE outcome = 'ok') AS p95_wall_ms
+  FROM {table}
+ WHERE created_at >= %s {caller_filter}
+ GROUP BY 1, 2, 3
+ ORDER BY 1 DESC, cost_usd DESC
+"""
+
+def rollup(days: int = 7, caller: Optional[str] = None) -> List[Dict[str, Any]]:
+    """每 日 × caller × model 一行；p50 / p95 只計成功嘅 call"""
+    since = timezone.now() - timezone.timedelta(days=days)
+    params: List[Any] = [since]
+    caller_filter = ""
+    if caller:
+        caller_filter = "AND caller = %s"
+        params.append(caller)
+    sql = ROLLUP_SQL.format(table=connection.ops.quote_name(LLMCall._meta.db_table), caller_filter=caller_filter)
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        cols = [c[0] for c in cur.description]
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+    for r in rows:
+        r["day"] = r["day"].date().isoformat()
+        r["total_tokens"] = int(r["prompt_tokens"]) + int(r["completion_tokens"])
+        r["cost_usd"] = round(float(r["cost_usd"]), 4)
+        for k in ("p50_ms", "p95_ms", "p95_wall_ms"):
+            r[k] = round(float(r[k]), 1) if r[k] is not None else None
+    return rows
+
+
+def by_caller(rows: List[Dict[str, Any]], days: int) -> List[Dict[str, Any]]:
+    """rollup() 再按 caller 合併（成本高嘅排先）：tokens_per_day 用嚟搵最貴嘅 pipeline 階段"""
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        agg = out.setdefault(r["caller"], {"caller": r["caller"], "calls": 0, "cached": 0, "failed": 0, "retries": 0,
+                                           "total_tokens": 0, "cost_usd": 0.0, "worst_p95_ms": None})
+        for k in ("calls", "cached", "failed", "retries", "total_tokens"):
+            agg[k] += int(r[k])
+        agg["cost_usd"] += r["cost_usd"]
+        if r["p95_ms"] is not None:
+            agg["worst_p95_ms"] = max(agg["worst_p95_ms"] or 0.0, r["p95_ms"])
+    for agg in out.values():
+        agg["tokens_per_day"] = round(agg["total_tokens"] / max(1, days), 1)
+        agg["cost_usd"] = round(agg["cost_usd"], 4)
+    return sorted(out.values(), key=lambda a: (-a["cost_usd"], -a["total_tokens"]))
@@ -0,0 +1,263 @@
+# ops/llm_scheduler.py
+"""
+共用 LLM 排程器（跨進程，經 Django cache / Redis）。
+
+以往 extract_news_scores 固定 sleep(0.8 * (attempt + 1))、llm_json 用 tenacity，兩邊都唔知供應商限流同每小時 token 預算，
+一多 worker 就 429 連環爆。而家所有 DeepSeek call 都行 get_scheduler().run(fn, est_tokens)：
+  - 每分鐘請求數（LLM_RPM）同每小時 token 預算（LLM_TOKENS_PER_HOUR）：fixed-window 計數，爆咗就排隊等下一個窗口；
+  - 429 / Retry-After：全局暫停到指定時間，所有 worker 一齊等，唔會各自狂撞；
+  - 斷路器：連續 LLM_BREAKER_FAILURES 次失敗就打開 LLM_BREAKER_COOLDOWN_S 秒，期間 call 者排隊；
+  - 排隊超過 LLM_MAX_QUEUE_WAIT_S 先拋 SchedulerTimeout。
+token 先用估算值預留，call 完再按實際 usage 修正。
+"""
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimited(RuntimeError):
+    """供應商回 429；retry_after 係秒數（冇 header 就 None）"""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TransientLLMError(RuntimeError):
+    """5xx / 連線錯誤：值得重試，亦計入斷路器"""
+
+class SchedulerTimeout(RuntimeError):
+    pass
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Retry-After 可以係秒數或者 HTTP 日期"""
+    if value in (None, ""):
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except Exception:
+        return None
+
+def estimate_tokens(messages, completion: Optional[int] = None) -> int:
+    """粗略估算：~3 字元一個 token（中英混合偏保守）+ 預留 completion"""
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // 3 + (settings.LLM_EST_COMPLETION_TOKENS if completion is None else completion)
+
+
+class LLMScheduler:
+    def __init__(self, name: str, rpm: int, tokens_per_hour: int, breaker_failures: int,
+                 breaker_cooldown_s: float, max_wait_s: float, max_retries: int = 4):
+        self.name = name
+        self.rpm = rpm
+        self.tokens_per_hour = tokens_per_hour
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown_s = breaker_cooldown_s
+        self.max_wait_s = max_wait_s
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "queued": 0, "waited_s": 0.0, "rate_limited": 0,
+                       "transient_errors": 0, "breaker_opens": 0, "tokens_reserved": 0, "tokens_used": 0}
+
+    # ---- cache keys ----
+    def _k(self, suffix: str) -> str:
+        return f"llmsched:{self.name}:{suffix}"
+
+    def _bump(self, field: str, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def _incr(self, key: str, delta: int, timeout: int) -> int:
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key, delta)
+
+    # ---- 限流 / 暫停 / 斷路器 ----
+    def _blocked_until(self) -> float:
+        """全局暫停（Retry-After）同斷路器打開時間，取較遲嗰個"""
+        got = cache.get_many([self._k("pause_until"), self._k("open_until")])
+        return max(float(got.get(self._k("pause_until")) or 0), float(got.get(self._k("open_until")) or 0))
+
+    def _try_reserve(self, est_tokens: int) -> Tuple[bool, float]:
+        """試佔一個請求 + est_tokens；唔得就回傳 (False, 建議等幾耐)"""
+        now = time.time()
+        blocked = self._blocked_until()
+        if blocked > now:
+            return False, blocked - now
+
+        minute, hour = int(now // 60), int(now // 3600)
+        if self.rpm > 0:
+            key = self._k(f"rpm:{minute}")
+            if self._incr(key, 1, timeout=120) > self.rpm:
+                cache.decr(key)
+                return False, 60 - now % 60
+        if self.tokens_per_hour > 0:
+            key = self._k(f"tok:{hour}")
+            if self._incr(key, est_tokens, timeout=7200) > self.tokens_per_hour:
+                cache.decr(key, est_tokens)
+                if self.rpm > 0:
+                    cache.decr(self._k(f"rpm:{minute}"))
+                return False, 3600 - now % 3600
+        return True, 0.0
+
+    def acquire(self, est_tokens: int, deadline: Optional[float] = None) -> int:
+        """阻塞直到攞到配額；回傳預留咗嘅 token 所屬嘅小時窗口。deadline（epoch 秒）預設 = 而家 + max_wait_s"""
+        t0 = time.time()
+        deadline = t0 + self.max_wait_s if deadline is None else deadline
+        queued = False
+        while True:
+            try:
+                ok, wait_s = self._try_reserve(est_tokens)
+            except Exception as e:
+                # cache 唔得就唔限流（同 llm_cache 一樣，唔好因為 Redis 拖死 LLM call）
+                logger.warning("LLM scheduler unavailable, not throttling: %s", e)
+                return int(time.time() // 3600)
+            if ok:
+                if queued:
+                    self._bump("waited_s", time.time() - t0)
+                self._bump("tokens_reserved", est_tokens)
+                return int(time.time() // 3600)
+            if not queued:
+                queued = True
+                self._bump("queued")
+            if time.time() + wait_s > deadline:
+                raise SchedulerTimeout(f"LLM scheduler '{self.name}': would wait > {self.max_wait_s}s")
+            # 分段瞓 + jitter，等其他 worker 唔會同一刻醒
+            time.sleep(min(wait_s, 5.0) + random.uniform(0, 0.25))
+
+    def settle(self, hour: int, est_tokens: int, used_tokens: Optional[int]):
+        """按實際 usage 修正 token 計數"""
+        if used_tokens is None:
+            return
+        self._bump("tokens_used", used_tokens)
+        if self.tokens_per_hour <= 0 or used_tokens == est_tokens:
+            return
+        try:
+            key = self._k(f"tok:{hour}")
+            if used_tokens > est_tokens:
+                self._incr(key, used_tokens - est_tokens, timeout=7200)
+            else:
+                cache.decr(key, est_tokens - used_tokens)
+        except Exception:
+            pass
+
+    def on_rate_limited(self, retry_after: Optional[float], deadline: Optional[float] = None):
+        self._bump("rate_limited")
+        pause = retry_after if retry_after is not None else 5.0
+        if deadline is not None and time.time() + pause > deadline:
+            raise SchedulerTimeout(f"LLM scheduler '{self.name}': rate limited past {self.max_wait_s}s budget "
+                                   f"(Retry-After {pause:g}s)")
+        try:
+            until = time.time() + pause
+            if until > float(cache.get(self._k("pause_until")) or 0):
+                cache.set(self._k("pause_until"), until, timeout=int(pause) + 5)
+        except Exception:
+            time.sleep(pause)
+
+    def on_failure(self):
+        self._bump("transient_errors")
+        try:
+            n = self._incr(self._k("failures"), 1, timeout=int(self.breaker_cooldown_s * 4))
+            if n >= self.breaker_failures:
+                cache.set(self._k("open_until"), time.time() + self.breaker_cooldown_s,
+                          timeout=int(self.breaker_cooldown_s) + 5)
+                cache.set(self._k("failures"), 0, timeout=int(self.breaker_cooldown_s * 4))
+                self._bump("breaker_opens")
+                logger.warning("LLM circuit breaker '%s' open for %ss after %s failures",
+                               self.name, self.breaker_cooldown_s, n)
+        except Exception:
+            pass
+
+    def on_success(self):
+        try:
+            cache.delete(self._k("failures"))
+        except Exception:
+            pass
+
+    # ---- 主入口 ----
+    def run(self, fn: Callable[[], Any], est_tokens: int,
+            usage_of: Callable[[Any], Optional[int]] = lambda r: None,
+            trace: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        排隊攞配額 → fn()。429 照 Retry-After 全局暫停後再排隊（唔計重試次數）；
+        TransientLLMError 指數退避重試 max_retries 次，並計入斷路器；其他例外直接拋。
+        排隊 + 429 暫停 + 退避加埋共用一個 max_wait_s 期限，超過就拋 SchedulerTimeout（供應商一直 429 都唔會無限循環）。
+        trace（可選）：填返 attempts / queued_ms / last_ms（最後一次 fn() 用時），俾 ops.llm_ledger 記錄。
+        """
+        attempt = 0
+        deadline = time.time() + self.max_wait_s
+        trace = {} if trace is None else trace
+        trace.update(attempts=0, queued_ms=0, last_ms=0)
+        while True:
+            t0 = time.time()
+            hour = self.acquire(est_tokens, deadline)
+            t1 = time.time()
+            trace["queued_ms"] += int((t1 - t0) * 1000)
+            trace["attempts"] += 1
+            self._bump("calls")
+            try:
+                try:
+                    result = fn()
+                finally:
+                    trace["last_ms"] = int((time.time() - t1) * 1000)
+            except RateLimited as e:
+                self.settle(hour, est_tokens, 0)
+                self.on_rate_limited(e.retry_after, deadline)
+                continue
+            except TransientLLMError:
+                self.settle(hour, est_tokens, 0)
+                self.on_failure()
+                attempt += 1
+                backoff = min(30.0, 2 ** attempt) + random.uniform(0, 0.5)
+                if attempt > self.max_retries:
+                    raise
+                if time.time() + backoff > deadline:
+                    raise SchedulerTimeout(f"LLM scheduler '{self.name}': retries exceed {self.max_wait_s}s budget")
+                time.sleep(backoff)
+                continue
+            self.on_success()
+            self.settle(hour, est_tokens, usage_of(result))
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+        out["waited_s"] = round(out["waited_s"], 2)
+        try:
+            now = time.time()
+            out["window"] = {
+                "rpm_used": int(cache.get(self._k(f"rpm:{int(now // 60)}")) or 0), "rpm_limit": self.rpm,
+                "tokens_this_hour": int(cache.get(self._k(f"tok:{int(now // 3600)}")) or 0),
+                "tokens_per_hour": self.tokens_per_hour,
+                "blocked_for_s": round(max(0.0, self._blocked_until() - now), 1),
+            }
+        except Exception:
+            out["window"] = None
+        return out
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_sched_lock = threading.Lock()
+
+def get_scheduler(name: str = "deepseek") -> LLMScheduler:
+    """同一供應商 key 共用一個排程器（DeepSeekClient 同 llm_json 都用 'deepseek'）"""
+    with _sched_lock:
+        if name not in _schedulers:
+            _schedulers[name] = LLMScheduler(
+                name,
+                rpm=settings.LLM_RPM,
+                tokens_per_hour=settings.LLM_TOKENS_PER_HOUR,
+                breaker_failures=settings.LLM_BREAKER_FAILURES,
+                breaker_cooldown_s=settings.LLM_BREAKER_COOLDOWN_S,
+                max_wait_s=settings.LLM_MAX_QUEUE_WAIT_S,
+            )
+        return _schedulers[name]
@@ -0,0 +1,67 @@
+import json, re, time
+from django.core.management.base import BaseCommand, CommandError
+
+from news.models import NewsChunk
+from research.alias_automaton import AliasAutomaton
+from research.alias_index import get_alias_index
+
+def _normalize(s: str) -> str:
+    return re.sub(r"[^A-Z0-9]+", " ", (s or "").upper()).strip()
+
+def _old_mentions(text, aliases):
+    # 舊做法：regex 切 token → 查字典 → 再 lower().find() 搵 span
+    out = []
+    for m in set(re.findall(r"[A-Za-z0-9\.\-]{2,}", text)):
+        key = _normalize(m)
+        if key in aliases:
+            i = text.lower().find(m.lower())
+            out.append((max(0, i), max(0, i) + len(m), key))
+    return out
+
+class Command(BaseCommand):
+    help = "Benchmark alias mention detection: per-token dict lookup vs Aho-Corasick automaton (chunks/s)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **opts):
+        aliases = get_alias_index().aliases
+        if not aliases:
+            raise CommandError("Alias index empty. Run: python manage.py build_entity_aliases")
+        texts = list(NewsChunk.objects.order_by("-id").values_list("text", flat=True)[:opts["limit"]])
+        if not texts:
+            raise CommandError("No news chunks to benchmark")
+
+        t0 = time.perf_counter()
+        automaton = AliasAutomaton.from_aliases(aliases)
+        compile_s = time.perf_counter() - t0
+
+        def run(fn):
+            best, res = None, None
+            for _ in range(opts["repeat"]):
+                t0 = time.perf_counter()
+                res = [fn(t) for t in texts]
+                dt = time.perf_counter() - t0
+                best = dt if best is None else min(best, dt)
+            return best, res
+
+        old_s, old_res = run(lambda t: _old_mentions(t, aliases))
+        new_s, new_res = run(lambda t: automaton.find_all(t, min_chars=2))
+
+        multi = sum(1 for hits in new_res for h in hits if " " in h.key)
+        stats = {
+            "chunks": len(texts),
+            "alias_keys": len(aliases),
+            "multi_token_keys": sum(1 for k in aliases if " " in k),
+            "compile_ms": round(compile_s * 1e3, 2),
+            "old_chunks_per_s": round(len(texts) / old_s, 1),
+            "automaton_chunks_per_s": round(len(texts) / new_s, 1),
+            "speedup": round(old_s / new_s, 2) if new_s else None,
+            "old_mentions": sum(len(r) for r in old_res),
+            "automaton_mentions": sum(len({h.key for h in r}) for r in new_res),
+            "automaton_multi_token_mentions": multi,
+        }
+        for k, v in stats.items():
+            self.stdout.write(f"  {k}: {v}")
+        self.stdout.write(f"STATS {json.dumps(stats)}")
@@ -0,0 +1,146 @@
+import json, re, time, uuid
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from evals.metrics import recall_at_k
+from ops.models import VectorIndexBenchmark
+from research.vector_search import RESEARCH_TYPES, pg_topk, set_ef_search, current_ef_search
+from research.vector_store import get_embeddings_model
+
+LIVE_TABLE = "research_researchembedding"
+LIVE_INDEX = "resemb_hnsw_cosine"
+SCRATCH_TABLE = "bench_resemb_scratch"
+
+def _pct_ms(xs, q):
+    return round(float(np.percentile(xs, q)) * 1e3, 3)
+
+def _parse_ints(s):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+class Command(BaseCommand):
+    help = ("Benchmark HNSW recall@k vs latency: sample news_chunk query vectors, brute-force ground truth, "
+            "sweep hnsw.ef_search on the live index and (optionally) m/ef_construction on a scratch copy.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=200, help="抽幾多個 news_chunk 向量做查詢")
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--types", type=str, default=",".join(RESEARCH_TYPES))
+        parser.add_argument("--ef", type=str, default="20,40,80,120,200,400", help="ef_search 掃描值")
+        parser.add_argument("--build", type=str, default="",
+                            help="臨時表上試嘅建索引參數 m:ef_construction，逗號分隔，例如 16:64,32:128")
+        parser.add_argument("--force-index", action="store_true",
+                            help="SET enable_seqscan = off，避免細表時 planner 揀 seq scan（= exact）")
+        parser.add_argument("--no-save", action="store_true", help="唔寫入 VectorIndexBenchmark")
+
+    def handle(self, *args, **opts):
+        k = opts["k"]
+        types = tuple(t.strip() for t in opts["types"].split(",") if t.strip())
+        efs = _parse_ints(opts["ef"])
+        builds = [tuple(int(x) for x in b.split(":")) for b in opts["build"].split(",") if b.strip()]
+
+        Emb = get_embeddings_model()
+        qvs = list(Emb.objects.filter(object_type="news_chunk")
+                   .order_by("?").values_list("vector", flat=True)[:opts["queries"]])
+        if not qvs:
+            raise CommandError("No news_chunk vectors to sample; run embed_news first.")
+        Q = np.asarray(qvs, dtype=np.float32)
+
+        # ---- ground truth：同一 types 過濾下嘅 exact cosine top-k ----
+        rows = list(Emb.objects.filter(object_type__in=types)
+                    .values_list("object_type", "object_id", "chunk_id", "vector"))
+        if not rows:
+            raise CommandError(f"No research embeddings for {types}")
+        keys = [r[:3] for r in rows]
+        M = np.asarray([r[3] for r in rows], dtype=np.float32)
+        M /= np.linalg.norm(M, axis=1, keepdims=True) + 1e-12
+        Qn = Q / (np.linalg.norm(Q, axis=1, keepdims=True) + 1e-12)
+        sims = Qn @ M.T
+        kk = min(k, len(keys))
+        top = np.argsort(-sims, axis=1)[:, :kk]
+        truth = [[keys[j] for j in row] for row in top]
+        self.stdout.write(self.style.NOTICE(
+            f"queries={len(Q)} corpus={len(keys)} k={k}; ground truth by brute force"))
+
+        run_id = uuid.uuid4().hex
+        prev_ef = current_ef_search()
+        results = []
+        try:
+            if opts["force_index"]:
+                with connection.cursor() as cur:
+                    cur.execute("SET enable_seqscan = off;")
+
+            m, efc = self._live_params()
+            results += self._sweep(LIVE_TABLE, LIVE_INDEX, Q, truth, types, k, efs,
+                                   m=m, ef_construction=efc, scratch=False)
+            for m, efc in builds:
+                build_s = self._build_scratch(types, m, efc)
+                try:
+                    results += self._sweep(SCRATCH_TABLE, f"{SCRATCH_TABLE}_m{m}_efc{efc}", Q, truth, types, k, efs,
+                                           m=m, ef_construction=efc, scratch=True, build_s=build_s)
+                finally:
+                    with connection.cursor() as cur:
+                        cur.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE};")
+        finally:
+            set_ef_search(prev_ef)
+            if opts["force_index"]:
+                with connection.cursor() as cur:
+                    cur.execute("RESET enable_seqscan;")
+
+        self.stdout.write(f"{'index':<36} {'m':>4} {'efc':>5} {'ef':>5} {'recall':>8} {'p50ms':>8} {'p95ms':>8}")
+        for r in results:
+            self.stdout.write(
+                f"{r['index_name']:<36} {str(r['m']):>4} {str(r['ef_construction']):>5} {r['ef_search']:>5} "
+                f"{r['recall']:>8.4f} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f}")
+
+        if not opts["no_save"]:
+            VectorIndexBenchmark.objects.bulk_create([
+                VectorIndexBenchmark(run_id=run_id, k=k, n_queries=len(Q), **r) for r in results
+            ])
+        self.stdout.write(f"STATS {json.dumps({'run_id': run_id, 'k': k, 'queries': len(Q), 'results': results})}")
+
+    def _live_params(self):
+        """由 indexdef 讀 m / ef_construction；冇寫 WITH 即係 pgvector 預設 16 / 64"""
+        with connection.cursor() as cur:
+            cur.execute("SELECT indexdef FROM pg_indexes WHERE indexname = %s;", [LIVE_INDEX])
+            row = cur.fetchone()
+        if not row:
+            return None, None
+        m = re.search(r"\bm\s*=\s*'?(\d+)", row[0])
+        efc = re.search(r"ef_construction\s*=\s*'?(\d+)", row[0])
+        return int(m.group(1)) if m else 16, int(efc.group(1)) if efc else 64
+
+    def _build_scratch(self, types, m, efc) -> float:
+        with connection.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE};")
+            cur.execute(
+                f"CREATE UNLOGGED TABLE {SCRATCH_TABLE} AS "
+                f"SELECT id, object_type, object_id, chunk_id, vector, meta FROM {LIVE_TABLE} "
+                f"WHERE object_type = ANY(%s);", [list(types)])
+            t0 = time.perf_counter()
+            cur.execute(
+                f"CREATE INDEX {SCRATCH_TABLE}_hnsw ON {SCRATCH_TABLE} "
+                f"USING hnsw (vector vector_cosine_ops) WITH (m = {int(m)}, ef_construction = {int(efc)});")
+            build_s = time.perf_counter() - t0
+            cur.execute(f"ANALYZE {SCRATCH_TABLE};")
+        self.stdout.write(self.style.NOTICE(f"[scratch] m={m} ef_construction={efc} built in {build_s:.2f}s"))
+        return round(build_s, 3)
+
+    def _sweep(self, table, index_name, Q, truth, types, k, efs, **params):
+        out = []
+        for ef in efs:
+            set_ef_search(ef)
+            pg_topk(Q[0], types, k=k, table=table)  # 暖身
+            lat, recalls = [], []
+            for qv, gt in zip(Q, truth):
+                t0 = time.perf_counter()
+                got = pg_topk(qv, types, k=k, table=table)
+                lat.append(time.perf_counter() - t0)
+                recalls.append(recall_at_k([tuple(r[:3]) for r in got], gt, k))
+            out.append(dict(
+                index_name=index_name, ef_search=ef,
+                recall=round(float(np.mean(recalls)), 4),
+                p50_ms=_pct_ms(lat, 50), p95_ms=_pct_ms(lat, 95),
+                **params,
+            ))
+        return out
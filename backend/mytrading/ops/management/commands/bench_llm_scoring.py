@@ -0,0 +1,161 @@
+import json, time
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from news.news_scoring import DeepSeekClient, score_news_batch, score_news_item
+from ops import llm_ledger
+from ops.llm_scheduler import LLMScheduler
+from ops.mock_llm import MockLLMServer
+from research import llm_client
+from research.management.commands import gen_company_ai, gen_industry_ai
+from research.schemas import CompanyAIOutput, IndustryAIOutput
+
+HEADLINES = [
+    "{co} raises full-year guidance after record quarterly revenue",
+    "Regulators open antitrust probe into {co}'s cloud unit",
+    "{co} to acquire rival in $2.1B all-cash deal",
+    "{co} recalls 40,000 units over battery defect",
+    "{co} shares slip as supplier warns of component shortages",
+]
+
+def _pct(xs, q):
+    if not xs:
+        return None
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * (len(xs) - 1) + 0.5))] * 1000, 1)
+
+class Command(BaseCommand):
+    help = ("Benchmark the real LLM scoring / research-generation code against the offline mock DeepSeek server: "
+            "items/s, p50/p95 latency, retries.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workload", choices=["news", "company", "industry"], default="news")
+        parser.add_argument("--items", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--batch-size", type=int, default=1, help="news：每個請求幾多則（score_news --batch-size）")
+        parser.add_argument("--model", type=str, default="deepseek-chat")
+        parser.add_argument("--base-url", type=str, default="", help="用已經跑緊嘅 mock_llm_server；唔填就喺進程內開一個")
+        # 進程內 mock 參數（同 mock_llm_server）
+        parser.add_argument("--latency", type=str, default="lognormal:800:0.5")
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--rate-429", type=float, default=0.0)
+        parser.add_argument("--retry-after", type=float, default=1.0)
+        parser.add_argument("--bad-json-rate", type=float, default=0.0)
+        parser.add_argument("--seed", type=int, default=0)
+        # 獨立排程器（唔會食正式 'deepseek' 配額）；0 = 唔限
+        parser.add_argument("--rpm", type=int, default=0)
+        parser.add_argument("--tokens-per-hour", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        server = None
+        base_url = opts["base_url"].rstrip("/")
+        if not base_url:
+            server = MockLLMServer(latency=opts["latency"], error_rate=opts["error_rate"], rate_429=opts["rate_429"],
+                                   retry_after=opts["retry_after"], bad_json_rate=opts["bad_json_rate"],
+                                   seed=opts["seed"]).start()
+            base_url = server.base_url
+        sched = LLMScheduler("bench", rpm=opts["rpm"], tokens_per_hour=opts["tokens_per_hour"],
+                             breaker_failures=10, breaker_cooldown_s=5, max_wait_s=600)
+        try:
+            units = getattr(self, f"units_{opts['workload']}")(opts, base_url, sched)
+            latencies, ok, failed = [], 0, 0
+            t0 = time.perf_counter()
+            with ExitStack() as stack:
+                if opts["workload"] != "news":
+                    # llm_json 用模組級 client：benchmark 期間改指去 mock + 獨立排程器
+                    stack.enter_context(llm_client.endpoint_override(base_url, scheduler=sched))
+                pool = stack.enter_context(ThreadPoolExecutor(max_workers=max(1, opts["concurrency"])))
+                for dt, n_ok, n_fail in pool.map(self.timed, units):
+                    latencies += [dt] * (n_ok + n_fail)
+                    ok += n_ok; failed += n_fail
+            wall = time.perf_counter() - t0
+        finally:
+            if server:
+                server.stop()
+
+        n_items = ok + failed
+        s = sched.snapshot()
+        stats = {
+            "workload": opts["workload"], "items": n_items, "ok": ok, "failed": failed,
+            "concurrency": opts["concurrency"], "batch_size": opts["batch_size"],
+            "wall_s": round(wall, 2),
+            "items_per_s": round(ok / wall, 2) if wall else None,
+            "p50_ms": _pct(latencies, 0.50), "p95_ms": _pct(latencies, 0.95),
+            # 排程器層面：429 / 5xx 重試；attempts - requests = 額外嘅 HTTP 嘗試
+            "requests": len(units), "http_attempts": s["calls"],
+            "retries": s["calls"] - len(units), "rate_limited": s["rate_limited"],
+            "transient_errors": s["transient_errors"], "breaker_opens": s["breaker_opens"],
+            "queued_s": s["waited_s"], "tokens_used": s["tokens_used"],
+            "server": dict(server.counts) if server else None,
+        }
+        for k, v in stats.items():
+            self.stdout.write(f"  {k}: {v}")
+        self.stdout.write(f"STATS {json.dumps(stats)}")
+
+    @staticmethod
+    @llm_ledger.in_worker
+    def timed(fn):
+        t0 = time.perf_counter()
+        n_ok, n_fail = fn()
+        return time.perf_counter() - t0, n_ok, n_fail
+
+    # ---- workloads：每個 unit 回傳 (成功數, 失敗數) ----
+    def units_news(self, opts, base_url, sched):
+        client = DeepSeekClient(api_key="mock", base_url=base_url, use_cache=False, scheduler=sched,
+                                caller="bench_llm_scoring")
+        now = timezone.now()
+        items = [dict(
+            item_id=f"bench-{i}", body=HEADLINES[i % len(HEADLINES)].format(co=f"Company{i}"),
+            source_url=None, published_at=now - timezone.timedelta(minutes=i), tickers=[f"C{i}"], industries=[],
+        ) for i in range(opts["items"])]
+        bs = max(1, opts["batch_size"])
+
+        def single(it):
+            def run():
+                try:
+                    score_news_item(**it, model=opts["model"], client=client)
+                    return 1, 0
+                except Exception:
+                    return 0, 1
+            return run
+
+        def batch(chunk):
+            def run():
+                try:
+                    res = score_news_batch(chunk, model=opts["model"], client=client)
+                except Exception:
+                    return 0, len(chunk)
+                bad = sum(1 for v in res.values() if isinstance(v, Exception))
+                return len(chunk) - bad, bad
+            return run
+
+        if bs == 1:
+            return [single(it) for it in items]
+        return [batch(items[i:i+bs]) for i in range(0, len(items), bs)]
+
+    @staticmethod
+    def _research_units(prompts, schema):
+        def unit(prompt):
+            def run():
+                try:
+                    schema(**llm_client.llm_json(prompt, use_cache=False, caller="bench_llm_scoring"))
+                    return 1, 0
+                except Exception:
+                    return 0, 1
+            return run
+        return [unit(p) for p in prompts]
+
+    def units_company(self, opts, base_url, sched):
+        prompts = [gen_company_ai.COMPANY_PROMPT_TEMPLATE.format(
+            ticker=f"BN{i}", name=f"Bench Co {i}", industry_name="Semiconductors", country="US",
+            schema=gen_company_ai.schema_example(), currency="USD", year=timezone.now().year,
+        ) for i in range(opts["items"])]
+        return self._research_units(prompts, CompanyAIOutput)
+
+    def units_industry(self, opts, base_url, sched):
+        prompts = [gen_industry_ai.PROMPT.format(
+            industry_name=f"Bench Industry {i}", sector_name="Technology", schema=gen_industry_ai.schema_example(),
+        ) for i in range(opts["items"])]
+        return self._research_units(prompts, IndustryAIOutput)
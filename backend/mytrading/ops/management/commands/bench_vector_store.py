@@ -0,0 +1,107 @@
+import json, time
+from datetime import timedelta
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from research.vector_search import COMPANY_TYPES, INDUSTRY_TYPES
+from research.vector_store import (
+    PgVectorStore, QdrantStore, get_embeddings_model, sync_research_embeddings,
+)
+
+def _pct(xs, q):
+    return round(float(np.percentile(xs, q)) * 1e3, 3) if xs else None
+
+def _overlap(a_rows, b_rows, k):
+    """兩個後端 top-k 命中 (object_type, object_id, chunk_id) 重疊比例"""
+    if not a_rows:
+        return None
+    hits = 0
+    for a, b in zip(a_rows, b_rows):
+        sa = {r[:3] for r in a}
+        sb = {r[:3] for r in b}
+        hits += len(sa & sb) / max(1, min(k, len(sa)))
+    return round(hits / len(a_rows), 4)
+
+class Command(BaseCommand):
+    help = ("Benchmark pgvector vs Qdrant (embedded local mode) on the rollup workload: "
+            "company/industry filtered top-k for recent news_chunk vectors.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days-back", type=int, default=7)
+        parser.add_argument("--limit", type=int, default=200, help="最多用幾多個 news_chunk 向量做查詢")
+        parser.add_argument("--k", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=32)
+        parser.add_argument("--filter", type=str, default="", help="meta 等值過濾，例如 ticker=NVDA")
+        parser.add_argument("--qdrant-path", type=str, default=":memory:",
+                            help="Qdrant local 模式路徑（預設 in-memory）")
+
+    def handle(self, *args, **opts):
+        k, bs = opts["k"], opts["batch_size"]
+        filters = None
+        if opts["filter"]:
+            key, _, val = opts["filter"].partition("=")
+            filters = {key.strip(): val.strip()}
+
+        Emb = get_embeddings_model()
+        since = timezone.now() - timedelta(days=opts["days_back"])
+        qvs = list(
+            Emb.objects.filter(object_type="news_chunk", created_at__gte=since)
+            .order_by("-id").values_list("vector", flat=True)[:opts["limit"]]
+        )
+        if not qvs:
+            self.stdout.write(self.style.WARNING("No news_chunk vectors in window; run embed_news first."))
+            return
+        qvs = [np.asarray(v, dtype=np.float32) for v in qvs]
+
+        pg = PgVectorStore()
+        qd = QdrantStore(path=opts["qdrant_path"], collection="bench_research_embeddings")
+        t0 = time.perf_counter()
+        mirrored = sync_research_embeddings(qd, COMPANY_TYPES + INDUSTRY_TYPES)
+        sync_s = time.perf_counter() - t0
+        self.stdout.write(self.style.NOTICE(f"Mirrored {mirrored} research embeddings to Qdrant in {sync_s:.2f}s"))
+
+        stats = {"queries": len(qvs), "k": k, "batch_size": bs, "filters": filters,
+                 "mirrored": mirrored, "sync_s": round(sync_s, 3)}
+        results = {}
+        for store in (pg, qd):
+            # 暖身（連線 / adapter / collection）
+            store.topk(qvs[0], COMPANY_TYPES, k=k, filters=filters)
+
+            # 單一查詢：rollup 每個 chunk 分別查 company + industry
+            lat, single = [], []
+            t0 = time.perf_counter()
+            for qv in qvs:
+                s = time.perf_counter()
+                rows = store.topk(qv, COMPANY_TYPES, k=k, filters=filters)
+                rows += store.topk(qv, INDUSTRY_TYPES, k=k, filters=filters)
+                lat.append(time.perf_counter() - s)
+                single.append(rows)
+            single_s = time.perf_counter() - t0
+
+            # 批量查詢
+            blat = []
+            t0 = time.perf_counter()
+            for i in range(0, len(qvs), bs):
+                s = time.perf_counter()
+                store.topk_batch(qvs[i:i + bs], COMPANY_TYPES, k=k, filters=filters)
+                store.topk_batch(qvs[i:i + bs], INDUSTRY_TYPES, k=k, filters=filters)
+                blat.append(time.perf_counter() - s)
+            batch_s = time.perf_counter() - t0
+
+            results[store.name] = single
+            stats.update({
+                f"{store.name}_single_p50_ms": _pct(lat, 50),
+                f"{store.name}_single_p95_ms": _pct(lat, 95),
+                f"{store.name}_single_qps": round(len(qvs) / single_s, 1) if single_s else None,
+                f"{store.name}_batch_p50_ms": _pct(blat, 50),
+                f"{store.name}_batch_p95_ms": _pct(blat, 95),
+                f"{store.name}_batch_qps": round(len(qvs) / batch_s, 1) if batch_s else None,
+            })
+
+        # HNSW 係近似檢索，兩邊結果唔一定完全一致
+        stats["overlap_at_k"] = _overlap(results["pgvector"], results["qdrant"], 2 * k)
+
+        for key, v in stats.items():
+            self.stdout.write(f"  {key}: {v}")
+        self.stdout.write(f"STATS {json.dumps(stats)}")
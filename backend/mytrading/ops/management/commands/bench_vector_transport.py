@@ -0,0 +1,87 @@
+import json, time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+from pgvector import Vector
+from research.vector_search import pg_topk, RESEARCH_TYPES
+
+def _text_encode(qv):
+    # 舊做法：逐個 float 轉字串，Postgres 端再 parse
+    return ('[' + ','.join(map(str, qv)) + ']').encode("utf-8")
+
+def _binary_encode(qv):
+    # 新做法：pgvector binary 格式（header 4 bytes + dim * float32）
+    return Vector(qv).to_binary()
+
+def _timeit(fn, payloads):
+    t0 = time.perf_counter()
+    for p in payloads:
+        fn(p)
+    return (time.perf_counter() - t0) / len(payloads)
+
+class Command(BaseCommand):
+    help = "Microbenchmark: per-query vector serialization cost, text '[...]'::vector vs pgvector binary."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dim", type=int, default=1024)
+        parser.add_argument("--iters", type=int, default=2000)
+        parser.add_argument("--db", action="store_true", help="同時量度真實 top-k 查詢（需要研究 embeddings）")
+        parser.add_argument("--db-iters", type=int, default=200)
+        parser.add_argument("--k", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        dim, iters = opts["dim"], opts["iters"]
+        rng = np.random.default_rng(42)
+        mat = rng.standard_normal((iters, dim)).astype("float32")
+        mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+        # ORM 讀出嚟嘅向量係 list[float]，用同一輸入比較
+        as_lists = [row.tolist() for row in mat]
+
+        text_s = _timeit(_text_encode, as_lists)
+        bin_s = _timeit(_binary_encode, as_lists)
+        bin_np_s = _timeit(_binary_encode, list(mat))
+
+        stats = {
+            "dim": dim,
+            "iters": iters,
+            "text_us_per_query": round(text_s * 1e6, 2),
+            "binary_us_per_query": round(bin_s * 1e6, 2),
+            "binary_numpy_us_per_query": round(bin_np_s * 1e6, 2),
+            "text_bytes_per_vector": len(_text_encode(as_lists[0])),
+            "binary_bytes_per_vector": len(_binary_encode(as_lists[0])),
+            "speedup": round(text_s / bin_s, 2) if bin_s else None,
+        }
+
+        if opts["db"]:
+            stats.update(self._bench_db(as_lists[:opts["db_iters"]], opts["k"]))
+
+        for k, v in stats.items():
+            self.stdout.write(f"  {k}: {v}")
+        self.stdout.write(f"STATS {json.dumps(stats)}")
+
+    def _bench_db(self, qvs, k):
+        sql = """
+        SELECT object_type, object_id, chunk_id,
+               1 - (vector <=> %s::vector) AS sim
+        FROM research_researchembedding
+        WHERE object_type = ANY(%s)
+        ORDER BY vector <=> %s::vector
+        LIMIT %s;
+        """
+        types = list(RESEARCH_TYPES)
+
+        def old_path(qv):
+            vector_str = '[' + ','.join(map(str, qv)) + ']'
+            with connection.cursor() as cur:
+                cur.execute(sql, [vector_str, types, vector_str, k])
+                return cur.fetchall()
+
+        # 先各跑一次暖身（連線 / adapter 註冊 / 索引載入）
+        old_path(qvs[0]); pg_topk(qvs[0], RESEARCH_TYPES, k=k)
+        old_s = _timeit(old_path, qvs)
+        new_s = _timeit(lambda qv: pg_topk(qv, RESEARCH_TYPES, k=k), qvs)
+        return {
+            "db_queries": len(qvs),
+            "db_text_ms_per_query": round(old_s * 1e3, 3),
+            "db_binary_ms_per_query": round(new_s * 1e3, 3),
+        }
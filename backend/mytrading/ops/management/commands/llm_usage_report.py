@@ -0,0 +1,37 @@
+import json
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ops import llm_ledger
+from ops.models import LLMCall
+
+class Command(BaseCommand):
+    help = "Summarise the LLM call ledger: p50/p95 latency, tokens/day and cost per caller (most expensive first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--caller", type=str, default="")
+        parser.add_argument("--daily", action="store_true", help="再逐日列出 日 × caller × model")
+        parser.add_argument("--prune-days", type=int, default=0, help="刪走超過 N 日嘅 ledger 行（0 = 唔刪）")
+
+    def handle(self, *args, **opts):
+        pruned = 0
+        if opts["prune_days"] > 0:
+            cutoff = timezone.now() - timezone.timedelta(days=opts["prune_days"])
+            pruned = LLMCall.objects.filter(created_at__lt=cutoff).delete()[0]
+
+        days = max(1, opts["days"])
+        rows = llm_ledger.rollup(days=days, caller=opts["caller"] or None)
+        callers = llm_ledger.by_caller(rows, days)
+
+        self.stdout.write(f"{'caller':<24}{'calls':>8}{'cached':>8}{'failed':>8}{'retries':>8}"
+                          f"{'tokens/day':>14}{'cost_usd':>10}{'p95_ms':>10}")
+        for c in callers:
+            self.stdout.write(f"{c['caller']:<24}{c['calls']:>8}{c['cached']:>8}{c['failed']:>8}{c['retries']:>8}"
+                              f"{c['tokens_per_day']:>14}{c['cost_usd']:>10}{str(c['worst_p95_ms']):>10}")
+        if opts["daily"]:
+            for r in rows:
+                self.stdout.write(f"  {r['day']} {r['caller']:<22} {r['model']:<18} calls={r['calls']} "
+                                  f"p50={r['p50_ms']}ms p95={r['p95_ms']}ms tokens={r['total_tokens']} cost=${r['cost_usd']}")
+
+        stats = {"processed": sum(c["calls"] for c in callers), "days": days, "pruned": pruned, "by_caller": callers}
+        self.stdout.write(f"STATS {json.dumps(stats, ensure_ascii=False)}")
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from ops.mock_llm import MockLLMServer
+
+class Command(BaseCommand):
+    help = ("Run an offline mock OpenAI-compatible DeepSeek server (configurable latency / 5xx / 429 / bad JSON) "
+            "returning schema-valid canned payloads. Point score_news --base-url at it.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument("--latency", type=str, default="lognormal:800:0.5",
+                            help="const:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA（ms）")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="503 比例")
+        parser.add_argument("--rate-429", type=float, default=0.0, help="429 比例")
+        parser.add_argument("--retry-after", type=float, default=1.0, help="429 嘅 Retry-After 秒數")
+        parser.add_argument("--bad-json-rate", type=float, default=0.0, help="回應唔係合法 JSON 嘅比例")
+        parser.add_argument("--reasoning-chars", type=int, default=0, help="reasoning_content 長度（模擬 reasoner）")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        srv = MockLLMServer(
+            host=opts["host"], port=opts["port"], latency=opts["latency"], error_rate=opts["error_rate"],
+            rate_429=opts["rate_429"], retry_after=opts["retry_after"], bad_json_rate=opts["bad_json_rate"],
+            reasoning_chars=opts["reasoning_chars"], seed=opts["seed"],
+        ).start()
+        self.stdout.write(self.style.SUCCESS(f"Mock DeepSeek listening on {srv.base_url} (Ctrl-C to stop)"))
+        self.stdout.write(f"  score_news --base-url {srv.base_url}   |   DEEPSEEK_BASE_URL={srv.base_url}/v1")
+        try:
+            while True:
+                time.sleep(10)
+                self.stdout.write(f"  {srv.counts}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            srv.stop()
@@ -0,0 +1,100 @@
+import json, time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+TABLE = "research_researchembedding"
+INDEX = "resemb_hnsw_cosine"
+
+# 建索引參數 profile：m / ef_construction 影響 recall 同大小；後兩個只影響建索引速度
+PROFILES = {
+    "default":     {"m": 16, "ef_construction": 64,  "maintenance_work_mem": "512MB", "max_parallel_maintenance_workers": 2},
+    "fast_build":  {"m": 12, "ef_construction": 48,  "maintenance_work_mem": "512MB", "max_parallel_maintenance_workers": 4},
+    "balanced":    {"m": 16, "ef_construction": 128, "maintenance_work_mem": "1GB",   "max_parallel_maintenance_workers": 4},
+    "high_recall": {"m": 32, "ef_construction": 200, "maintenance_work_mem": "2GB",   "max_parallel_maintenance_workers": 4},
+}
+
+class Command(BaseCommand):
+    help = ("Rebuild the research HNSW index CONCURRENTLY with a build profile, "
+            "then swap it in atomically and drop the old one (writes are never blocked).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", choices=sorted(PROFILES), default="default")
+        parser.add_argument("--m", type=int, help="覆蓋 profile 嘅 m")
+        parser.add_argument("--ef-construction", type=int, help="覆蓋 profile 嘅 ef_construction")
+        parser.add_argument("--maintenance-work-mem", type=str, help="例如 1GB；索引放得晒入記憶體會快好多")
+        parser.add_argument("--parallel-workers", type=int, help="max_parallel_maintenance_workers")
+        parser.add_argument("--keep-old", action="store_true", help="唔 drop 舊索引（保留做 <name>_old）")
+        parser.add_argument("--dry-run", action="store_true", help="只印 SQL")
+
+    def handle(self, *args, **opts):
+        p = dict(PROFILES[opts["profile"]])
+        if opts["m"]: p["m"] = opts["m"]
+        if opts["ef_construction"]: p["ef_construction"] = opts["ef_construction"]
+        if opts["maintenance_work_mem"]: p["maintenance_work_mem"] = opts["maintenance_work_mem"]
+        if opts["parallel_workers"] is not None: p["max_parallel_maintenance_workers"] = opts["parallel_workers"]
+
+        new_name, old_name = f"{INDEX}_new", f"{INDEX}_old"
+        create_sql = (
+            f"CREATE INDEX CONCURRENTLY {new_name} ON {TABLE} "
+            f"USING hnsw (vector vector_cosine_ops) "
+            f"WITH (m = {int(p['m'])}, ef_construction = {int(p['ef_construction'])});"
+        )
+        if opts["dry_run"]:
+            self.stdout.write(f"profile={opts['profile']} {p}\n{create_sql}")
+            return
+        # CONCURRENTLY 唔可以喺 transaction 入面跑
+        if connection.in_atomic_block:
+            raise CommandError("rebuild_hnsw_index must run in autocommit mode (not inside atomic)")
+
+        with connection.cursor() as cur:
+            # 上次失敗會留低 INVALID 嘅 _new；上次 --keep-old 會留低 _old
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name};")
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name};")
+            cur.execute("SELECT set_config('maintenance_work_mem', %s, false);", [p["maintenance_work_mem"]])
+            cur.execute("SELECT set_config('max_parallel_maintenance_workers', %s, false);",
+                        [str(p["max_parallel_maintenance_workers"])])
+
+            self.stdout.write(self.style.NOTICE(f"[build] {create_sql}"))
+            t0 = time.perf_counter()
+            try:
+                cur.execute(create_sql)
+            finally:
+                cur.execute("RESET maintenance_work_mem;")
+                cur.execute("RESET max_parallel_maintenance_workers;")
+            build_s = time.perf_counter() - t0
+
+            cur.execute("""
+                SELECT i.indisvalid, pg_relation_size(c.oid)
+                FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = %s;
+            """, [new_name])
+            valid, size_bytes = cur.fetchone()
+            if not valid:
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name};")
+                raise CommandError(f"{new_name} was built INVALID; dropped it, live index untouched")
+
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL;", [INDEX])
+            had_old = cur.fetchone()[0]
+
+        # 兩個 rename 喺同一個 transaction：查詢一係見舊索引，一係見新索引
+        with transaction.atomic(), connection.cursor() as cur:
+            if had_old:
+                cur.execute(f"ALTER INDEX {INDEX} RENAME TO {old_name};")
+            cur.execute(f"ALTER INDEX {new_name} RENAME TO {INDEX};")
+        self.stdout.write(self.style.SUCCESS(f"[swap] {new_name} -> {INDEX}"))
+
+        if had_old and not opts["keep_old"]:
+            with connection.cursor() as cur:
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name};")
+            self.stdout.write(self.style.SUCCESS(f"[drop] {old_name}"))
+
+        stats = {
+            "profile": opts["profile"], **p,
+            "build_s": round(build_s, 3),
+            "index_bytes": int(size_bytes),
+            "index_mb": round(size_bytes / 2**20, 1),
+            "replaced_old": bool(had_old),
+        }
+        for k, v in stats.items():
+            self.stdout.write(f"  {k}: {v}")
+        self.stdout.write(f"STATS {json.dumps(stats)}")
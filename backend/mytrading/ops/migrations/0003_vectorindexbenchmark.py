@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0002_jobrun_delete_vectorprobe_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorIndexBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(db_index=True, max_length=32)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('index_name', models.CharField(max_length=80)),
+                ('scratch', models.BooleanField(default=False)),
+                ('m', models.IntegerField(blank=True, null=True)),
+                ('ef_construction', models.IntegerField(blank=True, null=True)),
+                ('build_s', models.FloatField(blank=True, null=True)),
+                ('ef_search', models.IntegerField()),
+                ('k', models.IntegerField()),
+                ('n_queries', models.IntegerField(default=0)),
+                ('recall', models.FloatField(default=0.0)),
+                ('p50_ms', models.FloatField(default=0.0)),
+                ('p95_ms', models.FloatField(default=0.0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['index_name', 'k', 'created_at'], name='ops_vectori_index_n_d570c5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0003_vectorindexbenchmark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('caller', models.CharField(max_length=80)),
+                ('model', models.CharField(max_length=80)),
+                ('outcome', models.CharField(choices=[('ok', 'ok'), ('cached', 'cached'), ('transient_error', 'transient_error'), ('timeout', 'timeout'), ('error', 'error')], default='ok', max_length=20)),
+                ('prompt_tokens', models.IntegerField(default=0)),
+                ('completion_tokens', models.IntegerField(default=0)),
+                ('latency_ms', models.IntegerField(default=0)),
+                ('wall_ms', models.IntegerField(default=0)),
+                ('queued_ms', models.IntegerField(default=0)),
+                ('retries', models.IntegerField(default=0)),
+                ('cost_usd', models.FloatField(default=0.0)),
+                ('error', models.CharField(blank=True, default='', max_length=500)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['caller', 'created_at'], name='ops_llmcall_caller_c16cd0_idx'), models.Index(fields=['created_at'], name='ops_llmcall_created_91251a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,175 @@
+# ops/mock_llm.py
+"""
+離線 mock DeepSeek（OpenAI-compatible /chat/completions），俾 bench_llm_scoring / 本地測試用，唔使燒真 API。
+
+可調：延遲分佈（const / uniform / normal / lognormal，單位 ms）、5xx 錯誤率、429 率（附 Retry-After）、壞 JSON 率。
+回應按 prompt 類型回傳通過 Pydantic 驗證嘅罐頭 payload：
+  - score_news 單條（Metadata 有 "- item_id: X"）→ NewsScores；
+  - score_news 批量（{"results": [...]}）→ 每個輸入 item_id 一個 NewsScores；
+  - gen_company_ai / gen_industry_ai → 對應 command 嘅 schema_example()。
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+SINGLE_ID_RE = re.compile(r"^- item_id: (\S+)\s*$", re.MULTILINE)
+BATCH_ID_RE = re.compile(r'"item_id": "([^"]+)"')
+
+
+def parse_latency(spec: str):
+    """'const:200' / 'uniform:100:400' / 'normal:300:50' / 'lognormal:300:0.5'（中位數 ms, sigma）→ sampler(rng) -> 秒"""
+    kind, *args = spec.split(":")
+    a = [float(x) for x in args]
+    if kind == "const":
+        return lambda rng: a[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(a[0], a[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(a[0], a[1])) / 1000
+    if kind == "lognormal":
+        import math
+        return lambda rng: rng.lognormvariate(math.log(a[0]), a[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _unit(item_id: str, salt: str) -> float:
+    """同一 item_id 每次都得同一個分數（方便比較重跑結果）"""
+    h = hashlib.sha1(f"{item_id}:{salt}".encode()).digest()
+    return int.from_bytes(h[:4], "big") / 2**32
+
+
+def news_payload(item_id: str, half_life_hours: int = 72) -> Dict[str, Any]:
+    sent = round(_unit(item_id, "sent") * 2 - 1, 3)
+    return {
+        "item_id": item_id,
+        "language": "en",
+        "summary": f"mock summary for {item_id}",
+        "events": [{"type": "Guidance", "headline": "mock event", "actors": ["MockCo"], "action": "raised",
+                    "objects": ["FY guidance"], "time_ref": "today", "location": None, "magnitude": "+5%"}],
+        "sentiment_overall": sent,
+        "targets": [{"target": "MOCK", "score": sent, "confidence": 0.7}],
+        "credibility": {"source_reputation": "medium", "cross_ref_count": 1, "has_primary_source": False},
+        "scores": {
+            "impact_score": round(_unit(item_id, "impact"), 3),
+            "sentiment_score": sent,
+            "novelty_score": round(_unit(item_id, "novelty"), 3),
+            "credibility_score": 0.6,
+            "decay_half_life_hours": half_life_hours,
+            "decayed_weight": 1.0,
+        },
+        "raw_model": {"note": "mock"},
+        "model_name": "mock",
+        "model_latency_ms": 0,
+    }
+
+
+def canned_content(messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if '"results"' in user:
+        ids = [i for i in dict.fromkeys(BATCH_ID_RE.findall(user)) if i != "string"]
+        return {"results": [news_payload(i) for i in ids]}
+    m = SINGLE_ID_RE.search(user)
+    if m:
+        return news_payload(m.group(1))
+    if "overview_under_1000w" in user:
+        from research.management.commands.gen_industry_ai import schema_example
+        return json.loads(schema_example())
+    if "business_model_summary" in user:
+        from research.management.commands.gen_company_ai import schema_example
+        return json.loads(schema_example())
+    return {"ok": True}
+
+
+class MockLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "lognormal:800:0.5",
+                 error_rate: float = 0.0, rate_429: float = 0.0, retry_after: float = 1.0,
+                 bad_json_rate: float = 0.0, reasoning_chars: int = 0, seed: Optional[int] = None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate, self.rate_429, self.retry_after = error_rate, rate_429, retry_after
+        self.bad_json_rate, self.reasoning_chars = bad_json_rate, reasoning_chars
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "5xx": 0, "bad_json": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self):
+        with self._lock:
+            self.counts["requests"] += 1
+            return self._rng.random(), self.sample_latency(self._rng)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                r, delay = server._draw()
+                if r < server.rate_429:
+                    server._count("429")
+                    return self._send(429, b'{"error":{"message":"rate limited (mock)"}}',
+                                      {"Retry-After": f"{server.retry_after:g}"})
+                time.sleep(delay)
+                if r < server.rate_429 + server.error_rate:
+                    server._count("5xx")
+                    return self._send(503, b'{"error":{"message":"upstream unavailable (mock)"}}')
+
+                messages = req.get("messages") or []
+                if r < server.rate_429 + server.error_rate + server.bad_json_rate:
+                    server._count("bad_json")
+                    content = '{"truncated": '
+                else:
+                    server._count("ok")
+                    content = json.dumps(canned_content(messages), ensure_ascii=False)
+                prompt_chars = sum(len(m.get("content") or "") for m in messages)
+                body = {
+                    "id": "mock", "object": "chat.completion", "created": int(time.time()),
+                    "model": req.get("model", "mock"),
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                        "role": "assistant", "content": content,
+                        "reasoning_content": "r" * server.reasoning_chars or None,
+                    }}],
+                    "usage": {"prompt_tokens": prompt_chars // 3, "completion_tokens": len(content) // 3,
+                              "total_tokens": prompt_chars // 3 + len(content) // 3},
+                }
+                self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+        return Handler
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
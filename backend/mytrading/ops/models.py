@@ -17,4 +17,55 @@ class JobRun(models.Model):
 
     def __str__(self):
         s = "OK" if self.success else "ERR"
-        return f"{self.name} {s} {self.started_at.isoformat()} ({self.processed})"
\ No newline at end of file
+        return f"{self.name} {s} {self.started_at.isoformat()} ({self.processed})"
+
+class VectorIndexBenchmark(models.Model):
+    """bench_hnsw 每個 (index 參數, ef_search) 組合一行；同一次執行共用 run_id"""
+    run_id = models.CharField(max_length=32, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    index_name = models.CharField(max_length=80)
+    scratch = models.BooleanField(default=False)      # True = 臨時表上用其他 m/ef_construction 建嘅索引
+    m = models.IntegerField(null=True, blank=True)
+    ef_construction = models.IntegerField(null=True, blank=True)
+    build_s = models.FloatField(null=True, blank=True)
+    ef_search = models.IntegerField()
+    k = models.IntegerField()
+    n_queries = models.IntegerField(default=0)
+    recall = models.FloatField(default=0.0)
+    p50_ms = models.FloatField(default=0.0)
+    p95_ms = models.FloatField(default=0.0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["index_name", "k", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.index_name} ef={self.ef_search} k={self.k} recall={self.recall:.3f} p95={self.p95_ms:.1f}ms"
+
+class LLMCall(models.Model):
+    """每次 LLM call 一行（ops.llm_ledger.record）；cache 命中都記，outcome='cached'、token = 0"""
+    OUTCOMES = [("ok", "ok"), ("cached", "cached"), ("transient_error", "transient_error"),
+                ("timeout", "timeout"), ("error", "error")]
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    caller = models.CharField(max_length=80)            # pipeline stage，例如 score_news / gen_company_ai
+    model = models.CharField(max_length=80)
+    outcome = models.CharField(max_length=20, choices=OUTCOMES, default="ok")
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    latency_ms = models.IntegerField(default=0)         # 最後一次 HTTP 嘗試
+    wall_ms = models.IntegerField(default=0)            # 連排隊、重試、退避
+    queued_ms = models.IntegerField(default=0)
+    retries = models.IntegerField(default=0)            # 排程器嘗試次數 - 1（429 / 5xx / 斷線）
+    cost_usd = models.FloatField(default=0.0)           # 按記錄當時 settings.LLM_PRICES_PER_M 計
+    error = models.CharField(max_length=500, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["caller", "created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.caller} {self.model} {self.outcome} {self.latency_ms}ms {self.prompt_tokens}+{self.completion_tokens}"
@@ -1,6 +1,7 @@
 from celery import shared_task
 from django.core.management import call_command
-from .utils import record_job, set_hnsw_ef_search
+from django.conf import settings
+from .utils import record_job, set_hnsw_ef_search, pick_ef_search
 import io, json, re
 
 STATS_RE = re.compile(r"STATS\s*(\{.*\})")
@@ -45,16 +46,29 @@ def build_aliases_task():
         setp(1)
 
 @shared_task
-def link_entities_task(days_back: int = 3, limit: int = 1200, ef_search: int = 120):
+def link_entities_task(days_back: int = 3, limit: int = 1200, ef_search: int = None):
     with record_job("link_news_entities") as setp:
-        set_hnsw_ef_search(ef_search)
+        # 未指定就按 bench_hnsw 結果揀最平而達標嘅 ef_search
+        set_hnsw_ef_search(ef_search or pick_ef_search(settings.HNSW_TARGET_RECALL, k=5))
         p = _run_and_parse_stats("link_news_entities", "--days-back", str(days_back), "--limit", str(limit))
         setp(p)
 
 @shared_task
-def rollup_signals_task(days_back: int = 7, window_days: int = 7, topk: int = 5, ef_search: int = 120):
+def enqueue_news_scoring_task(since_hours: int = 24 * 7):
+    with record_job("enqueue_news_scoring") as setp:
+        setp(_run_and_parse_stats("enqueue_news_scoring", "--since-hours", str(since_hours)))
+
+@shared_task
+def score_news_queue_task(limit: int = 50, concurrency: int = 4):
+    # 多個 worker 同時跑都安全：score_news --from-queue 用 SKIP LOCKED 搶唔同嘅行
+    with record_job("score_news") as setp:
+        setp(_run_and_parse_stats("score_news", "--from-queue", "--limit", str(limit),
+                                  "--concurrency", str(concurrency)))
+
+@shared_task
+def rollup_signals_task(days_back: int = 7, window_days: int = 7, topk: int = 5, ef_search: int = None):
     with record_job("rollup_signals") as setp:
-        set_hnsw_ef_search(ef_search)
+        set_hnsw_ef_search(ef_search or pick_ef_search(settings.HNSW_TARGET_RECALL, k=topk))
         p = _run_and_parse_stats(
             "rollup_signals",
             "--days-back", str(days_back),
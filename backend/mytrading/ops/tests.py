@@ -1,3 +1,94 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from ops import llm_scheduler
+from ops.llm_scheduler import LLMScheduler, RateLimited, SchedulerTimeout, TransientLLMError
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "llm-scheduler-tests"}}
+
+
+class FakeClock:
+    """代替 llm_scheduler.time：sleep 只係推前時鐘，測試唔使真係等"""
+
+    def __init__(self, t: float = 60 * 1_000_000):
+        self.t = t
+
+    def time(self):
+        return self.t
+
+    def sleep(self, s):
+        self.t += s
+
+
+@override_settings(CACHES=LOCMEM)
+class LLMSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        # jitter 設 0，等待時間先可以準確 assert
+        for patcher in (mock.patch.object(llm_scheduler, "time", self.clock),
+                        mock.patch.object(llm_scheduler.random, "uniform", return_value=0.0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def sched(self, **kw):
+        opts = dict(rpm=0, tokens_per_hour=0, breaker_failures=100, breaker_cooldown_s=30, max_wait_s=60)
+        opts.update(kw)
+        return LLMScheduler(self.id(), **opts)
+
+    def test_rpm_window_rejects_and_rolls_back_counter(self):
+        s = self.sched(rpm=2)
+        key = s._k(f"rpm:{int(self.clock.t // 60)}")
+        self.assertTrue(s._try_reserve(10)[0])
+        self.assertTrue(s._try_reserve(10)[0])
+        ok, wait_s = s._try_reserve(10)
+        self.assertFalse(ok)
+        self.assertEqual(wait_s, 60.0)   # 時鐘喺分鐘起點：等成個窗口
+        self.assertEqual(cache.get(key), 2)
+
+    def test_token_budget_rejection_rolls_back_both_counters(self):
+        s = self.sched(rpm=5, tokens_per_hour=100)
+        self.assertTrue(s._try_reserve(80)[0])
+        self.assertFalse(s._try_reserve(30)[0])
+        self.assertEqual(cache.get(s._k(f"rpm:{int(self.clock.t // 60)}")), 1)
+        self.assertEqual(cache.get(s._k(f"tok:{int(self.clock.t // 3600)}")), 80)
+
+    def test_acquire_waits_for_next_window(self):
+        s = self.sched(rpm=1)
+        s.acquire(10)
+        t0 = self.clock.t
+        s.acquire(10)
+        self.assertGreaterEqual(self.clock.t - t0, 60.0)
+        self.assertEqual(s.snapshot()["queued"], 1)
+
+    def test_retry_after_pauses_share_one_deadline(self):
+        s = self.sched(max_wait_s=10)
+        fn = mock.Mock(side_effect=RateLimited("429", retry_after=4))
+        t0 = self.clock.t
+        with self.assertRaises(SchedulerTimeout):
+            s.run(fn, est_tokens=10)
+        # 0s、4s、8s 各試一次；第三次再停 4s 會過 10s 期限
+        self.assertEqual(fn.call_count, 3)
+        self.assertLessEqual(self.clock.t - t0, 10.0)
+        self.assertEqual(s.snapshot()["rate_limited"], 3)
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        s = self.sched(breaker_failures=3, max_retries=2)
+        fn = mock.Mock(side_effect=TransientLLMError("502"))
+        with self.assertRaises(TransientLLMError), self.assertLogs("ops.llm_scheduler", "WARNING"):
+            s.run(fn, est_tokens=10)
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(s.snapshot()["breaker_opens"], 1)
+        ok, wait_s = s._try_reserve(10)
+        self.assertFalse(ok)
+        self.assertAlmostEqual(wait_s, 30.0)
+
+    def test_success_resets_failure_count(self):
+        s = self.sched(breaker_failures=3)
+        s.on_failure(); s.on_failure()
+        s.run(lambda: "ok", est_tokens=10)
+        s.on_failure(); s.on_failure()
+        self.assertEqual(s.snapshot()["breaker_opens"], 0)
+        self.assertTrue(s._try_reserve(10)[0])
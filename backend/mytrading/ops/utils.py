@@ -1,12 +1,27 @@
 import time, traceback
 from contextlib import contextmanager
 from django.utils import timezone
-from django.db import connection
-from .models import JobRun
+from .models import JobRun, VectorIndexBenchmark
 
 def set_hnsw_ef_search(ef: int = 100):
-    with connection.cursor() as cur:
-        cur.execute("SET hnsw.ef_search = %s;", [ef])
+    # 經 vector_search 設定，KNN cache key 先會跟住 ef_search 變
+    from research.vector_search import set_ef_search
+    set_ef_search(ef)
+
+def pick_ef_search(target_recall: float = 0.95, k: int = 10, default: int = 120,
+                   index_name: str = "resemb_hnsw_cosine") -> int:
+    """
+    由最近一次 bench_hnsw（live index）結果揀最細而 recall@k >= target 嘅 ef_search；
+    未跑過 benchmark 或者冇一個達標就用 default。
+    冇同一 k 嘅結果時，用最接近而 >= k 嘅（k 大啲 recall 通常偏低，較保守）。
+    """
+    qs = VectorIndexBenchmark.objects.filter(index_name=index_name, scratch=False, k__gte=k)
+    latest = qs.order_by("k", "-created_at").first()
+    if latest is None:
+        return default
+    rows = qs.filter(run_id=latest.run_id, k=latest.k, recall__gte=target_recall).order_by("ef_search")
+    best = rows.first()
+    return best.ef_search if best else default
 
 @contextmanager
 def record_job(name: str):
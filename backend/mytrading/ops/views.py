@@ -2,6 +2,7 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.db.models import Count
 from ops.models import JobRun
+from ops import llm_ledger
 from news.models import NewsItem, NewsChunk
 from django.apps import apps as django_apps
 
@@ -36,4 +37,20 @@ def metrics_summary(request):
         "embeddings_total": embeds_total,
         "embeddings_24h": embeds_24h,
         "jobs_24h": jobs,
-    }, json_dumps_params={"ensure_ascii": False})
\ No newline at end of file
+    }, json_dumps_params={"ensure_ascii": False})
+def llm_usage(request):
+    """
+    GET /api/metrics/llm/?days=7&caller=score_news
+    ops.LLMCall 匯總：每 日 × caller × model 嘅 p50 / p95 latency、token、成本，同按 caller 排序嘅總數
+    """
+    try:
+        days = max(1, min(int(request.GET.get("days", 7)), 90))
+    except ValueError:
+        days = 7
+    rows = llm_ledger.rollup(days=days, caller=request.GET.get("caller") or None)
+    return JsonResponse({
+        "now": timezone.now().isoformat(),
+        "days": days,
+        "by_caller": llm_ledger.by_caller(rows, days),
+        "daily": rows,
+    }, json_dumps_params={"ensure_ascii": False})
@@ -0,0 +1,95 @@
+# research/alias_automaton.py
+"""
+別名字典（build_entity_aliases 產生，key = normalize 後嘅大寫 token 串，例如 "TAIWAN SEMICONDUCTOR"）
+編譯成 token 級 Aho-Corasick automaton：一次線性掃描就搵晒所有別名（包括多字公司名），
+並回傳原文精確 char span，唔使再 text.lower().find()。
+
+token 規則同 normalize() 一致：[A-Za-z0-9]+，大寫比較；所以 "BRK.B" / "Taiwan-Semiconductor"
+都會對上 "BRK B" / "TAIWAN SEMICONDUCTOR"。
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+class AliasMatch(NamedTuple):
+    start: int      # 原文 char offset
+    end: int
+    key: str        # 別名字典 key（normalize 後）
+
+
+class AliasAutomaton:
+    def __init__(self, keys: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[tuple]] = [[]]   # state -> [(key, n_tokens)]
+        n = 0
+        for key in keys:
+            toks = key.split()
+            if not toks:
+                continue
+            state = 0
+            for tok in toks:
+                nxt = self._goto[state].get(tok)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({}); self._fail.append(0); self._out.append([])
+                    self._goto[state][tok] = nxt
+                state = nxt
+            self._out[state].append((key, len(toks)))
+            n += 1
+        self.n_keys = n
+        self._build_fail()
+
+    @classmethod
+    def from_aliases(cls, aliases: Dict[str, list]) -> "AliasAutomaton":
+        return cls(aliases.keys())
+
+    def _build_fail(self):
+        # BFS：fail link 指向最長嘅 proper suffix 狀態，並合併輸出
+        q = deque()
+        for nxt in self._goto[0].values():
+            q.append(nxt)
+        while q:
+            s = q.popleft()
+            for tok, nxt in self._goto[s].items():
+                q.append(nxt)
+                f = self._fail[s]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(tok, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str):
+        """所有命中（可重疊），按結束位置排序"""
+        spans = []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for m in TOKEN_RE.finditer(text or ""):
+            tok = m.group(0).upper()
+            spans.append((m.start(), m.end()))
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            if out[state]:
+                i = len(spans) - 1
+                for key, n in out[state]:
+                    yield AliasMatch(spans[i - n + 1][0], spans[i][1], key)
+
+    def find_all(self, text: str, overlapping: bool = False, min_chars: int = 1) -> List[AliasMatch]:
+        """
+        overlapping=False：leftmost-longest、互不重疊（"Taiwan Semiconductor" 唔會再報 "Taiwan"）
+        min_chars：span 少過呢個長度嘅命中丟棄（例如單字母 ticker）
+        """
+        hits = [h for h in self.iter_matches(text) if h.end - h.start >= min_chars]
+        if overlapping:
+            return hits
+        hits.sort(key=lambda h: (h.start, -(h.end - h.start)))
+        out, last_end = [], -1
+        for h in hits:
+            if h.start >= last_end:
+                out.append(h)
+                last_end = h.end
+        return out
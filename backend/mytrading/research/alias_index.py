@@ -0,0 +1,142 @@
+# research/alias_index.py
+"""
+實體連結別名索引。
+
+以往 build_entity_aliases 將成個 dict pickle 入一個 Redis key（24h TTL），每次連結都要成舊反序列化，
+key 過期後連結仲會靜靜雞用 {} 跑。而家：
+  - 別名存喺 EntityAlias 表，AliasIndexMeta.version 係版本號；
+  - get_alias_index() 每個進程載入一次，之後只查一行版本號，版本變咗先重新載入；
+  - reference / IndustryPlayer 有改動時，signals 只重建受影響目標嘅別名（refresh_targets）。
+"""
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F
+
+from reference.models import Company, Industry
+from research.alias_automaton import AliasAutomaton
+from research.models import AliasIndexMeta, EntityAlias, IndustryPlayer
+
+logger = logging.getLogger(__name__)
+
+# aliases[key] 嘅候選次序同舊 Redis 版一致：company → industry → industry_player
+TYPE_ORDER = {"company": 0, "industry": 1, "industry_player": 2}
+
+def normalize(s: str) -> str:
+    return re.sub(r"[^A-Z0-9]+", " ", (s or "").upper()).strip()
+
+
+# ---- 由 reference 行生成別名 ----
+def company_aliases(c: Company):
+    yield c.ticker, "company", c.id, 2.0, "ticker"
+    yield c.name, "company", c.id, 1.5, "name"
+
+def industry_aliases(ind: Industry):
+    yield ind.name, "industry", ind.id, 1.0, "name"
+
+def player_aliases(p: IndustryPlayer):
+    if p.company_id:
+        yield p.company.ticker, "industry_player", p.id, 1.5, "company_ticker"
+        yield p.company.name, "industry_player", p.id, 1.2, "company_name"
+    yield p.name, "industry_player", p.id, 1.0, "name"
+
+def _rows(triples) -> List[EntityAlias]:
+    out = []
+    for alias, ttype, tid, weight, source in triples:
+        key = normalize(alias)
+        if key:
+            out.append(EntityAlias(alias=key, target_type=ttype, target_id=tid, weight=weight, source=source))
+    return out
+
+def _bump_version(n_aliases: Optional[int] = None) -> int:
+    meta, _ = AliasIndexMeta.objects.get_or_create(pk=1)
+    AliasIndexMeta.objects.filter(pk=1).update(
+        version=F("version") + 1,
+        n_aliases=EntityAlias.objects.count() if n_aliases is None else n_aliases,
+    )
+    meta.refresh_from_db()
+    return meta.version
+
+
+@transaction.atomic
+def rebuild_all() -> Tuple[int, int]:
+    """全量重建，回傳 (aliases, version)"""
+    rows = []
+    for c in Company.objects.all():
+        rows += _rows(company_aliases(c))
+    for ind in Industry.objects.all():
+        rows += _rows(industry_aliases(ind))
+    for p in IndustryPlayer.objects.select_related("company").all():
+        rows += _rows(player_aliases(p))
+    EntityAlias.objects.all().delete()
+    EntityAlias.objects.bulk_create(rows, batch_size=1000)
+    return len(rows), _bump_version(len(rows))
+
+@transaction.atomic
+def refresh_targets(targets: Iterable[Tuple[str, int]]) -> int:
+    """
+    增量：只重建指定 (target_type, target_id) 嘅別名；目標已刪除就只刪別名。
+    公司改名 / 改 ticker 會連帶影響引用佢嘅 IndustryPlayer，由 signals 一併傳入。
+    """
+    targets = set(targets)
+    if not targets:
+        return 0
+    rows = []
+    for ttype, tid in targets:
+        EntityAlias.objects.filter(target_type=ttype, target_id=tid).delete()
+        if ttype == "company":
+            obj = Company.objects.filter(pk=tid).first()
+            if obj: rows += _rows(company_aliases(obj))
+        elif ttype == "industry":
+            obj = Industry.objects.filter(pk=tid).first()
+            if obj: rows += _rows(industry_aliases(obj))
+        elif ttype == "industry_player":
+            obj = IndustryPlayer.objects.select_related("company").filter(pk=tid).first()
+            if obj: rows += _rows(player_aliases(obj))
+    EntityAlias.objects.bulk_create(rows)
+    return _bump_version()
+
+
+# ---- 進程內載入 ----
+class AliasIndex:
+    def __init__(self, version: int, aliases: Dict[str, List[Tuple[str, int, float]]]):
+        self.version = version
+        self.aliases = aliases
+        self._automaton = None
+
+    @property
+    def automaton(self) -> AliasAutomaton:
+        if self._automaton is None:
+            self._automaton = AliasAutomaton.from_aliases(self.aliases)
+        return self._automaton
+
+    def __len__(self):
+        return len(self.aliases)
+
+_index: Optional[AliasIndex] = None
+_lock = threading.Lock()
+
+def current_version() -> int:
+    return AliasIndexMeta.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+def load_index(version: int) -> AliasIndex:
+    aliases: Dict[str, List[Tuple[str, int, float]]] = {}
+    rows = EntityAlias.objects.values_list("alias", "target_type", "target_id", "weight", "id")
+    for alias, ttype, tid, weight, _ in sorted(rows, key=lambda r: (TYPE_ORDER.get(r[1], 9), r[4])):
+        aliases.setdefault(alias, []).append((ttype, tid, weight))
+    return AliasIndex(version, aliases)
+
+def get_alias_index() -> AliasIndex:
+    """每次只查一行版本號；版本冇變就直接用進程內已載入嘅索引"""
+    global _index
+    version = current_version()
+    if _index is None or _index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = load_index(version)
+                if not _index.aliases:
+                    logger.warning("Alias index is empty. Run: python manage.py build_entity_aliases")
+    return _index
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ResearchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'research'
+
+    def ready(self):
+        from research import signals  # noqa: F401  別名索引增量更新
@@ -1,36 +1,90 @@
 # research/llm_client.py
 import os, json
-from typing import Dict, Any
-from tenacity import retry, stop_after_attempt, wait_exponential
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+import openai
 from openai import OpenAI
+from ops import llm_cache, llm_ledger
+from ops.llm_scheduler import LLMScheduler, RateLimited, TransientLLMError, estimate_tokens, get_scheduler, parse_retry_after
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
 DEEPSEEK_MODEL = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
 
-client = OpenAI(
-    api_key=DEEPSEEK_API_KEY,
-    base_url=DEEPSEEK_BASE_URL,  # DeepSeek 為 OpenAI-compatible
-)
+_client: Optional[OpenAI] = None
+
+def get_client() -> OpenAI:
+    """延遲建立：冇 DEEPSEEK_API_KEY 都可以 import 本模組（例如 bench_llm_scoring 只用 mock）"""
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            api_key=DEEPSEEK_API_KEY,
+            base_url=DEEPSEEK_BASE_URL,  # DeepSeek 為 OpenAI-compatible
+            max_retries=0,               # 限流 / 重試交俾 ops.llm_scheduler，唔好 SDK 自己再撞
+        )
+    return _client
+
+# bench_llm_scoring 用：暫時改指去 mock server / 獨立排程器
+_override: Dict[str, Any] = {}
+
+@contextmanager
+def endpoint_override(base_url: str, scheduler: Optional[LLMScheduler] = None, api_key: str = "mock"):
+    _override.update(client=OpenAI(api_key=api_key, base_url=base_url, max_retries=0), base_url=base_url,
+                     scheduler=scheduler)
+    try:
+        yield
+    finally:
+        _override.clear()
 
 SYS_JSON_ONLY = (
     "你是一名金融分析師，只能輸出有效 JSON，不可加入任何說明、標點或 Markdown。"
     "若不確定數值，請以 null/估算並標示 is_estimate=true。"
 )
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
-def llm_json(prompt: str) -> Dict[str, Any]:
+def _create(messages):
+    """單次 API call；SDK 例外轉成排程器認得嘅類型"""
+    try:
+        return (_override.get("client") or get_client()).chat.completions.create(
+            model=DEEPSEEK_MODEL,
+            temperature=0.2,
+            messages=messages,
+            response_format={"type":"json_object"},  # OpenAI SDK 支援 JSON 強制
+        )
+    except openai.RateLimitError as e:
+        raise RateLimited(str(e), retry_after=parse_retry_after(e.response.headers.get("retry-after"))) from e
+    except (openai.APIConnectionError, openai.InternalServerError) as e:   # APITimeoutError 係 APIConnectionError 子類
+        raise TransientLLMError(str(e)) from e
+
+# 限流 / 5xx / 斷線由排程器排隊重試；tenacity 只負責「回應唔係合法 JSON」再問一次
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8),
+       retry=retry_if_exception_type(json.JSONDecodeError), reraise=True)
+def llm_json(prompt: str, use_cache: bool = True, refresh: bool = False, caller: str = "llm_json") -> Dict[str, Any]:
     """
     呼叫 DeepSeek，要求返回 JSON。失敗會重試。
+    同一 prompt 經 ops.llm_cache 重用；JSON parse 失敗嘅回應唔會入 cache。
+    refresh=True：唔讀 cache，用新回應覆蓋（例如 schema 驗證失敗後）。
+    caller：記入 ops.llm_ledger 嘅 pipeline 階段（例如 gen_company_ai）。
     """
-    rsp = client.chat.completions.create(
-        model=DEEPSEEK_MODEL,
-        temperature=0.2,
-        messages=[
-            {"role":"system","content":SYS_JSON_ONLY},
-            {"role":"user","content":prompt},
-        ],
-        response_format={"type":"json_object"},  # OpenAI SDK 支援 JSON 強制
+    messages = [
+        {"role":"system","content":SYS_JSON_ONLY},
+        {"role":"user","content":prompt},
+    ]
+
+    def call():
+        rsp = llm_ledger.call(
+            caller, DEEPSEEK_MODEL, _override.get("scheduler") or get_scheduler("deepseek"),
+            lambda: _create(messages),
+            est_tokens=estimate_tokens(messages),
+            usage_of=lambda r: (getattr(r.usage, "prompt_tokens", 0) or 0, getattr(r.usage, "completion_tokens", 0) or 0),
+        )
+        txt = rsp.choices[0].message.content
+        return json.loads(txt)
+
+    data, hit = llm_cache.cached_call(
+        "llm_json", model=DEEPSEEK_MODEL, temperature=0.2, messages=messages,
+        extra={"base_url": _override.get("base_url", DEEPSEEK_BASE_URL)}, fn=call, use_cache=use_cache, refresh=refresh,
     )
-    txt = rsp.choices[0].message.content
-    return json.loads(txt)
\ No newline at end of file
+    if hit:
+        llm_ledger.record_cached(caller, DEEPSEEK_MODEL)
+    return data
\ No newline at end of file
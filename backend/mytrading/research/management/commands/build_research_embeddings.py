@@ -3,10 +3,13 @@ import os, math, json
 from typing import List, Tuple
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Q
 from django.apps import apps as django_apps
 from django.utils import timezone
 
 from reference.models import Company, Industry
+from research.vector_search import bump_snapshot_version
+from research.vector_store import get_vector_store, sync_research_embeddings
 from research.models import (
     CompanyProfile, CompanyRisk, CompanyCatalyst, CompanyThesis,
     IndustryProfile, IndustryPlayer,
@@ -111,6 +114,11 @@ class Command(BaseCommand):
         parser.add_argument("--limit", type=int, default=0, help="Per-type object limit (0 = no limit)")
         parser.add_argument("--overwrite", action="store_true", help="Delete existing embeddings for selected types before insert")
         parser.add_argument("--dry-run", action="store_true", help="Do not write to DB, just report counts")
+        # gen_research_batch 用：重生成咗嘅實體喺同一個 transaction 入面刪舊向量再補，中途失敗會成個 rollback
+        parser.add_argument("--replace-company-ids", type=str, default="",
+                            help="Comma-separated company ids whose existing embeddings are replaced (meta.company_id)")
+        parser.add_argument("--replace-industry-ids", type=str, default="",
+                            help="Comma-separated industry ids whose existing embeddings are replaced (meta.industry_id)")
 
     @transaction.atomic
     def handle(self, *args, **opts):
@@ -124,6 +132,23 @@ class Command(BaseCommand):
         if overwrite:
             deleted = Emb.objects.filter(object_type__in=want_types).delete()[0]
             self.stdout.write(self.style.WARNING(f"Deleted {deleted} existing embeddings for {sorted(want_types)}"))
+            if not dry:
+                transaction.on_commit(lambda: self._after_write(want_types))
+
+        company_ids = [int(x) for x in (opts["replace_company_ids"] or "").split(",") if x.strip()]
+        industry_ids = [int(x) for x in (opts["replace_industry_ids"] or "").split(",") if x.strip()]
+        replaced = 0
+        if (company_ids or industry_ids) and not overwrite and not dry:
+            cond = Q()
+            if company_ids:
+                cond |= Q(meta__company_id__in=company_ids)
+            if industry_ids:
+                cond |= Q(meta__industry_id__in=industry_ids)
+            replaced = Emb.objects.filter(cond, object_type__in=want_types).delete()[0]
+            self.stdout.write(self.style.WARNING(f"Replacing {replaced} existing embeddings"))
+            if replaced:
+                # 就算下面冇新 chunk（例如 profile 清空咗）都要鏡像 + bump 版本
+                transaction.on_commit(lambda: self._after_write(want_types))
 
         total_chunks = 0
         total_objs = 0
@@ -220,4 +245,16 @@ class Command(BaseCommand):
         Emb.objects.bulk_create(rows_final, batch_size=200, ignore_conflicts=True)
         self.stdout.write(self.style.SUCCESS(
             f"[OK] Objects processed={total_objs}, chunks embedded={len(rows_final)}, model={_EMBED_MODEL}"
-        ))
\ No newline at end of file
+        ))
+        if not overwrite and not replaced:
+            transaction.on_commit(lambda: self._after_write(want_types))
+
+    def _after_write(self, want_types):
+        # Postgres 表係 source of truth；如用外部向量庫（Qdrant），commit 後再鏡像過去
+        store = get_vector_store()
+        if store.name != "pgvector":
+            n = sync_research_embeddings(store, sorted(want_types))
+            self.stdout.write(self.style.SUCCESS(f"[OK] Mirrored {n} embeddings to {store.name}"))
+        # 鏡像完先 bump，免得新版本 key cache 咗舊結果
+        ver = bump_snapshot_version()
+        self.stdout.write(self.style.SUCCESS(f"[OK] research snapshot version -> {ver}"))
\ No newline at end of file
@@ -1,5 +1,6 @@
 import json, math
 from django.core.management.base import BaseCommand, CommandError
+from pydantic import ValidationError
 from django.db import transaction
 from django.utils import timezone
 from reference.models import Company
@@ -99,144 +100,160 @@ def _normalize_pct(items, pct_key):
             setattr(i, pct_key, nv)
     return items
 
-class Command(BaseCommand):
-    help = "用 DeepSeek 生成（高細節版）公司的研究內容並寫入 research 表"
+def generate(company: Company, industry_hint: str = "", currency: str = "USD", use_cache: bool = True) -> CompanyAIOutput:
+    """只做 LLM call + 驗證（唔掂 DB 寫入，可以喺 worker 線程並行跑）"""
+    industry_name = industry_hint or (company.industry.name if company.industry else "")
+    prompt = COMPANY_PROMPT_TEMPLATE.format(
+        ticker=company.ticker, name=company.name,
+        industry_name=industry_name, country=company.country,
+        schema=schema_example(), currency=currency, year=timezone.now().year
+    )
 
-    def add_arguments(self, parser):
-        parser.add_argument("--ticker", type=str, required=True)
-        parser.add_argument("--industry", type=str, default="")
-        parser.add_argument("--currency", type=str, default="USD")
-        parser.add_argument("--replace", action="store_true")
+    raw = llm_json(prompt, use_cache=use_cache, caller="gen_company_ai")
+    try:
+        return CompanyAIOutput(**raw)  # Pydantic 驗證
+    except ValidationError:
+        if not use_cache:
+            raise
+        # 可能係 cache 咗嘅舊回應唔啱而家嘅 schema：重新問一次並覆蓋 cache
+        return CompanyAIOutput(**llm_json(prompt, refresh=True, caller="gen_company_ai"))
 
-    @transaction.atomic
-    def handle(self, *args, **opts):
-        ticker = opts["ticker"].strip().upper()
-        industry_hint = opts["industry"].strip()
-        currency = opts["currency"].strip().upper() or "USD"
-        replace = opts["replace"]
 
-        try:
-            company = Company.objects.get(ticker=ticker)
-        except Company.DoesNotExist:
-            raise CommandError(f"Company not found: {ticker}")
+@transaction.atomic
+def save(company: Company, data: CompanyAIOutput, replace: bool = False) -> int:
+    """寫入 research 表（一間公司一個 transaction）；回傳 as_of_year"""
+    year = data.as_of_year
 
-        industry_name = industry_hint or (company.industry.name if company.industry else "")
-        prompt = COMPANY_PROMPT_TEMPLATE.format(
-            ticker=company.ticker, name=company.name,
-            industry_name=industry_name, country=company.country,
-            schema=schema_example(), currency=currency, year=timezone.now().year
-        )
+    # ---- 可選：把 product / geography 的百分比 normalize 到 ~100
+    data.revenue_by_product = _normalize_pct(data.revenue_by_product, "revenue_pct")
+    data.revenue_by_geography = _normalize_pct(data.revenue_by_geography, "revenue_pct")
 
-        raw = llm_json(prompt)
-        data = CompanyAIOutput(**raw)  # Pydantic 驗證
-
-        year = data.as_of_year
-
-        # ---- 可選：把 product / geography 的百分比 normalize 到 ~100
-        data.revenue_by_product = _normalize_pct(data.revenue_by_product, "revenue_pct")
-        data.revenue_by_geography = _normalize_pct(data.revenue_by_geography, "revenue_pct")
-
-        if replace:
-            CompanyRevenueByProduct.objects.filter(company=company, year=year).delete()
-            CompanyRevenueByGeography.objects.filter(company=company, year=year).delete()
-            CompanyCustomerShare.objects.filter(company=company, year=year).delete()
-            CompanySupplierShare.objects.filter(company=company, year=year).delete()
-            CompanyRisk.objects.filter(company=company).delete()
-            CompanyCatalyst.objects.filter(company=company).delete()
-            CompanyCompetitor.objects.filter(company=company).delete()
-            CompanyRelatedStock.objects.filter(company=company).delete()
-            CompanyThesis.objects.filter(company=company).delete()
-
-        # Profile
-        prof, _ = CompanyProfile.objects.get_or_create(company=company)
-        prof.business_model_summary = data.business_model_summary or ""
-        prof.growth_drivers = data.growth_drivers or ""
-        prof.save()
-
-        # Revenue by product
-        for rp in data.revenue_by_product:
-            CompanyRevenueByProduct.objects.update_or_create(
-                company=company, year=year, product=rp.product,
-                defaults=dict(
-                    revenue_pct=rp.revenue_pct, revenue_usd=rp.revenue_usd,
-                    source_url=(rp.evidence.source_url if rp.evidence else "") or ""
-                )
-            )
+    if replace:
+        CompanyRevenueByProduct.objects.filter(company=company, year=year).delete()
+        CompanyRevenueByGeography.objects.filter(company=company, year=year).delete()
+        CompanyCustomerShare.objects.filter(company=company, year=year).delete()
+        CompanySupplierShare.objects.filter(company=company, year=year).delete()
+        CompanyRisk.objects.filter(company=company).delete()
+        CompanyCatalyst.objects.filter(company=company).delete()
+        CompanyCompetitor.objects.filter(company=company).delete()
+        CompanyRelatedStock.objects.filter(company=company).delete()
+        CompanyThesis.objects.filter(company=company).delete()
 
-        # Revenue by geography
-        for rg in data.revenue_by_geography:
-            CompanyRevenueByGeography.objects.update_or_create(
-                company=company, year=year, region=rg.region,
-                defaults=dict(
-                    revenue_pct=rg.revenue_pct, revenue_usd=rg.revenue_usd,
-                    source_url=(rg.evidence.source_url if rg.evidence else "") or ""
-                )
-            )
+    # Profile
+    prof, _ = CompanyProfile.objects.get_or_create(company=company)
+    prof.business_model_summary = data.business_model_summary or ""
+    prof.growth_drivers = data.growth_drivers or ""
+    prof.save()
 
-        # Customers
-        for c in data.largest_customers:
-            CompanyCustomerShare.objects.update_or_create(
-                company=company, year=year, customer_name=c.name,
-                defaults=dict(
-                    revenue_pct=c.revenue_pct, is_estimate=c.is_estimate,
-                    source_url=(c.evidence.source_url if c.evidence else "") or ""
-                )
+    # Revenue by product
+    for rp in data.revenue_by_product:
+        CompanyRevenueByProduct.objects.update_or_create(
+            company=company, year=year, product=rp.product,
+            defaults=dict(
+                revenue_pct=rp.revenue_pct, revenue_usd=rp.revenue_usd,
+                source_url=(rp.evidence.source_url if rp.evidence else "") or ""
             )
+        )
 
-        # Suppliers
-        for s in data.largest_suppliers:
-            CompanySupplierShare.objects.update_or_create(
-                company=company, year=year, supplier_name=s.name,
-                defaults=dict(
-                    cost_pct=s.cost_pct, is_estimate=s.is_estimate,
-                    source_url=(s.evidence.source_url if s.evidence else "") or ""
-                )
+    # Revenue by geography
+    for rg in data.revenue_by_geography:
+        CompanyRevenueByGeography.objects.update_or_create(
+            company=company, year=year, region=rg.region,
+            defaults=dict(
+                revenue_pct=rg.revenue_pct, revenue_usd=rg.revenue_usd,
+                source_url=(rg.evidence.source_url if rg.evidence else "") or ""
             )
+        )
 
-        # Risks
-        for r in data.risks:
-            CompanyRisk.objects.create(
-                company=company, category=r.category, description=r.description,
-                horizon=r.horizon, severity_1_5=r.severity_1_5, likelihood_1_5=r.likelihood_1_5,
-                source_url=(r.evidence.source_url if r.evidence else "") or "",
-                as_of=None
+    # Customers
+    for c in data.largest_customers:
+        CompanyCustomerShare.objects.update_or_create(
+            company=company, year=year, customer_name=c.name,
+            defaults=dict(
+                revenue_pct=c.revenue_pct, is_estimate=c.is_estimate,
+                source_url=(c.evidence.source_url if c.evidence else "") or ""
             )
+        )
 
-        # Catalysts
-        for c in data.catalysts:
-            CompanyCatalyst.objects.create(
-                company=company, description=c.description, positive=c.positive,
-                timeframe_months=c.timeframe_months, probability_0_1=c.probability_0_1,
-                expected_impact=c.expected_impact or "",
-                source_url=(c.evidence.source_url if c.evidence else "") or "",
-                as_of=None
+    # Suppliers
+    for s in data.largest_suppliers:
+        CompanySupplierShare.objects.update_or_create(
+            company=company, year=year, supplier_name=s.name,
+            defaults=dict(
+                cost_pct=s.cost_pct, is_estimate=s.is_estimate,
+                source_url=(s.evidence.source_url if s.evidence else "") or ""
             )
+        )
 
-        # Competitors
-        for comp in data.competitors:
-            competitor_obj = None
-            if comp.ticker:
-                competitor_obj = Company.objects.filter(ticker=comp.ticker.upper()).first()
-            CompanyCompetitor.objects.create(
-                company=company, competitor=competitor_obj,
-                competitor_name=comp.name, competitor_ticker=(comp.ticker or ""),
-                market_share_pct=comp.market_share_pct, market_name=comp.market_name or ""
-            )
+    # Risks
+    for r in data.risks:
+        CompanyRisk.objects.create(
+            company=company, category=r.category, description=r.description,
+            horizon=r.horizon, severity_1_5=r.severity_1_5, likelihood_1_5=r.likelihood_1_5,
+            source_url=(r.evidence.source_url if r.evidence else "") or "",
+            as_of=None
+        )
+
+    # Catalysts
+    for c in data.catalysts:
+        CompanyCatalyst.objects.create(
+            company=company, description=c.description, positive=c.positive,
+            timeframe_months=c.timeframe_months, probability_0_1=c.probability_0_1,
+            expected_impact=c.expected_impact or "",
+            source_url=(c.evidence.source_url if c.evidence else "") or "",
+            as_of=None
+        )
 
-        # Related stocks
-        for rel in data.related_stocks:
-            CompanyRelatedStock.objects.update_or_create(
-                company=company, symbol=rel.symbol.upper(),
-                defaults=dict(
-                    name=rel.name or "",
-                    relation_text=rel.relation_text,
-                    relation_type=rel.relation_type or ""
-                )
+    # Competitors
+    for comp in data.competitors:
+        competitor_obj = None
+        if comp.ticker:
+            competitor_obj = Company.objects.filter(ticker=comp.ticker.upper()).first()
+        CompanyCompetitor.objects.create(
+            company=company, competitor=competitor_obj,
+            competitor_name=comp.name, competitor_ticker=(comp.ticker or ""),
+            market_share_pct=comp.market_share_pct, market_name=comp.market_name or ""
+        )
+
+    # Related stocks
+    for rel in data.related_stocks:
+        CompanyRelatedStock.objects.update_or_create(
+            company=company, symbol=rel.symbol.upper(),
+            defaults=dict(
+                name=rel.name or "",
+                relation_text=rel.relation_text,
+                relation_type=rel.relation_type or ""
             )
+        )
+
+    # Theses
+    for th in data.theses:
+        CompanyThesis.objects.create(company=company, side=th.side, content=th.content)
+
+    return year
+
+
+class Command(BaseCommand):
+    help = "用 DeepSeek 生成（高細節版）公司的研究內容並寫入 research 表"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ticker", type=str, required=True)
+        parser.add_argument("--industry", type=str, default="")
+        parser.add_argument("--currency", type=str, default="USD")
+        parser.add_argument("--no-llm-cache", action="store_true", help="唔用 LLM 回應 cache（強制重新生成）")
+        parser.add_argument("--replace", action="store_true")
+
+    def handle(self, *args, **opts):
+        ticker = opts["ticker"].strip().upper()
+        currency = opts["currency"].strip().upper() or "USD"
+
+        try:
+            company = Company.objects.select_related("industry").get(ticker=ticker)
+        except Company.DoesNotExist:
+            raise CommandError(f"Company not found: {ticker}")
 
-        # Theses
-        for th in data.theses:
-            CompanyThesis.objects.create(company=company, side=th.side, content=th.content)
+        data = generate(company, opts["industry"].strip(), currency, use_cache=not opts["no_llm_cache"])
+        year = save(company, data, replace=opts["replace"])
 
         self.stdout.write(self.style.SUCCESS(
             f"[OK] Saved detailed research for {company.ticker} ({year}, currency={data.currency})."
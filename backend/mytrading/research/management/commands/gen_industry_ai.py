@@ -1,6 +1,7 @@
 # research/management/commands/gen_industry_ai.py
 import json
 from django.core.management.base import BaseCommand, CommandError
+from pydantic import ValidationError
 from django.db import transaction
 from reference.models import Industry, Company
 from research.models import IndustryProfile, IndustryPlayer
@@ -127,66 +128,81 @@ def schema_example() -> str:
         ]
     }, ensure_ascii=False)
 
+def generate(industry: Industry, use_cache: bool = True) -> IndustryAIOutput:
+    """只做 LLM call + 驗證（唔掂 DB 寫入，可以喺 worker 線程並行跑）"""
+    prompt = PROMPT.format(
+        industry_name=industry.name,
+        sector_name=industry.sector.name if industry.sector else "",
+        schema=schema_example(),
+    )
+
+    # --- LLM call & validation
+    raw = llm_json(prompt, use_cache=use_cache, caller="gen_industry_ai")
+    try:
+        return IndustryAIOutput(**raw)  # pydantic validation
+    except ValidationError:
+        if not use_cache:
+            raise
+        # 可能係 cache 咗嘅舊回應唔啱而家嘅 schema：重新問一次並覆蓋 cache
+        return IndustryAIOutput(**llm_json(prompt, refresh=True, caller="gen_industry_ai"))
+
+
+@transaction.atomic
+def save(industry: Industry, data: IndustryAIOutput, replace: bool = False) -> None:
+    """寫入 IndustryProfile / IndustryPlayer（一個行業一個 transaction）"""
+    # --- Replace existing (optional)
+    if replace:
+        IndustryPlayer.objects.filter(industry=industry).delete()
+        IndustryProfile.objects.filter(industry=industry).delete()
+
+    # --- Upsert profile
+    prof, _ = IndustryProfile.objects.get_or_create(industry=industry)
+    prof.overview_under_1000w = data.overview_under_1000w or ""
+    prof.trends = data.trends or ""
+    prof.catalysts = data.catalysts or ""
+    prof.value_chain_summary = data.value_chain_summary or ""
+    prof.save()
+
+    # --- Upsert players
+    for p in data.players:
+        # 嘗試 map 到已存在的 Company（靠 ticker）
+        comp = None
+        if p.symbol:
+            comp = Company.objects.filter(ticker=p.symbol.upper()).first()
+
+        IndustryPlayer.objects.create(
+            industry=industry,
+            company=comp,
+            name=p.name,
+            role=normalize_role(p.role),
+            summary_under_300w=p.summary_under_300w or "",
+            # 直接把 evidence 一齊寫入 JSON 欄位，方便往後檢索/審計
+            largest_customers_json=[c.dict() for c in p.largest_customers],
+            largest_suppliers_json=[s.dict() for s in p.largest_suppliers],
+            symbol=(p.symbol or ""),
+            market_cap_usd=p.market_cap_usd,
+            revenue_growth_5y_pct=p.revenue_growth_5y_pct,
+            profit_growth_5y_pct=p.profit_growth_5y_pct,
+        )
+
+
 class Command(BaseCommand):
     help = "Generate a detailed industry report via DeepSeek and persist to IndustryProfile/IndustryPlayer."
 
     def add_arguments(self, parser):
         parser.add_argument("--industry-id", type=int, required=True, help="reference.Industry pk")
+        parser.add_argument("--no-llm-cache", action="store_true", help="唔用 LLM 回應 cache（強制重新生成）")
         parser.add_argument("--replace", action="store_true", help="Delete existing profile/players before insert")
 
-    @transaction.atomic
     def handle(self, *args, **opts):
         ind_id = opts["industry_id"]
-        replace = opts["replace"]
 
         try:
-            industry = Industry.objects.get(id=ind_id)
+            industry = Industry.objects.select_related("sector").get(id=ind_id)
         except Industry.DoesNotExist:
             raise CommandError(f"Industry not found: id={ind_id}")
 
-        prompt = PROMPT.format(
-            industry_name=industry.name,
-            sector_name=industry.sector.name if industry.sector else "",
-            schema=schema_example(),
-        )
-
-        # --- LLM call & validation
-        raw = llm_json(prompt)
-        data = IndustryAIOutput(**raw)  # pydantic validation
-
-        # --- Replace existing (optional)
-        if replace:
-            IndustryPlayer.objects.filter(industry=industry).delete()
-            IndustryProfile.objects.filter(industry=industry).delete()
-
-        # --- Upsert profile
-        prof, _ = IndustryProfile.objects.get_or_create(industry=industry)
-        prof.overview_under_1000w = data.overview_under_1000w or ""
-        prof.trends = data.trends or ""
-        prof.catalysts = data.catalysts or ""
-        prof.value_chain_summary = data.value_chain_summary or ""
-        prof.save()
-
-        # --- Upsert players
-        for p in data.players:
-            # 嘗試 map 到已存在的 Company（靠 ticker）
-            comp = None
-            if p.symbol:
-                comp = Company.objects.filter(ticker=p.symbol.upper()).first()
-
-            IndustryPlayer.objects.create(
-                industry=industry,
-                company=comp,
-                name=p.name,
-                role=normalize_role(p.role),
-                summary_under_300w=p.summary_under_300w or "",
-                # 直接把 evidence 一齊寫入 JSON 欄位，方便往後檢索/審計
-                largest_customers_json=[c.dict() for c in p.largest_customers],
-                largest_suppliers_json=[s.dict() for s in p.largest_suppliers],
-                symbol=(p.symbol or ""),
-                market_cap_usd=p.market_cap_usd,
-                revenue_growth_5y_pct=p.revenue_growth_5y_pct,
-                profit_growth_5y_pct=p.profit_growth_5y_pct,
-            )
+        data = generate(industry, use_cache=not opts["no_llm_cache"])
+        save(industry, data, replace=opts["replace"])
 
         self.stdout.write(self.style.SUCCESS(f"[OK] Saved detailed industry research for '{industry.name}'."))
\ No newline at end of file
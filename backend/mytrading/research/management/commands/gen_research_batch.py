@@ -0,0 +1,136 @@
+# research/management/commands/gen_research_batch.py
+import json, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from reference.models import Company, Industry
+from ops import llm_ledger
+from research.management.commands import gen_company_ai, gen_industry_ai
+
+COMPANY_EMB_TYPES = ("company_profile", "company_risk", "company_catalyst", "company_thesis")
+INDUSTRY_EMB_TYPES = ("industry_profile", "industry_player")
+
+def _csv(v):
+    return [x.strip() for x in (v or "").split(",") if x.strip()]
+
+class Command(BaseCommand):
+    help = ("Batch gen_company_ai / gen_industry_ai over a universe (list, or missing/stale profiles): "
+            "concurrent LLM calls under the shared scheduler, one transaction per entity, then re-embed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=["company", "industry"], required=True)
+        # universe
+        parser.add_argument("--tickers", type=str, default="", help="逗號分隔，例如 TSM,NVDA")
+        parser.add_argument("--industries", type=str, default="", help="行業名，逗號分隔")
+        parser.add_argument("--industry-ids", type=str, default="", help="reference.Industry pk，逗號分隔")
+        parser.add_argument("--missing", action="store_true", help="全部未有 profile（或 profile 係空）嘅公司 / 行業")
+        parser.add_argument("--stale-days", type=int, default=0, help="配合 --missing：profile 超過 N 日冇更新都重做")
+        parser.add_argument("--limit", type=int, default=0)
+        # checkpoint：profile 喺呢段時間內寫過就當做完，重跑會跳過
+        parser.add_argument("--skip-fresh-hours", type=float, default=24.0,
+                            help="profile 喺 N 小時內更新過就跳過（0 = 唔跳，全部重做）")
+        # 執行
+        parser.add_argument("--concurrency", type=int, default=4,
+                            help="同時在途嘅 LLM call；RPM / token 配額由共用 'deepseek' 排程器控制")
+        parser.add_argument("--currency", type=str, default="USD")
+        parser.add_argument("--replace", action="store_true")
+        parser.add_argument("--no-llm-cache", action="store_true", help="唔用 LLM 回應 cache（強制重新生成）")
+        parser.add_argument("--no-embed", action="store_true", help="完成後唔跑 build_research_embeddings")
+
+    # ---- universe ----
+    def universe(self, opts):
+        kind = opts["kind"]
+        if kind == "company":
+            qs = Company.objects.select_related("industry")
+            tickers = [t.upper() for t in _csv(opts["tickers"])]
+            if tickers:
+                qs = qs.filter(ticker__in=tickers)
+                missing = set(tickers) - set(qs.values_list("ticker", flat=True))
+                for t in sorted(missing):
+                    self.stderr.write(f"[gen_research_batch] company not found: {t}")
+            elif opts["missing"]:
+                cond = Q(profile__isnull=True) | Q(profile__business_model_summary="")
+                if opts["stale_days"] > 0:
+                    cond |= Q(profile__updated_at__lt=timezone.now() - timezone.timedelta(days=opts["stale_days"]))
+                qs = qs.filter(cond, is_active=True)
+            else:
+                raise CommandError("Give --tickers or --missing")
+        else:
+            qs = Industry.objects.select_related("sector")
+            names, ids = _csv(opts["industries"]), [int(x) for x in _csv(opts["industry_ids"])]
+            if names or ids:
+                qs = qs.filter(Q(name__in=names) | Q(id__in=ids))
+                for n in sorted(set(names) - set(qs.values_list("name", flat=True))):
+                    self.stderr.write(f"[gen_research_batch] industry not found: {n}")
+            elif opts["missing"]:
+                cond = Q(profile__isnull=True) | Q(profile__overview_under_1000w="")
+                if opts["stale_days"] > 0:
+                    cond |= Q(profile__updated_at__lt=timezone.now() - timezone.timedelta(days=opts["stale_days"]))
+                qs = qs.filter(cond)
+            else:
+                raise CommandError("Give --industries / --industry-ids or --missing")
+
+        skipped = 0
+        if opts["skip_fresh_hours"] > 0:
+            fresh = Q(profile__updated_at__gte=timezone.now() - timezone.timedelta(hours=opts["skip_fresh_hours"]))
+            skipped = qs.filter(fresh).count()
+            qs = qs.exclude(fresh)
+        qs = qs.order_by("pk").distinct()
+        if opts["limit"] > 0:
+            qs = qs[:opts["limit"]]
+        return list(qs), skipped
+
+    def handle(self, *args, **opts):
+        kind = opts["kind"]
+        entities, skipped = self.universe(opts)
+        use_cache = not opts["no_llm_cache"]
+        currency = opts["currency"].strip().upper() or "USD"
+        mod = gen_company_ai if kind == "company" else gen_industry_ai
+
+        def label(e):
+            return e.ticker if kind == "company" else e.name
+
+        @llm_ledger.in_worker
+        def generate(e):
+            # worker 線程只做 LLM call（llm_json 經共用排程器限流 / 退避）；DB 寫入留返主線程（ledger 除外）
+            if kind == "company":
+                return gen_company_ai.generate(e, currency=currency, use_cache=use_cache)
+            return gen_industry_ai.generate(e, use_cache=use_cache)
+
+        self.stdout.write(self.style.NOTICE(
+            f"[gen_research_batch] kind={kind} todo={len(entities)} skipped_fresh={skipped} concurrency={opts['concurrency']}"))
+        t0 = time.perf_counter()
+        done_ids, failures = [], {}
+        with ThreadPoolExecutor(max_workers=max(1, opts["concurrency"])) as pool:
+            futs = {pool.submit(generate, e): e for e in entities}
+            for fut in as_completed(futs):
+                e = futs[fut]
+                try:
+                    # 每個實體一個 transaction：中途失敗唔影響已完成嘅，重跑靠 --skip-fresh-hours 跳過
+                    mod.save(e, fut.result(), replace=opts["replace"])
+                except Exception as ex:
+                    failures[label(e)] = repr(ex)[:500]
+                    self.stderr.write(f"[gen_research_batch:fail] {label(e)} err={ex}")
+                    continue
+                done_ids.append(e.pk)
+                self.stdout.write(f"[gen_research_batch:ok] {label(e)}")
+        elapsed = time.perf_counter() - t0
+
+        embedded = False
+        if done_ids and not opts["no_embed"]:
+            # 更新過嘅實體：刪舊向量（profile 原地更新、--replace 刪咗嘅 risk 等）同補嵌入喺同一個 transaction，
+            # encoder / DB 出事就成個 rollback，舊向量仲喺度；commit 後先鏡像 + bump 快照版本
+            types = COMPANY_EMB_TYPES if kind == "company" else INDUSTRY_EMB_TYPES
+            call_command("build_research_embeddings", "--types", ",".join(types),
+                         f"--replace-{kind}-ids", ",".join(str(i) for i in done_ids), stdout=self.stdout)
+            embedded = True
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] gen_research_batch kind={kind} ok={len(done_ids)} failed={len(failures)} skipped={skipped}"))
+        stats = {
+            "processed": len(done_ids), "failed": len(failures), "skipped": skipped,
+            "elapsed_s": round(elapsed, 2), "embedded": embedded, "failures": failures,
+        }
+        self.stdout.write(f"STATS {json.dumps(stats, ensure_ascii=False)}")
@@ -2,13 +2,14 @@
 import math
 from collections import defaultdict
 from django.core.management.base import BaseCommand
-from django.db import connection, transaction
+from django.db import transaction
 from django.utils import timezone
 from django.apps import apps as django_apps
 
 from news.models import NewsItem, NewsChunk
 from research.models import AnalyticsCompanySignal
 from research.models import CompanyProfile, CompanyRisk, CompanyCatalyst, CompanyThesis
+from research.vector_search import research_topk
 
 RESEARCH_TYPES = (
     "company_profile","company_risk","company_catalyst","company_thesis"
@@ -37,29 +38,6 @@ def get_embeddings_model():
 def days_diff(a, b):
     return abs((a - b).days)
 
-def cosine_topk(qv, k=5):
-    # 確保 qv 是正確的格式並轉換為 PostgreSQL vector 字符串
-    if hasattr(qv, 'tolist'):  # NumPy 數組
-        qv_list = qv.tolist()
-    elif isinstance(qv, (list, tuple)):
-        qv_list = list(qv)
-    else:
-        qv_list = [float(x) for x in qv]
-    
-    vector_str = '[' + ','.join(map(str, qv_list)) + ']'
-    
-    sql = """
-    SELECT object_type, object_id, chunk_id,
-           1 - (vector <=> %s::vector) AS sim
-    FROM research_researchembedding
-    WHERE object_type = ANY(%s)
-    ORDER BY vector <=> %s::vector
-    LIMIT %s;
-    """
-    with connection.cursor() as cur:
-        cur.execute(sql, [vector_str, list(RESEARCH_TYPES), vector_str, k])
-        return cur.fetchall()  # [(obj_type, obj_id, chunk_id, sim), ...]
-
 def resolve_company(obj_type, obj_id):
     """
     由研究物件定位 company_id，以及補充 polarity（如 thesis/catalyst）
@@ -146,7 +124,7 @@ class Command(BaseCommand):
                 continue
             qv = vecs[ch.idx]
 
-            for obj_type, obj_id, r_cid, sim in cosine_topk(qv, k=topk):
+            for obj_type, obj_id, r_cid, sim in research_topk(qv, RESEARCH_TYPES, k=topk):
                 if sim < min_sim:
                     continue
 
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0009_analyticscompanysignal_last_aggregated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AliasIndexMeta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+                ('n_aliases', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EntityAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=256)),
+                ('target_type', models.CharField(max_length=40)),
+                ('target_id', models.IntegerField()),
+                ('weight', models.FloatField(default=1.0)),
+                ('source', models.CharField(blank=True, default='', max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['alias'], name='research_en_alias_833b49_idx'), models.Index(fields=['target_type', 'target_id'], name='research_en_target__994939_idx')],
+            },
+        ),
+    ]
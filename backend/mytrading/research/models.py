@@ -341,4 +341,35 @@ class AnalyticsCompanySignal(models.Model):
         unique_together = [("company", "window_start", "window_end")]
 
     def __str__(self):
-        return f"{self.company.ticker} {self.window_start.date()}–{self.window_end.date()} score={self.score:.3f}"
\ No newline at end of file
+        return f"{self.company.ticker} {self.window_start.date()}–{self.window_end.date()} score={self.score:.3f}"
+
+# --------- 實體連結別名索引 ---------
+class EntityAlias(models.Model):
+    """
+    一條別名 → 一個連結目標。alias 為 normalize 後嘅大寫 token 串（例如 "TAIWAN SEMICONDUCTOR"）。
+    由 research.alias_index 維護：build_entity_aliases 全量重建，reference 表變動時按目標增量更新。
+    """
+    alias = models.CharField(max_length=256)
+    target_type = models.CharField(max_length=40)   # 'company' | 'industry' | 'industry_player'
+    target_id = models.IntegerField()
+    weight = models.FloatField(default=1.0)
+    source = models.CharField(max_length=20, blank=True, default="")  # 'ticker' | 'name' | 'company_ticker' ...
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["alias"]),
+            models.Index(fields=["target_type", "target_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.alias} -> {self.target_type}:{self.target_id} ({self.weight})"
+
+
+class AliasIndexMeta(models.Model):
+    """單行表：別名索引版本號；每次重建/增量更新都 +1，各進程見版本變咗先重新載入"""
+    version = models.BigIntegerField(default=0)
+    n_aliases = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"alias index v{self.version} ({self.n_aliases} aliases)"
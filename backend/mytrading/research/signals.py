@@ -0,0 +1,46 @@
+# research/signals.py
+"""reference / IndustryPlayer 有改動 → commit 後增量更新別名索引（research.alias_index）"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from reference.models import Company, Industry
+from research.alias_index import refresh_targets
+from research.models import IndustryPlayer
+
+def _schedule(targets):
+    targets = list(targets)
+    transaction.on_commit(lambda: refresh_targets(targets))
+
+@receiver(post_save, sender=Company)
+def company_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # 公司 ticker / 名都係 IndustryPlayer 嘅別名來源
+    players = IndustryPlayer.objects.filter(company_id=instance.pk).values_list("id", flat=True)
+    _schedule([("company", instance.pk)] + [("industry_player", pid) for pid in players])
+
+@receiver(pre_delete, sender=Company)
+def company_deleting(sender, instance, **kwargs):
+    # 刪除後 FK 會 SET_NULL，要喺之前記低受影響嘅 player
+    instance._alias_player_ids = list(
+        IndustryPlayer.objects.filter(company_id=instance.pk).values_list("id", flat=True))
+
+@receiver(post_delete, sender=Company)
+def company_deleted(sender, instance, **kwargs):
+    pids = getattr(instance, "_alias_player_ids", [])
+    _schedule([("company", instance.pk)] + [("industry_player", pid) for pid in pids])
+
+@receiver(post_save, sender=Industry)
+@receiver(post_delete, sender=Industry)
+def industry_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _schedule([("industry", instance.pk)])
+
+@receiver(post_save, sender=IndustryPlayer)
+@receiver(post_delete, sender=IndustryPlayer)
+def player_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _schedule([("industry_player", instance.pk)])
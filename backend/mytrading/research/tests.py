@@ -1,3 +1,107 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.db import connections
+from django.test import SimpleTestCase
+
+from research import vector_search
+from research.vector_store import QdrantStore
+
+DIM = 4
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=np.float64)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def _point(pid, vector, object_type="company_profile", object_id=None, chunk_id=0, **meta):
+    return {"id": pid, "vector": vector, "object_type": object_type,
+            "object_id": pid if object_id is None else object_id, "chunk_id": chunk_id, "meta": meta}
+
+
+class QdrantStoreTests(SimpleTestCase):
+    """embedded :memory: 模式，唔使起 server；結果形狀要同 PgVectorStore 一樣"""
+
+    def setUp(self):
+        self.store = QdrantStore(path=":memory:", collection="test_research", dim=DIM)
+        self.store.upsert([
+            _point(1, [1, 0, 0, 0], ticker="NVDA", company_id=1),
+            _point(2, [0.9, 0.1, 0, 0], ticker="NVDA", company_id=1, chunk_id=1),
+            _point(3, [0.5, 0.5, 0, 0], ticker="TSM", company_id=2),
+            _point(4, [0, 1, 0, 0], object_type="company_risk", ticker="TSM", company_id=2),
+            _point(5, [0, 0, 1, 0], object_type="industry_profile", industry_id=7),
+        ])
+
+    def ids(self, rows):
+        return [r[1] for r in rows]
+
+    def test_upsert_counts_and_overwrites_by_id(self):
+        n = self.store.upsert([_point(1, [0, 0, 0, 1], ticker="AMD", company_id=9)])
+        self.assertEqual(n, 1)
+        rows = self.store.topk([0, 0, 0, 1], object_types=["company_profile"], k=1, with_meta=True)
+        self.assertEqual(rows[0][1], 1)
+        self.assertEqual(rows[0][4], {"ticker": "AMD", "company_id": 9})
+        self.assertEqual(self.store.client.count(self.store.collection).count, 5)
+
+    def test_row_shape_and_order_match_pgvector(self):
+        rows = self.store.topk([1, 0, 0, 0], object_types=["company_profile"], k=3)
+        # (object_type, object_id, chunk_id, sim)，sim 由大到細
+        self.assertEqual([len(r) for r in rows], [4, 4, 4])
+        self.assertEqual(self.ids(rows), [1, 2, 3])
+        self.assertEqual(rows[1][:3], ("company_profile", 2, 1))
+        sims = [r[3] for r in rows]
+        self.assertEqual(sims, sorted(sims, reverse=True))
+        # cosine similarity，同 pgvector 嘅 1 - (a <=> b) 一致
+        self.assertAlmostEqual(sims[0], 1.0, places=5)
+        self.assertAlmostEqual(sims[2], float(np.dot([1, 0, 0, 0], _unit([0.5, 0.5, 0, 0]))), places=5)
+
+    def test_topk_batch_keeps_query_order(self):
+        out = self.store.topk_batch([[0, 1, 0, 0], [1, 0, 0, 0], [0.5, 0.6, 0, 0]],
+                                    object_types=["company_profile", "company_risk"], k=1)
+        self.assertEqual(len(out), 3)
+        self.assertEqual([self.ids(r) for r in out], [[4], [1], [3]])
+        self.assertEqual(self.store.topk_batch([], k=3), [])
+
+    def test_object_types_filter(self):
+        rows = self.store.topk([0, 0, 1, 0], object_types=["industry_profile"], k=5)
+        self.assertEqual([(r[0], r[1]) for r in rows], [("industry_profile", 5)])
+
+    def test_meta_filters_and_with_meta(self):
+        rows = self.store.topk([1, 0, 0, 0], object_types=["company_profile", "company_risk"], k=5,
+                               filters={"ticker": "TSM"}, with_meta=True)
+        self.assertEqual(self.ids(rows), [3, 4])
+        self.assertEqual([len(r) for r in rows], [5, 5])
+        self.assertEqual(rows[0][4], {"ticker": "TSM", "company_id": 2})
+
+        rows = self.store.topk([1, 0, 0, 0], object_types=["company_profile"], k=5,
+                               filters={"ticker": "NVDA", "company_id": 1})
+        self.assertEqual(self.ids(rows), [1, 2])
+        self.assertEqual(self.store.topk([1, 0, 0, 0], k=5, filters={"ticker": "AMD"}), [])
+
+    def test_delete_by_ids(self):
+        self.store.delete(ids=[1, 3])
+        rows = self.store.topk([1, 0, 0, 0], object_types=["company_profile"], k=5)
+        self.assertEqual(self.ids(rows), [2])
+
+    def test_delete_by_object_types(self):
+        self.store.delete(object_types=["company_profile", "industry_profile"])
+        rows = self.store.topk([1, 0, 0, 0], object_types=["company_profile", "company_risk", "industry_profile"], k=5)
+        self.assertEqual([(r[0], r[1]) for r in rows], [("company_risk", 4)])
+
+
+class EfSearchTests(SimpleTestCase):
+    """hnsw.ef_search 係 session 級：重連之後要當返預設值，唔好用舊 ef 做 KNN cache key"""
+
+    def test_ef_search_is_tied_to_the_raw_connection(self):
+        conn, cursor = connections["default"], mock.MagicMock()
+        self.addCleanup(conn.__dict__.pop, "_hnsw_ef_search", None)
+        with mock.patch.object(conn, "cursor", return_value=cursor), \
+             mock.patch.object(conn, "connection", object()):
+            self.assertEqual(vector_search.current_ef_search(), vector_search.DEFAULT_EF_SEARCH)
+            vector_search.set_ef_search(120)
+            cursor.__enter__.return_value.execute.assert_called_once_with("SET hnsw.ef_search = %s;", [120])
+            self.assertEqual(vector_search.current_ef_search(), 120)
+            # CONN_MAX_AGE / close_old_connections 之後係另一條底層連線
+            with mock.patch.object(conn, "connection", object()):
+                self.assertEqual(vector_search.current_ef_search(), vector_search.DEFAULT_EF_SEARCH)
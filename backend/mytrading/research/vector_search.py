@@ -0,0 +1,169 @@
+# research/vector_search.py
+"""
+研究 embeddings 向量檢索（pgvector）共用入口。
+
+以往每個 command 各自用 '[' + ','.join(map(str, qv)) + ']' 將 1024 維向量轉成文字，
+Postgres 再逐個數字 parse 返；呢度改為註冊 pgvector 嘅 psycopg adapter，
+並用 server-side binding + %b placeholder 以 binary（float32）傳送查詢向量。
+
+research_topk / research_topk_batch 經 research.vector_store 分派到所選後端（預設 pgvector），
+結果按 (向量 hash, types, k, filters, ef_search, 研究快照版本) cache 喺 Redis；
+build_research_embeddings 寫入後 bump 版本，舊 entry 自然失效（毋須 scan 刪除）。
+"""
+import hashlib
+import json
+import logging
+import numpy as np
+import psycopg
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from pgvector import Vector
+from pgvector.psycopg import register_vector
+
+COMPANY_TYPES  = ("company_profile","company_risk","company_catalyst","company_thesis")
+INDUSTRY_TYPES = ("industry_profile","industry_player")
+RESEARCH_TYPES = COMPANY_TYPES + INDUSTRY_TYPES
+
+DEFAULT_EF_SEARCH = 40          # pgvector 預設值
+SNAPSHOT_VERSION_KEY = "research_snapshot_version"
+
+logger = logging.getLogger(__name__)
+
+TOPK_SQL = """
+SELECT object_type, object_id, chunk_id,
+       1 - (vector <=> %(qv)b) AS sim{meta_col}
+FROM {table}
+WHERE object_type = ANY(%(types)s::text[]){filter_sql}
+ORDER BY vector <=> %(qv)b
+LIMIT %(k)s;
+"""
+
+def to_vector(qv) -> Vector:
+    """list / tuple / numpy → pgvector.Vector（float32）"""
+    if isinstance(qv, Vector):
+        return qv
+    if isinstance(qv, list):
+        return Vector(qv)
+    return Vector(np.asarray(qv, dtype=np.float32))
+
+def _raw_connection():
+    """
+    取 Django 當前線程嘅底層 psycopg connection，並確保已註冊 vector adapter。
+    每條實體連線只註冊一次（CONN_MAX_AGE 重連後會自動再註冊）。
+    """
+    connection.ensure_connection()
+    raw = connection.connection
+    if getattr(connection, "_pgvector_registered", None) is not raw:
+        register_vector(raw)
+        connection._pgvector_registered = raw
+    return raw
+
+def binary_cursor():
+    """
+    Django 預設用 ClientCursor（參數喺 client 端拼成 SQL 字面值），做唔到 binary 傳輸；
+    呢度直接開 server-side binding 嘅 psycopg.Cursor。
+    同 Django 共用同一條連線，所以 transaction 同 SET hnsw.ef_search 一樣生效。
+    """
+    return psycopg.Cursor(_raw_connection())
+
+def set_ef_search(ef: int):
+    """
+    SET hnsw.ef_search（session 級），並記低喺連線上，俾 KNN cache key 用。
+    同 _pgvector_registered 一樣連埋底層 connection 一齊記：重連之後個新 session 係預設值。
+    """
+    with connection.cursor() as cur:
+        cur.execute("SET hnsw.ef_search = %s;", [int(ef)])
+    connection._hnsw_ef_search = (connection.connection, int(ef))
+
+def current_ef_search() -> int:
+    raw, ef = getattr(connection, "_hnsw_ef_search", (None, DEFAULT_EF_SEARCH))
+    if raw is None or raw is not connection.connection:
+        return DEFAULT_EF_SEARCH
+    return ef
+
+def pg_topk(qv, types=RESEARCH_TYPES, k=5, filters=None, with_meta=False,
+            table="research_researchembedding"):
+    """
+    pgvector 單一查詢（命中 HNSW cos 索引）。
+    回傳: [(object_type, object_id, chunk_id, sim)]，with_meta=True 時多一欄 meta
+    table 只供 bench_hnsw 指向臨時複製表，正常毋須改。
+    """
+    params = {"qv": to_vector(qv), "types": list(types), "k": int(k)}
+    filter_sql = ""
+    if filters:
+        filter_sql = "\n  AND meta @> %(filters)s::jsonb"
+        params["filters"] = json.dumps(filters)
+    sql = TOPK_SQL.format(meta_col=",\n       meta" if with_meta else "", filter_sql=filter_sql, table=table)
+    with binary_cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+# ---- KNN 結果 cache（Redis）----
+def snapshot_version() -> int:
+    try:
+        return int(cache.get_or_set(SNAPSHOT_VERSION_KEY, 1, timeout=None))
+    except Exception:
+        logger.warning("knn cache unavailable", exc_info=True)
+        return 0
+
+def bump_snapshot_version() -> int:
+    """研究 embeddings 有寫入就 bump；舊版本嘅 key 再冇人讀，等 TTL 自然過期"""
+    try:
+        cache.add(SNAPSHOT_VERSION_KEY, 1, timeout=None)
+        return cache.incr(SNAPSHOT_VERSION_KEY)
+    except Exception:
+        logger.warning("failed to bump %s", SNAPSHOT_VERSION_KEY, exc_info=True)
+        return 0
+
+def _cache_key(qv, types, k, filters, with_meta, backend, version, ef) -> str:
+    h = hashlib.sha1(np.asarray(qv, dtype=np.float32).tobytes())
+    h.update(json.dumps([sorted(types), int(k), filters or {}, bool(with_meta)], sort_keys=True).encode())
+    return f"rknn:{version}:{backend}:ef{ef}:{h.hexdigest()}"
+
+def _cache_ctx():
+    """(backend, version, ef)；cache 停用或 Redis 唔通時回 None"""
+    ttl = getattr(settings, "RESEARCH_KNN_CACHE_TTL", 0)
+    if not ttl:
+        return None
+    version = snapshot_version()
+    if not version:
+        return None
+    backend = getattr(settings, "VECTOR_STORE_BACKEND", "pgvector")
+    return backend, version, current_ef_search()
+
+def research_topk(qv, types=RESEARCH_TYPES, k=5, with_meta=False, filters=None, use_cache=True):
+    """cosine 近鄰檢索研究 embeddings；filters 為 meta 等值過濾，例如 {"ticker": "NVDA"}"""
+    return research_topk_batch([qv], types, k=k, with_meta=with_meta, filters=filters, use_cache=use_cache)[0]
+
+def research_topk_batch(qvs, types=RESEARCH_TYPES, k=5, with_meta=False, filters=None, use_cache=True):
+    """批量版：一次過查多個向量，回傳同序嘅 list[list[row]]；只有 cache miss 先會落到向量庫"""
+    from research.vector_store import get_vector_store
+    store = get_vector_store()
+    qvs = list(qvs)
+    ctx = _cache_ctx() if use_cache else None
+    if ctx is None:
+        if len(qvs) == 1:
+            return [store.topk(qvs[0], types, k=k, filters=filters, with_meta=with_meta)]
+        return store.topk_batch(qvs, types, k=k, filters=filters, with_meta=with_meta)
+
+    keys = [_cache_key(qv, types, k, filters, with_meta, *ctx) for qv in qvs]
+    try:
+        hits = cache.get_many(keys)
+    except Exception:
+        logger.warning("knn cache get failed", exc_info=True)
+        hits = {}
+
+    miss = [i for i, key in enumerate(keys) if key not in hits]
+    fresh = {}
+    if len(miss) == 1:
+        fresh[keys[miss[0]]] = store.topk(qvs[miss[0]], types, k=k, filters=filters, with_meta=with_meta)
+    elif miss:
+        rows = store.topk_batch([qvs[i] for i in miss], types, k=k, filters=filters, with_meta=with_meta)
+        fresh = {keys[i]: r for i, r in zip(miss, rows)}
+    if fresh:
+        try:
+            cache.set_many(fresh, timeout=settings.RESEARCH_KNN_CACHE_TTL)
+        except Exception:
+            logger.warning("knn cache set failed", exc_info=True)
+    return [hits[key] if key in hits else fresh[key] for key in keys]
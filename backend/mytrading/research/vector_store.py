@@ -0,0 +1,248 @@
+# research/vector_store.py
+"""
+研究向量庫抽象層：同一套 upsert / delete / 批量 top-k（payload 過濾）介面，
+後端可揀 pgvector（research_researchembedding 表，預設）或 Qdrant。
+
+Postgres 表永遠係 source of truth；Qdrant 只係鏡像（point id = ResearchEmbedding.pk），
+由 sync_research_embeddings() 同步。
+settings:
+  VECTOR_STORE_BACKEND = "pgvector" | "qdrant"
+  QDRANT_URL（server 模式）或 QDRANT_PATH（embedded local 模式，":memory:" 亦可）
+  QDRANT_COLLECTION = "research_embeddings"
+"""
+import json
+from typing import Dict, List, Optional, Sequence
+
+from django.apps import apps as django_apps
+from research.vector_search import binary_cursor, to_vector, pg_topk, RESEARCH_TYPES
+
+DIM = 1024
+
+# 每行結果：(object_type, object_id, chunk_id, sim) 或多一欄 meta（with_meta=True）
+PG_BATCH_SQL = """
+SELECT q.ord, r.object_type, r.object_id, r.chunk_id, r.sim{meta_col}
+FROM unnest(%(qvs)b::vector[]) WITH ORDINALITY AS q(v, ord)
+CROSS JOIN LATERAL (
+    SELECT e.object_type, e.object_id, e.chunk_id, e.meta,
+           1 - (e.vector <=> q.v) AS sim
+    FROM research_researchembedding e
+    WHERE e.object_type = ANY(%(types)s::text[]){filter_sql}
+    ORDER BY e.vector <=> q.v
+    LIMIT %(k)s
+) r
+ORDER BY q.ord, r.sim DESC;
+"""
+
+def get_embeddings_model():
+    from django.conf import settings
+    path = getattr(settings, "EMBEDDINGS_MODEL", "research.ResearchEmbedding")
+    app_label, model_name = path.split(".")
+    return django_apps.get_model(app_label, model_name)
+
+
+class VectorStore:
+    """
+    points: [{"id": int, "vector": [...], "object_type": str, "object_id": int,
+              "chunk_id": int, "meta": dict}]
+    filters: meta 欄位等值過濾，例如 {"ticker": "NVDA"} / {"company_id": 3}
+    """
+    name = "base"
+
+    def upsert(self, points: List[Dict]) -> int:
+        raise NotImplementedError
+
+    def delete(self, ids: Optional[Sequence[int]] = None, object_types: Optional[Sequence[str]] = None) -> None:
+        raise NotImplementedError
+
+    def topk_batch(self, qvs, object_types=RESEARCH_TYPES, k=5,
+                   filters: Optional[Dict] = None, with_meta=False) -> List[List[tuple]]:
+        raise NotImplementedError
+
+    def topk(self, qv, object_types=RESEARCH_TYPES, k=5, filters=None, with_meta=False) -> List[tuple]:
+        return self.topk_batch([qv], object_types, k=k, filters=filters, with_meta=with_meta)[0]
+
+
+class PgVectorStore(VectorStore):
+    """直接查 research_researchembedding（HNSW cos 索引），批量用 unnest + LATERAL 一次 round trip。"""
+    name = "pgvector"
+
+    def upsert(self, points):
+        Emb = get_embeddings_model()
+        n = 0
+        for p in points:
+            Emb.objects.update_or_create(
+                id=p["id"],
+                defaults=dict(
+                    object_type=p["object_type"], object_id=p["object_id"], chunk_id=p.get("chunk_id", 0),
+                    model_name=p.get("model_name", ""), dim=len(p["vector"]),
+                    vector=p["vector"], meta=p.get("meta") or {},
+                ),
+            )
+            n += 1
+        return n
+
+    def delete(self, ids=None, object_types=None):
+        Emb = get_embeddings_model()
+        qs = Emb.objects.all()
+        if ids is not None:
+            qs = qs.filter(id__in=list(ids))
+        if object_types is not None:
+            qs = qs.filter(object_type__in=list(object_types))
+        qs.delete()
+
+    def topk(self, qv, object_types=RESEARCH_TYPES, k=5, filters=None, with_meta=False):
+        # 單一查詢毋須 unnest/LATERAL
+        return pg_topk(qv, object_types, k=k, filters=filters, with_meta=with_meta)
+
+    def topk_batch(self, qvs, object_types=RESEARCH_TYPES, k=5, filters=None, with_meta=False):
+        qvs = list(qvs)
+        if not qvs:
+            return []
+        params = {"qvs": [to_vector(qv) for qv in qvs], "types": list(object_types), "k": int(k)}
+        filter_sql = ""
+        if filters:
+            filter_sql = "\n      AND e.meta @> %(filters)s::jsonb"
+            params["filters"] = json.dumps(filters)
+        sql = PG_BATCH_SQL.format(meta_col=", r.meta" if with_meta else "", filter_sql=filter_sql)
+
+        out = [[] for _ in qvs]
+        with binary_cursor() as cur:
+            cur.execute(sql, params)
+            for row in cur.fetchall():
+                out[row[0] - 1].append(tuple(row[1:]))
+        return out
+
+
+class QdrantStore(VectorStore):
+    """Qdrant 鏡像；payload = {object_type, object_id, chunk_id, meta}，過濾用 meta.<key>。"""
+    name = "qdrant"
+
+    def __init__(self, client=None, collection: Optional[str] = None, url: Optional[str] = None,
+                 path: Optional[str] = None, api_key: Optional[str] = None, dim: int = DIM):
+        from django.conf import settings
+        from qdrant_client import QdrantClient
+        self.collection = collection or getattr(settings, "QDRANT_COLLECTION", "research_embeddings")
+        self.dim = dim
+        if client is None:
+            url = url or getattr(settings, "QDRANT_URL", "")
+            path = path or getattr(settings, "QDRANT_PATH", "")
+            if path == ":memory:":
+                client = QdrantClient(location=":memory:")
+            elif path:
+                client = QdrantClient(path=path)   # embedded local 模式（單進程獨佔）
+            else:
+                client = QdrantClient(url=url or "http://127.0.0.1:6333",
+                                      api_key=api_key or getattr(settings, "QDRANT_API_KEY", None) or None)
+        self.client = client
+        self._ensured = False
+
+    def ensure_collection(self):
+        if self._ensured:
+            return
+        from qdrant_client import models as qm
+        if not self.client.collection_exists(self.collection):
+            self.client.create_collection(
+                self.collection,
+                vectors_config=qm.VectorParams(size=self.dim, distance=qm.Distance.COSINE),
+            )
+            # object_type 幾乎每個查詢都會用到，建 keyword index（local 模式會忽略）
+            self.client.create_payload_index(self.collection, "object_type", qm.PayloadSchemaType.KEYWORD)
+        self._ensured = True
+
+    def _filter(self, object_types, filters):
+        from qdrant_client import models as qm
+        must = [qm.FieldCondition(key="object_type", match=qm.MatchAny(any=list(object_types)))]
+        for key, val in (filters or {}).items():
+            must.append(qm.FieldCondition(key=f"meta.{key}", match=qm.MatchValue(value=val)))
+        return qm.Filter(must=must)
+
+    def upsert(self, points, batch_size=256):
+        from qdrant_client import models as qm
+        self.ensure_collection()
+        n = 0
+        for i in range(0, len(points), batch_size):
+            batch = [
+                qm.PointStruct(
+                    id=int(p["id"]),
+                    vector=[float(x) for x in p["vector"]],
+                    payload={
+                        "object_type": p["object_type"],
+                        "object_id": int(p["object_id"]),
+                        "chunk_id": int(p.get("chunk_id", 0)),
+                        "meta": p.get("meta") or {},
+                    },
+                )
+                for p in points[i:i + batch_size]
+            ]
+            self.client.upsert(self.collection, points=batch, wait=True)
+            n += len(batch)
+        return n
+
+    def delete(self, ids=None, object_types=None):
+        from qdrant_client import models as qm
+        self.ensure_collection()
+        if ids is not None:
+            self.client.delete(self.collection, points_selector=qm.PointIdsList(points=[int(i) for i in ids]))
+        if object_types is not None:
+            self.client.delete(self.collection, points_selector=qm.FilterSelector(
+                filter=qm.Filter(must=[qm.FieldCondition(key="object_type", match=qm.MatchAny(any=list(object_types)))])
+            ))
+
+    def topk_batch(self, qvs, object_types=RESEARCH_TYPES, k=5, filters=None, with_meta=False):
+        from qdrant_client import models as qm
+        qvs = list(qvs)
+        if not qvs:
+            return []
+        self.ensure_collection()
+        flt = self._filter(object_types, filters)
+        requests = [
+            qm.QueryRequest(query=[float(x) for x in qv], filter=flt, limit=int(k), with_payload=True)
+            for qv in qvs
+        ]
+        out = []
+        for resp in self.client.query_batch_points(self.collection, requests=requests):
+            rows = []
+            for pt in resp.points:
+                pl = pt.payload or {}
+                row = (pl.get("object_type"), pl.get("object_id"), pl.get("chunk_id", 0), float(pt.score))
+                rows.append(row + (pl.get("meta") or {},) if with_meta else row)
+            out.append(rows)
+        return out
+
+
+def sync_research_embeddings(store: VectorStore, object_types=RESEARCH_TYPES, batch_size=500) -> int:
+    """
+    將 research_researchembedding（source of truth）鏡像到非 pgvector 後端：
+    先刪走所選 types，再按 pk 分批 upsert。pgvector 後端毋須同步。
+    """
+    if isinstance(store, PgVectorStore):
+        return 0
+    Emb = get_embeddings_model()
+    store.delete(object_types=object_types)
+    qs = (Emb.objects.filter(object_type__in=list(object_types))
+          .order_by("pk")
+          .values("id", "object_type", "object_id", "chunk_id", "vector", "meta"))
+    total, buf = 0, []
+    for row in qs.iterator(chunk_size=batch_size):
+        buf.append(row)
+        if len(buf) >= batch_size:
+            total += store.upsert(buf); buf = []
+    if buf:
+        total += store.upsert(buf)
+    return total
+
+
+_stores: Dict[str, VectorStore] = {}
+
+def get_vector_store(backend: Optional[str] = None) -> VectorStore:
+    """按 settings.VECTOR_STORE_BACKEND 取（進程內共用嘅）向量庫實例"""
+    from django.conf import settings
+    backend = backend or getattr(settings, "VECTOR_STORE_BACKEND", "pgvector")
+    if backend not in _stores:
+        if backend == "pgvector":
+            _stores[backend] = PgVectorStore()
+        elif backend == "qdrant":
+            _stores[backend] = QdrantStore()
+        else:
+            raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+    return _stores[backend]